@@ -0,0 +1,202 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple
+
+caches: dict[str, "TTLCache"] = {}
+"""Every cache created in the process, by name, so they can be listed and
+    cleared together."""
+
+_missing = object()
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries also expire after a time to live.
+
+    Expired entries are dropped lazily when they are looked up or reach the
+    least recently used end. Not thread-safe; meant for the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def weigh(self, value: Any) -> int:
+        """Share of `maxsize` taken by `value`; every entry counts once."""
+        return 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _missing)
+        if entry is not _missing:
+            expires_at, value = entry
+            if expires_at > self.clock():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self._remove(key)
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store `value`, expiring after `ttl` seconds instead of the default."""
+        if key in self._data:
+            self._remove(key)
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self.weight += self.weigh(value)
+        while self.weight > self.maxsize:
+            self._remove(next(iter(self._data)))
+
+    def pop(self, key: Hashable) -> None:
+        if key in self._data:
+            self._remove(key)
+
+    def expire(self, key: Hashable, grace: float = 0.0) -> None:
+        """Drop `key`, or let it be served for at most `grace` more seconds."""
+        if key not in self._data:
+            return
+        if grace <= 0:
+            self._remove(key)
+            return
+        expires_at, value = self._data[key]
+        self._data[key] = (min(expires_at, self.clock() + grace), value)
+
+    def clear(self) -> None:
+        for key in list(self._data):
+            self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        _, value = self._data.pop(key)
+        self.weight -= self.weigh(value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "weight": self.weight,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class PageSpan(NamedTuple):
+    """Sort keys covered by one page of a keyset-paginated listing."""
+
+    listing: Hashable
+    descending: bool
+    after: tuple | None
+    """Key the page starts after (exclusive), None for the first page."""
+    last: tuple | None
+    """Key of the last row (inclusive), None if no rows follow the page."""
+
+    def covers(self, key: tuple) -> bool:
+        if self.descending:
+            return (self.after is None or key < self.after) and (
+                self.last is None or key >= self.last
+            )
+        return (self.after is None or key > self.after) and (
+            self.last is None or key <= self.last
+        )
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: dict[str, str]
+    span: PageSpan | None = None
+
+
+class ResponseCache(TTLCache):
+    """Serialized responses, bounded by their total size in bytes.
+
+    Pages of listings record the sort keys they cover, so a write can expire
+    exactly the pages a row enters, leaves or changes in.
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl: float, **kwargs: Any):
+        super().__init__(name, max_bytes, ttl, **kwargs)
+        self._version = 0
+        self._stale_version = 0
+        self._stale_until = 0.0
+        self._pages: dict[Hashable, set[Hashable]] = {}
+
+    def weigh(self, value: CachedResponse) -> int:
+        return len(value.body)
+
+    def snapshot(self) -> tuple[int, int]:
+        """Token to take before the reads a response is rendered from."""
+        return self._version, self._stale_version
+
+    def set(
+        self,
+        key: Hashable,
+        value: CachedResponse,
+        ttl: float | None = None,
+        snapshot: tuple[int, int] | None = None,
+    ) -> None:
+        """Store `value`, accounting for writes that raced with its reads.
+
+        If something was expired since `snapshot` the response may predate
+        that write: it is dropped, or only kept for the rest of the grace
+        period when all such expiries were graceful.
+        """
+        if snapshot is not None:
+            version, stale_version = snapshot
+            if version != self._version:
+                return
+            if stale_version != self._stale_version:
+                remaining = self._stale_until - self.clock()
+                ttl = min(self.ttl if ttl is None else ttl, remaining)
+                if ttl <= 0:
+                    return
+        super().set(key, value, ttl)
+        if value.span is not None and key in self._data:
+            self._pages.setdefault(value.span.listing, set()).add(key)
+
+    def expire(self, key: Hashable, grace: float = 0.0) -> None:
+        self._record_expiry(grace)
+        super().expire(key, grace)
+
+    def expire_pages(self, listing: Hashable, key: tuple, grace: float = 0.0) -> None:
+        """Expire the cached pages of `listing` whose range includes `key`."""
+        self._record_expiry(grace)
+        for page in list(self._pages.get(listing, ())):
+            _, value = self._data[page]
+            if value.span.covers(key):
+                super().expire(page, grace)
+
+    def _record_expiry(self, grace: float) -> None:
+        if grace <= 0:
+            self._version += 1
+        else:
+            self._stale_version += 1
+            self._stale_until = max(self._stale_until, self.clock() + grace)
+
+    def _remove(self, key: Hashable) -> None:
+        _, value = self._data[key]
+        super()._remove(key)
+        if value.span is not None:
+            pages = self._pages[value.span.listing]
+            pages.discard(key)
+            # Listings come and go, e.g. one per post detail: keep no empty ones.
+            if not pages:
+                del self._pages[value.span.listing]
+
+    def stats(self) -> dict:
+        return {**super().stats(), "bytes": self.weight}
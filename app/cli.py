@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import logging
+
+import sqlalchemy
+
+from app import migrations
+from app.database import (
+    create_engine,
+    database,
+    like_table,
+    metadata,
+    post_table,
+)
+from app.logging_config import configure_logging, stop_logging
+from app.tasks import compact_hot_scores
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_like_counts(batch_size: int = 10_000) -> int:
+    """Recompute the stored `like_count` of every post from the likes table.
+
+    Posts are processed in id ranges of `batch_size`, each range in its own
+    short transaction, and only rows whose counter drifted are written.
+    Returns the number of posts that were corrected.
+    """
+    actual_count = (
+        sqlalchemy.select(sqlalchemy.func.count(like_table.c.id))
+        .where(like_table.c.post_id == post_table.c.id)
+        .scalar_subquery()
+    )
+    max_id = await database.fetch_val(
+        sqlalchemy.select(sqlalchemy.func.max(post_table.c.id))
+    )
+
+    corrected = 0
+    for start in range(0, (max_id or 0) + 1, batch_size):
+        query = (
+            post_table.update()
+            .where(post_table.c.id > start, post_table.c.id <= start + batch_size)
+            .where(post_table.c.like_count != actual_count)
+            .values(like_count=actual_count)
+            .returning(post_table.c.id)
+        )
+        logger.debug(query)
+        async with database.transaction():
+            corrected += len(await database.fetch_all(query))
+
+    logger.info(f"Reconciled like counts, {corrected} posts corrected")
+    return corrected
+
+
+async def rebuild_search_index() -> None:
+    """Reindex the bodies of all posts for full-text search, then merge the
+    index into as few segments as possible."""
+    await database.execute(
+        sqlalchemy.text("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    )
+    await database.execute(
+        sqlalchemy.text("INSERT INTO posts_fts (posts_fts) VALUES ('optimize')")
+    )
+    logger.info("Rebuilt the post search index")
+
+
+async def run(args: argparse.Namespace) -> None:
+    await database.connect()
+    try:
+        if args.command == "reconcile-likes":
+            await reconcile_like_counts(args.batch_size)
+        elif args.command == "rebuild-search":
+            await rebuild_search_index()
+        elif args.command == "compact-hot":
+            await compact_hot_scores(args.min_weight, args.batch_size)
+    finally:
+        await database.disconnect()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = subparsers.add_parser(
+        "reconcile-likes", help="Recompute stored like counts from the likes table."
+    )
+    reconcile.add_argument("--batch-size", type=int, default=10_000)
+
+    subparsers.add_parser(
+        "rebuild-search",
+        help="Reindex all post bodies for full-text search, e.g. after a bulk import.",
+    )
+
+    compact = subparsers.add_parser(
+        "compact-hot",
+        help="Drop posts whose score has decayed below --min-weight out of the hot ranking.",
+    )
+    compact.add_argument("--min-weight", type=float, default=None)
+    compact.add_argument("--batch-size", type=int, default=10_000)
+
+    subparsers.add_parser(
+        "create-schema",
+        help="Create the tables of a new database and mark it as fully migrated.",
+    )
+
+    migrate = subparsers.add_parser(
+        "migrate", help="Apply schema migrations, up to the latest by default."
+    )
+    migrate.add_argument("--to", type=int, default=None)
+
+    downgrade = subparsers.add_parser(
+        "downgrade", help="Revert schema migrations newer than the given version."
+    )
+    downgrade.add_argument("--to", type=int, required=True)
+
+    args = parser.parse_args(argv)
+    configure_logging()
+    try:
+        if args.command in ("create-schema", "migrate", "downgrade"):
+            engine = create_engine()
+            try:
+                if args.command == "create-schema":
+                    metadata.create_all(engine)
+                    # Records the version; the migrations find nothing left to do.
+                    version = migrations.upgrade(engine)
+                elif args.command == "migrate":
+                    version = migrations.upgrade(engine, args.to)
+                else:
+                    version = migrations.downgrade(engine, args.to)
+            finally:
+                engine.dispose()
+            logger.info(f"Database schema at version {version}")
+        else:
+            asyncio.run(run(args))
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    main()
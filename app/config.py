@@ -14,11 +14,89 @@ class BaseConfig(BaseSettings):
 class GlobalConfig(BaseConfig):
     DATABASE_URL: Optional[str] = None
     DB_FORCE_ROLLBACK: bool = False
+    DATABASE_READ_POOL_SIZE: int = 4
+    """Connections serving GET routes; writes go through a single connection."""
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64_000
+    """Page cache per connection, in pages or, when negative, in KiB."""
+    SQLITE_BUSY_TIMEOUT_MS: int = 5_000
     APP_SECRET: Optional[str] = None
     MAILTRAP_API_KEY: Optional[str] = None
     MAILTRAP_FROM_EMAIL: Optional[str] = None
     MAILTRAP_FROM_NAME: Optional[str] = None
     MAILTRAP_HOST: Optional[str] = None
+    BCRYPT_ROUNDS: int = 12
+    """Cost of new password hashes, overridden at startup by calibration
+        when BCRYPT_TARGET_MS is set."""
+    BCRYPT_TARGET_MS: Optional[float] = None
+    BCRYPT_POOL_SIZE: int = 4
+    BCRYPT_QUEUE_LIMIT: int = 16
+    AUTH_MAX_CONCURRENCY: int = 20
+    """Login and registration requests handled at once; more get 503."""
+    AUTH_RATE_PER_IP: float = 1.0
+    AUTH_BURST_PER_IP: int = 20
+    """Login and registration attempts per client IP: a burst, refilled at a
+        rate per second."""
+    AUTH_RATE_PER_USERNAME: float = 0.1
+    AUTH_BURST_PER_USERNAME: int = 5
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    """Keys tracked per rate limiter; the least recently seen go first."""
+    USER_CACHE_ENABLED: bool = True
+    """Each worker caches user rows; changes made through another worker
+        are seen once the entry expires after USER_CACHE_TTL seconds."""
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: float = 60.0
+    TOKEN_CACHE_SIZE: int = 10_000
+    EMAIL_WORKER_ENABLED: bool = True
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_CONCURRENCY: int = 10
+    EMAIL_MAX_ATTEMPTS: int = 8
+    EMAIL_RETRY_BASE_SECONDS: float = 2.0
+    EMAIL_POLL_INTERVAL: float = 5.0
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESPONSE_CACHE_TTL: float = 60.0
+    RESPONSE_CACHE_STALENESS: float = 2.0
+    """Seconds a cached response may keep showing an outdated like count."""
+    BATCH_MAX_ITEMS: int = 500
+    """Largest number of posts or comments accepted by one batch request."""
+    FAST_JSON_RESPONSES: bool = False
+    """Serialize read responses straight from database rows, without validating
+        them against their response models: about five times the rows per
+        second, but a query returning a wrong type goes unnoticed."""
+    EXPORT_CHUNK_SIZE: int = 1000
+    """Rows read per query, and written per chunk, by the NDJSON exports."""
+    FEED_FANOUT_MAX_FOLLOWERS: int = 10_000
+    """Accounts with more followers are not fanned out to their followers'
+        timelines on write; their posts are merged into feeds when read."""
+    FEED_BACKFILL_POSTS: int = 100
+    """Recent posts of an account copied to the timeline of a new follower."""
+    FEED_CATCH_UP_ENABLED: bool = True
+    FEED_CATCH_UP_INTERVAL: float = 60.0
+    """Seconds between runs of the job copying the posts of accounts back under
+        FEED_FANOUT_MAX_FOLLOWERS into their followers' timelines."""
+    FEED_CATCH_UP_BATCH_SIZE: int = 10_000
+    """Timeline entries written per transaction by the feed catch-up job."""
+    HOT_COMPACTION_ENABLED: bool = True
+    HOT_COMPACTION_INTERVAL: float = 3600.0
+    HOT_MIN_WEIGHT: float = 0.01
+    """Posts whose decayed hot weight, in likes, falls below this are dropped
+        out of the hot ranking by the compaction job until their next event."""
+    LIKE_BUFFER_ENABLED: bool = False
+    """Acknowledge likes before writing them, in batches. Likes not yet
+        written are lost if the process dies: up to LIKE_BUFFER_FLUSH_MS of
+        them, or more while the database is slow."""
+    LIKE_BUFFER_FLUSH_MS: float = 50.0
+    LIKE_BUFFER_MAX_EVENTS: int = 1000
+    """Pending likes that trigger a flush before the interval is up."""
+    LIKE_BUFFER_MAX_PENDING: int = 100_000
+    """Beyond this, likes are written directly instead of buffered."""
+    LOG_JSON: bool = False
+    """Write log records as one JSON object per line instead of plain text."""
+    LOG_QUEUE_SIZE: int = 10_000
+    """Records waiting for the logging thread; further records are dropped."""
 
 
 class DevConfig(GlobalConfig):
@@ -37,6 +115,8 @@ class TestConfig(GlobalConfig):
     MAILTRAP_FROM_EMAIL: Optional[str] = None
     MAILTRAP_FROM_NAME: Optional[str] = None
     MAILTRAP_HOST: Optional[str] = None
+    BCRYPT_ROUNDS: int = 4
+    RESPONSE_CACHE_STALENESS: float = 0.0
 
     model_config = SettingsConfigDict(env_prefix="TEST_")
 
@@ -1,12 +1,30 @@
-import databases
+import math
+
 import sqlalchemy
 from app.config import config
+from app.sqlite import SQLiteDatabase, register_functions
 
 metadata = sqlalchemy.MetaData()
 
-engine = sqlalchemy.create_engine(
-    config.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+HOT_HALF_LIFE_SECONDS = 12 * 60 * 60
+"""Time for the weight of a like or comment in the hot ranking to halve.
+    Stored scores are in half-lives, so changing it needs new scores."""
+HOT_LIKE_WEIGHT = 1.0
+HOT_COMMENT_WEIGHT = 2.0
+
+
+def create_engine(url: str | None = None) -> sqlalchemy.Engine:
+    """Synchronous engine for schema management; requests go through
+    `database` and `read_database`."""
+    engine = sqlalchemy.create_engine(
+        url or config.DATABASE_URL, connect_args={"check_same_thread": False}
+    )
+    # The triggers need the same functions as the request connections.
+    sqlalchemy.event.listen(
+        engine, "connect", lambda connection, _: register_functions(connection)
+    )
+    return engine
+
 
 post_table = sqlalchemy.Table(
     "posts",
@@ -14,17 +32,79 @@ post_table = sqlalchemy.Table(
     sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
     sqlalchemy.Column("body", sqlalchemy.String),
     sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id"), nullable=False),
+    sqlalchemy.Column(
+        "like_count", sqlalchemy.Integer, nullable=False, server_default="0"
+    ),
+    sqlalchemy.Column(
+        "revision", sqlalchemy.Integer, nullable=False, server_default="0"
+    ),
+    sqlalchemy.Column(
+        "comment_count", sqlalchemy.Integer, nullable=False, server_default="0"
+    ),
+    sqlalchemy.Column("hot_score", sqlalchemy.Float),
+    sqlalchemy.Index("ix_posts_like_count_id", "like_count", "id"),
+    sqlalchemy.Index("ix_posts_user_id_id", "user_id", "id"),
+    sqlalchemy.Index(
+        "ix_posts_hot_score_id",
+        "hot_score",
+        "id",
+        sqlite_where=sqlalchemy.text("hot_score IS NOT NULL"),
+    ),
 )
 
+
+def hot_score_after(weight: float) -> str:
+    """SQL for the hot score of a post after an event of `weight` now.
+
+    The score is log2 of the sum of the weights of the post's events, each
+    scaled up by 2 ** (event time / half-life) rather than decayed down by
+    its age: every score decays at the same rate, so the order of posts only
+    changes when one of them gets an event and nothing is ever recomputed.
+    A NULL score, for a post compacted out of the ranking, counts as zero.
+
+    The `%` is doubled, as it is for use in `sqlalchemy.DDL`.
+    """
+    event = (
+        f"(CAST(strftime('%%s', 'now') AS REAL) / {HOT_HALF_LIFE_SECONDS}"
+        f" + {math.log2(weight)!r})"
+    )
+    return (
+        f"CASE WHEN hot_score IS NULL THEN {event}"
+        f" ELSE max(hot_score, {event}) + log2(1 + pow(2, -abs(hot_score - {event})))"
+        " END"
+    )
+
+
 comment_table = sqlalchemy.Table(
     "comments",
     metadata,
     sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
     sqlalchemy.Column("body", sqlalchemy.String),
-    sqlalchemy.Column("post_id", sqlalchemy.ForeignKey("posts.id"), nullable=False),
+    sqlalchemy.Column(
+        "post_id", sqlalchemy.ForeignKey("posts.id"), nullable=False, index=True
+    ),
     sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id"), nullable=False),
 )
 
+# Comments are counted on their post and towards its hot score.
+for trigger in (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tr_comments_after_insert AFTER INSERT ON comments
+    BEGIN
+        UPDATE posts SET comment_count = comment_count + 1,
+            hot_score = {hot_score_after(HOT_COMMENT_WEIGHT)}
+        WHERE id = NEW.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tr_comments_after_delete AFTER DELETE ON comments
+    BEGIN
+        UPDATE posts SET comment_count = comment_count - 1 WHERE id = OLD.post_id;
+    END
+    """,
+):
+    sqlalchemy.event.listen(comment_table, "after_create", sqlalchemy.DDL(trigger))
+
 user_table = sqlalchemy.Table(
     "users",
     metadata,
@@ -32,6 +112,17 @@ user_table = sqlalchemy.Table(
     sqlalchemy.Column("email", sqlalchemy.String, unique=True),
     sqlalchemy.Column("password", sqlalchemy.String),
     sqlalchemy.Column("confirmed", sqlalchemy.Boolean, default=False),
+    sqlalchemy.Column(
+        "follower_count", sqlalchemy.Integer, nullable=False, server_default="0"
+    ),
+    # The latest post written while the account was not fanned out, until the
+    # feed catch-up job has copied its posts into its followers' timelines.
+    sqlalchemy.Column("unfanned_post_id", sqlalchemy.Integer),
+    sqlalchemy.Index(
+        "ix_users_unfanned_post_id",
+        "unfanned_post_id",
+        sqlite_where=sqlalchemy.text("unfanned_post_id IS NOT NULL"),
+    ),
 )
 
 like_table = sqlalchemy.Table(
@@ -39,10 +130,187 @@ like_table = sqlalchemy.Table(
     metadata,
     sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
     sqlalchemy.Column("post_id", sqlalchemy.ForeignKey("posts.id"), nullable=False),
-    sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id"), nullable=False),
+    sqlalchemy.Column(
+        "user_id", sqlalchemy.ForeignKey("users.id"), nullable=False, index=True
+    ),
+    sqlalchemy.Index("ux_likes_post_id_user_id", "post_id", "user_id", unique=True),
+)
+
+# Likes are written with a single statement each, the post counters follow.
+for trigger in (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tr_likes_after_insert AFTER INSERT ON likes
+    BEGIN
+        UPDATE posts SET like_count = like_count + 1, revision = revision + 1,
+            hot_score = {hot_score_after(HOT_LIKE_WEIGHT)}
+        WHERE id = NEW.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tr_likes_after_delete AFTER DELETE ON likes
+    BEGIN
+        UPDATE posts SET like_count = like_count - 1, revision = revision + 1
+        WHERE id = OLD.post_id;
+    END
+    """,
+):
+    sqlalchemy.event.listen(like_table, "after_create", sqlalchemy.DDL(trigger))
+
+# New posts enter the hot ranking as if liked once.
+sqlalchemy.event.listen(
+    post_table,
+    "after_create",
+    sqlalchemy.DDL(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tr_posts_hot_after_insert AFTER INSERT ON posts
+        BEGIN
+            UPDATE posts SET hot_score = {hot_score_after(HOT_LIKE_WEIGHT)}
+            WHERE id = NEW.id;
+        END
+        """
+    ),
+)
+
+# Full-text index of post bodies. It reads the bodies from the posts table
+# itself (external content), and triggers apply every change to it.
+for statement in (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        body, content = 'posts', content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tr_posts_fts_after_insert AFTER INSERT ON posts
+    BEGIN
+        INSERT INTO posts_fts (rowid, body) VALUES (NEW.id, NEW.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tr_posts_fts_after_update AFTER UPDATE OF body ON posts
+    BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, body) VALUES ('delete', OLD.id, OLD.body);
+        INSERT INTO posts_fts (rowid, body) VALUES (NEW.id, NEW.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tr_posts_fts_after_delete AFTER DELETE ON posts
+    BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, body) VALUES ('delete', OLD.id, OLD.body);
+    END
+    """,
+):
+    sqlalchemy.event.listen(post_table, "after_create", sqlalchemy.DDL(statement))
+sqlalchemy.event.listen(
+    post_table, "before_drop", sqlalchemy.DDL("DROP TABLE IF EXISTS posts_fts")
+)
+
+follow_table = sqlalchemy.Table(
+    "follows",
+    metadata,
+    sqlalchemy.Column(
+        "follower_id", sqlalchemy.ForeignKey("users.id"), primary_key=True
+    ),
+    sqlalchemy.Column(
+        "followee_id", sqlalchemy.ForeignKey("users.id"), primary_key=True
+    ),
+    sqlalchemy.Index(
+        "ix_follows_followee_id_follower_id", "followee_id", "follower_id"
+    ),
+    sqlite_with_rowid=False,
+)
+
+for trigger in (
+    """
+    CREATE TRIGGER IF NOT EXISTS tr_follows_after_insert AFTER INSERT ON follows
+    BEGIN
+        UPDATE users SET follower_count = follower_count + 1 WHERE id = NEW.followee_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tr_follows_after_delete AFTER DELETE ON follows
+    BEGIN
+        UPDATE users SET follower_count = follower_count - 1 WHERE id = OLD.followee_id;
+    END
+    """,
+):
+    sqlalchemy.event.listen(follow_table, "after_create", sqlalchemy.DDL(trigger))
+
+timeline_table = sqlalchemy.Table(
+    "timelines",
+    metadata,
+    sqlalchemy.Column("user_id", sqlalchemy.ForeignKey("users.id"), primary_key=True),
+    sqlalchemy.Column("post_id", sqlalchemy.ForeignKey("posts.id"), primary_key=True),
+    sqlite_with_rowid=False,
 )
+"""Home timeline entries: the ids of the posts of the accounts each user
+    follows, written when the post is created."""
 
-metadata.create_all(bind=engine)
-database = databases.Database(
-    config.DATABASE_URL, force_rollback=config.DB_FORCE_ROLLBACK
+email_outbox_table = sqlalchemy.Table(
+    "email_outbox",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("recipient", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("subject", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("body", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column(
+        "status", sqlalchemy.String, nullable=False, server_default="pending"
+    ),
+    sqlalchemy.Column(
+        "attempts", sqlalchemy.Integer, nullable=False, server_default="0"
+    ),
+    sqlalchemy.Column(
+        "next_attempt_at", sqlalchemy.Float, nullable=False, server_default="0"
+    ),
+    sqlalchemy.Column("sent_at", sqlalchemy.Float),
+    sqlalchemy.Column("last_error", sqlalchemy.String),
+    sqlalchemy.Index(
+        "ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"
+    ),
 )
+
+
+def sqlite_pragmas(read_only: bool = False) -> dict:
+    pragmas = {
+        "journal_mode": config.SQLITE_JOURNAL_MODE,
+        "synchronous": config.SQLITE_SYNCHRONOUS,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+        "cache_size": config.SQLITE_CACHE_SIZE,
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT_MS,
+    }
+    if read_only:
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+database = SQLiteDatabase(
+    config.DATABASE_URL,
+    force_rollback=config.DB_FORCE_ROLLBACK,
+    pool_size=1,
+    pragmas=sqlite_pragmas(),
+)
+"""The single writer connection; also used for reads that must see the
+    caller's own uncommitted writes."""
+
+# Rolled back test transactions are only visible on their own connection.
+read_database = (
+    database
+    if config.DB_FORCE_ROLLBACK
+    else SQLiteDatabase(
+        config.DATABASE_URL,
+        pool_size=config.DATABASE_READ_POOL_SIZE,
+        pragmas=sqlite_pragmas(read_only=True),
+    )
+)
+
+
+async def connect_databases() -> None:
+    await database.connect()
+    if read_database is not database:
+        await read_database.connect()
+
+
+async def disconnect_databases() -> None:
+    if read_database is not database:
+        await read_database.disconnect()
+    await database.disconnect()
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Sequence
+
+import sqlalchemy
+
+from app.database import database, like_table, post_table
+from app.metrics import like_buffer_depth, like_buffer_flush_duration, likes_flushed
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT, two bound parameters each, within SQLite's limit of 32766.
+FLUSH_CHUNK_SIZE = 10_000
+
+
+class LikeBuffer:
+    """Write-behind buffer for likes.
+
+    Likes are acknowledged once added, and written by a background task in
+    one transaction every `flush_interval` seconds, or as soon as
+    `max_events` are pending. The like triggers update the post counters as
+    part of that transaction. Pending likes are kept once per (post, user)
+    and are lost if the process dies before they are flushed; `stop` flushes
+    them on a clean shutdown. Beyond `max_pending`, e.g. while the database
+    is unavailable, `add` refuses likes so callers write them directly.
+
+    `on_flush` is called with the (post id, like count before, like count
+    after) of every post that got new likes.
+    """
+
+    def __init__(
+        self,
+        max_events: int,
+        flush_interval: float,
+        max_pending: int,
+        on_flush: Callable[[Sequence], None] | None = None,
+    ):
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_flush = on_flush
+        # Insertion ordered, so likes are written in the order they came in.
+        self._pending: dict[tuple[int, int], None] = {}
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, like: tuple[int, int]) -> bool:
+        return like in self._pending
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def add(self, post_id: int, user_id: int) -> bool:
+        """Queue a like. Returns False, without queueing it, if the buffer is
+        not running or is full."""
+        if self._task is None or len(self._pending) >= self.max_pending:
+            return False
+        self._pending[post_id, user_id] = None
+        like_buffer_depth.set(len(self._pending))
+        if len(self._pending) >= self.max_events:
+            self._wake.set()
+        return True
+
+    def discard(self, post_id: int, user_id: int) -> bool:
+        """Drop a pending like, returning whether there was one."""
+        try:
+            del self._pending[post_id, user_id]
+        except KeyError:
+            return False
+        like_buffer_depth.set(len(self._pending))
+        return True
+
+    async def start(self) -> None:
+        # Created here, as an event is bound to the loop that first waits on it.
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task, then write out the pending likes.
+
+        The task is left to finish a flush in progress rather than cancelled,
+        which could interrupt it inside its transaction.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping:
+                return
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Like buffer flush failed")
+
+    async def flush(self) -> int:
+        """Write the pending likes in one transaction. Returns how many were
+        taken from the buffer; on failure they are put back."""
+        if not self._pending:
+            return 0
+        likes, self._pending = list(self._pending), {}
+        start = time.perf_counter()
+        before, after = {}, {}
+        try:
+            async with database.transaction():
+                for i in range(0, len(likes), FLUSH_CHUNK_SIZE):
+                    chunk = likes[i : i + FLUSH_CHUNK_SIZE]
+                    counters = like_counts_query({post_id for post_id, _ in chunk})
+                    for row in await database.fetch_all(counters):
+                        before.setdefault(row.id, row.like_count)
+                    await database.execute(insert_likes_query(chunk))
+                    for row in await database.fetch_all(counters):
+                        after[row.id] = row.like_count
+        except BaseException:
+            # Likes added during the flush stay after the ones taken out.
+            self._pending = dict.fromkeys([*likes, *self._pending])
+            raise
+        finally:
+            like_buffer_depth.set(len(self._pending))
+        like_buffer_flush_duration.observe(time.perf_counter() - start)
+        likes_flushed.inc(amount=len(likes))
+        logger.debug(f"Flushed {len(likes)} buffered likes")
+        if self.on_flush is not None:
+            self.on_flush(
+                [
+                    (post_id, before[post_id], count)
+                    for post_id, count in after.items()
+                    if count != before[post_id]
+                ]
+            )
+        return len(likes)
+
+
+def like_counts_query(post_ids: set[int]) -> sqlalchemy.Select:
+    return sqlalchemy.select(post_table.c.id, post_table.c.like_count).where(
+        post_table.c.id.in_(post_ids)
+    )
+
+
+def insert_likes_query(likes: Sequence[tuple[int, int]]) -> sqlalchemy.Insert:
+    """Insert (post_id, user_id) likes, skipping those already recorded and
+    those of posts that no longer exist."""
+    pending = (
+        sqlalchemy.values(
+            sqlalchemy.column("post_id", sqlalchemy.Integer),
+            sqlalchemy.column("user_id", sqlalchemy.Integer),
+            name="pending",
+        )
+        .data(list(likes))
+        .cte("pending")
+    )
+    return (
+        like_table.insert()
+        .prefix_with("OR IGNORE")
+        .from_select(
+            ["post_id", "user_id"],
+            sqlalchemy.select(pending.c.post_id, pending.c.user_id).join(
+                post_table, post_table.c.id == pending.c.post_id
+            ),
+        )
+    )
@@ -1,9 +1,115 @@
+import logging
+import queue
+import sys
+import time
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import orjson
 
 from app.config import config, DevConfig
 
+queue_handler: "BoundedQueueHandler | None" = None
+listener: QueueListener | None = None
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Hands records over to the listener thread through a bounded queue.
+
+    Only the correlation id filter runs on the logging thread; the message is
+    rendered by the listener, so log arguments must not be mutated after the
+    call. Records are dropped, and counted, rather than block when the queue
+    is full.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The frames of a traceback keep changing once the caller moves on.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "maxsize": self.maxsize,
+            "dropped": self.dropped,
+        }
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per line, timestamps in UTC."""
+
+    converter = time.gmtime
+
+    def format(self, record: logging.LogRecord) -> str:
+        stamp = self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+        entry = {
+            "time": f"{stamp}.{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "line": record.lineno,
+            "correlation_id": getattr(record, "correlation_id", None),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry).decode()
+
+
+def sink_handlers() -> list[logging.Handler]:
+    """The handlers the listener thread writes records to."""
+    if config.LOG_JSON:
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(JsonFormatter())
+    else:
+        from rich.logging import RichHandler
+
+        console = RichHandler()
+        console.setFormatter(
+            logging.Formatter(
+                "(%(correlation_id)s) %(name)s:%(lineno)d - %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S",
+            )
+        )
+
+    file = RotatingFileHandler(
+        "app.log",
+        maxBytes=1024 * 1024,  # 1 MB
+        backupCount=2,
+        encoding="utf8",
+    )
+    file.setFormatter(
+        JsonFormatter()
+        if config.LOG_JSON
+        else logging.Formatter(
+            "%(asctime)s %(msecs)03dZ | %(levelname)-8s | [%(correlation_id)s] %(name)s:%(lineno)d - %(message)s",
+            datefmt="%Y-%m-%dT%H:%M:%S",
+        )
+    )
+    # Only the application's own records go to the file.
+    file.addFilter(logging.Filter("app"))
+    return [console, file]
+
 
 def configure_logging():
+    """Route every configured logger through one queue to a listener thread,
+    which does the formatting and I/O. Call `stop_logging` on shutdown."""
+    global queue_handler, listener
+    stop_logging()
     dictConfig(
         {
             "version": 1,
@@ -15,45 +121,35 @@ def configure_logging():
                     "default_value": "-",
                 }
             },
-            "formatters": {
-                "console": {
-                    "class": "logging.Formatter",
-                    "datefmt": "%Y-%m-%d %H:%M:%S",
-                    "format": "(%(correlation_id)s) %(name)s:%(lineno)d - %(message)s",
-                },
-                "file": {
-                    "class": "logging.Formatter",
-                    "datefmt": "%Y-%m-%dT%H:%M:%S",
-                    "format": "%(asctime)s %(msecs)03dZ | %(levelname)-8s | [%(correlation_id)s] %(name)s:%(lineno)d - %(message)s",
-                },
-            },
             "handlers": {
-                "default": {
-                    "class": "rich.logging.RichHandler",
-                    "level": "DEBUG",
-                    "formatter": "console",
-                    "filters": ["correlation_id"],
-                },
-                "rotating_file": {
-                    "class": "logging.handlers.RotatingFileHandler",
-                    "level": "DEBUG",
-                    "formatter": "file",
-                    "filename": "app.log",
-                    "maxBytes": 1024 * 1024,  # 1 MB
-                    "backupCount": 2,
-                    "encoding": "utf8",
+                "queue": {
+                    "()": "app.logging_config.BoundedQueueHandler",
+                    "maxsize": config.LOG_QUEUE_SIZE,
                     "filters": ["correlation_id"],
                 },
             },
             "loggers": {
                 "app": {
-                    "handlers": ["default", "rotating_file"],
+                    "handlers": ["queue"],
                     "level": "DEBUG" if isinstance(config, DevConfig) else "INFO",
                     "propagate": False,
                 },
-                "uvicorn": {"handlers": ["default"], "level": "INFO"},
-                "databases": {"handlers": ["default"], "level": "WARNING"},
-                "aiosqlite": {"handlers": ["default"], "level": "WARNING"},
+                "uvicorn": {"handlers": ["queue"], "level": "INFO"},
+                "databases": {"handlers": ["queue"], "level": "WARNING"},
+                "aiosqlite": {"handlers": ["queue"], "level": "WARNING"},
             },
         }
     )
+    queue_handler = logging.getLogger("app").handlers[0]
+    listener = QueueListener(queue_handler.queue, *sink_handlers())
+    listener.start()
+
+
+def stop_logging():
+    """Write out the records still queued and stop the listener thread."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        listener = None
@@ -1,12 +1,21 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.exception_handlers import http_exception_handler
 import logging
 from asgi_correlation_id import CorrelationIdMiddleware
-from app.logging_config import configure_logging
-from app.database import database
-from app.routers.post import router as post_router
+from app.config import config
+from app.logging_config import configure_logging, stop_logging
+from app.database import connect_databases, disconnect_databases
+from app.metrics import MetricsMiddleware
+from app.security import bcrypt_executor, calibrate_bcrypt_rounds, set_bcrypt_rounds
+from app.routers.export import router as export_router
+from app.routers.feed import feed_catch_up, router as feed_router
+from app.routers.metrics import router as metrics_router
+from app.routers.post import like_buffer, router as post_router
+from app.routers.stats import router as stats_router
 from app.routers.user import router as user_router
+from app.tasks import email_worker, hot_compaction
 
 logger = logging.getLogger(__name__)
 
@@ -14,16 +23,41 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     configure_logging()
-    await database.connect()
+    if config.BCRYPT_TARGET_MS:
+        rounds = await asyncio.to_thread(
+            calibrate_bcrypt_rounds, config.BCRYPT_TARGET_MS
+        )
+        set_bcrypt_rounds(rounds)
+    await connect_databases()
+    if config.EMAIL_WORKER_ENABLED:
+        await email_worker.start()
+    if config.LIKE_BUFFER_ENABLED:
+        await like_buffer.start()
+    if config.HOT_COMPACTION_ENABLED:
+        await hot_compaction.start()
+    if config.FEED_CATCH_UP_ENABLED:
+        await feed_catch_up.start()
     yield
-    await database.disconnect()
+    await feed_catch_up.stop()
+    await hot_compaction.stop()
+    # Writes out the likes still buffered, before the database goes.
+    await like_buffer.stop()
+    await email_worker.stop()
+    await disconnect_databases()
+    bcrypt_executor.shutdown()
+    stop_logging()
 
 
 app = FastAPI(lifespan=lifespan)
 app.add_middleware(CorrelationIdMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(post_router)
 app.include_router(user_router)
+app.include_router(stats_router)
+app.include_router(export_router)
+app.include_router(feed_router)
+app.include_router(metrics_router)
 
 
 @app.exception_handler(HTTPException)
@@ -0,0 +1,221 @@
+import time
+from bisect import bisect_left
+from typing import Iterable, Iterator
+
+metrics: dict[str, "Metric"] = {}
+"""Every metric created in the process, by name, in creation order."""
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_pairs(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """A named family of samples, one per combination of label values.
+
+    Samples are plain numbers updated in place without locks: they are only
+    changed from the event loop thread.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        metrics[name] = self
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_label_pairs(self.labels, labels)} {value}"
+
+    def render(self) -> str:
+        return "\n".join(
+            [
+                f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.type}",
+                *self.samples(),
+            ]
+        )
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """Counts of observations per bucket upper bound, plus their sum."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        # Per label values: a count per bucket and one for +Inf, then the sum.
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def samples(self) -> Iterator[str]:
+        bounds = [*map(str, self.buckets), "+Inf"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                pairs = _label_pairs(self.labels, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{pairs} {cumulative}"
+            pairs = _label_pairs(self.labels, labels)
+            yield f"{self.name}_sum{pairs} {series[-1]}"
+            yield f"{self.name}_count{pairs} {cumulative}"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in metrics.values()) + "\n"
+
+
+http_requests = Counter(
+    "http_requests_total",
+    "Requests handled, by route template and status code.",
+    ("method", "route", "status"),
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route template.",
+    ("method", "route"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requests currently being handled.", ("method",)
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Time to run a database statement, by statement kind and table.",
+    ("statement",),
+)
+executor_call_duration = Histogram(
+    "executor_call_duration_seconds",
+    "Time spent running a call in a worker thread pool, bcrypt included.",
+    ("executor", "function"),
+)
+like_buffer_depth = Gauge(
+    "like_buffer_depth", "Likes acknowledged but not yet written to the database."
+)
+like_buffer_flush_duration = Histogram(
+    "like_buffer_flush_duration_seconds",
+    "Time to write the buffered likes in one transaction.",
+)
+likes_flushed = Counter(
+    "likes_flushed_total", "Buffered likes taken out of the buffer and written."
+)
+requests_shed = Counter(
+    "requests_shed_total",
+    "Requests rejected by a rate limiter or concurrency limit, by limiter.",
+    ("limiter",),
+)
+email_send_duration = Histogram(
+    "email_send_duration_seconds",
+    "Time to hand an email to the mail API, by outcome.",
+    ("outcome",),
+)
+
+
+class MetricsMiddleware:
+    """Records the latency, status code and concurrency of HTTP requests.
+
+    Requests are labelled with the template of the route that handled them,
+    e.g. `/posts/{post_id}`, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec(method)
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            http_request_duration.observe(elapsed, method, path)
+            http_requests.inc(method, path, status)
@@ -0,0 +1,58 @@
+"""Create the original users, posts, comments and likes tables."""
+
+import sqlalchemy
+
+TABLES = {
+    "users": """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER NOT NULL,
+            email VARCHAR,
+            password VARCHAR,
+            confirmed BOOLEAN,
+            PRIMARY KEY (id),
+            UNIQUE (email)
+        )
+    """,
+    "posts": """
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER NOT NULL,
+            body VARCHAR,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES users (id)
+        )
+    """,
+    "comments": """
+        CREATE TABLE IF NOT EXISTS comments (
+            id INTEGER NOT NULL,
+            body VARCHAR,
+            post_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(post_id) REFERENCES posts (id),
+            FOREIGN KEY(user_id) REFERENCES users (id)
+        )
+    """,
+    "likes": """
+        CREATE TABLE IF NOT EXISTS likes (
+            id INTEGER NOT NULL,
+            post_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(post_id) REFERENCES posts (id),
+            FOREIGN KEY(user_id) REFERENCES users (id)
+        )
+    """,
+}
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        for statement in TABLES.values():
+            connection.exec_driver_sql(statement)
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        for table in reversed(TABLES):
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
@@ -0,0 +1,52 @@
+"""Index the foreign keys of comments and likes, one like per user and post.
+
+Duplicate likes are removed, keeping the oldest, before the unique index on
+likes is built.
+"""
+
+import sqlalchemy
+
+from app.migrations import run_in_batches
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_comments_post_id ON comments (post_id)"
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_likes_user_id ON likes (user_id)"
+        )
+        # Lets the batched duplicate search below seek instead of scan.
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS tmp_likes_post_id_user_id"
+            " ON likes (post_id, user_id)"
+        )
+
+    run_in_batches(
+        engine,
+        "likes",
+        """
+        DELETE FROM likes
+        WHERE likes.id > :low AND likes.id <= :high AND EXISTS (
+            SELECT 1 FROM likes AS original
+            WHERE original.post_id = likes.post_id
+            AND original.user_id = likes.user_id
+            AND original.id < likes.id
+        )
+        """,
+    )
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_likes_post_id_user_id"
+            " ON likes (post_id, user_id)"
+        )
+        connection.exec_driver_sql("DROP INDEX IF EXISTS tmp_likes_post_id_user_id")
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ux_likes_post_id_user_id")
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_likes_user_id")
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_comments_post_id")
@@ -0,0 +1,38 @@
+"""Store the like count of every post in `posts.like_count`.
+
+Databases that already have the column get their counters recomputed, since
+duplicate likes removed by the previous migration were counted in them.
+"""
+
+import sqlalchemy
+
+from app.migrations import has_column, run_in_batches
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    if not has_column(engine, "posts", "like_count"):
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "ALTER TABLE posts ADD COLUMN like_count INTEGER NOT NULL DEFAULT 0"
+            )
+    run_in_batches(
+        engine,
+        "posts",
+        """
+        UPDATE posts
+        SET like_count = (SELECT count(*) FROM likes WHERE likes.post_id = posts.id)
+        WHERE posts.id > :low AND posts.id <= :high
+        AND like_count != (SELECT count(*) FROM likes WHERE likes.post_id = posts.id)
+        """,
+    )
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_posts_like_count_id"
+            " ON posts (like_count, id)"
+        )
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_posts_like_count_id")
+        connection.exec_driver_sql("ALTER TABLE posts DROP COLUMN like_count")
@@ -0,0 +1,32 @@
+"""Add the outbox that queues emails for the delivery worker."""
+
+import sqlalchemy
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            """
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id INTEGER NOT NULL,
+                recipient VARCHAR NOT NULL,
+                subject VARCHAR NOT NULL,
+                body VARCHAR NOT NULL,
+                status VARCHAR DEFAULT 'pending' NOT NULL,
+                attempts INTEGER DEFAULT '0' NOT NULL,
+                next_attempt_at FLOAT DEFAULT '0' NOT NULL,
+                sent_at FLOAT,
+                last_error VARCHAR,
+                PRIMARY KEY (id)
+            )
+            """
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_email_outbox_status_next_attempt_at"
+            " ON email_outbox (status, next_attempt_at)"
+        )
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS email_outbox")
@@ -0,0 +1,22 @@
+"""Add `posts.revision`, bumped by every write that changes how a post reads.
+
+It versions the post detail and comment list responses for conditional
+requests.
+"""
+
+import sqlalchemy
+
+from app.migrations import has_column
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    if not has_column(engine, "posts", "revision"):
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "ALTER TABLE posts ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"
+            )
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ALTER TABLE posts DROP COLUMN revision")
@@ -0,0 +1,32 @@
+"""Keep `posts.like_count` and `posts.revision` in step with the likes table
+through triggers, so a like or unlike is a single statement."""
+
+import sqlalchemy
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_likes_after_insert AFTER INSERT ON likes
+            BEGIN
+                UPDATE posts SET like_count = like_count + 1, revision = revision + 1
+                WHERE id = NEW.post_id;
+            END
+            """
+        )
+        connection.exec_driver_sql(
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_likes_after_delete AFTER DELETE ON likes
+            BEGIN
+                UPDATE posts SET like_count = like_count - 1, revision = revision + 1
+                WHERE id = OLD.post_id;
+            END
+            """
+        )
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS tr_likes_after_insert")
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS tr_likes_after_delete")
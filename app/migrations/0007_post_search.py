@@ -0,0 +1,56 @@
+"""Full-text index of post bodies, kept in step with the posts table through
+triggers and populated from the existing posts."""
+
+import sqlalchemy
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                body, content = 'posts', content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+            """
+        )
+        connection.exec_driver_sql(
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_posts_fts_after_insert AFTER INSERT ON posts
+            BEGIN
+                INSERT INTO posts_fts (rowid, body) VALUES (NEW.id, NEW.body);
+            END
+            """
+        )
+        connection.exec_driver_sql(
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_posts_fts_after_update
+            AFTER UPDATE OF body ON posts
+            BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, body)
+                VALUES ('delete', OLD.id, OLD.body);
+                INSERT INTO posts_fts (rowid, body) VALUES (NEW.id, NEW.body);
+            END
+            """
+        )
+        connection.exec_driver_sql(
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_posts_fts_after_delete AFTER DELETE ON posts
+            BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, body)
+                VALUES ('delete', OLD.id, OLD.body);
+            END
+            """
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')"
+        )
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        for trigger in ("insert", "update", "delete"):
+            connection.exec_driver_sql(
+                f"DROP TRIGGER IF EXISTS tr_posts_fts_after_{trigger}"
+            )
+        connection.exec_driver_sql("DROP TABLE IF EXISTS posts_fts")
@@ -0,0 +1,70 @@
+"""Add the follow graph, its follower counters and the home timelines that
+new posts are fanned out to."""
+
+import sqlalchemy
+
+from app.migrations import has_column
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    if not has_column(engine, "users", "follower_count"):
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "ALTER TABLE users ADD COLUMN follower_count INTEGER NOT NULL DEFAULT 0"
+            )
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_posts_user_id_id ON posts (user_id, id)"
+        )
+        connection.exec_driver_sql(
+            """
+            CREATE TABLE IF NOT EXISTS follows (
+                follower_id INTEGER NOT NULL,
+                followee_id INTEGER NOT NULL,
+                PRIMARY KEY (follower_id, followee_id),
+                FOREIGN KEY(follower_id) REFERENCES users (id),
+                FOREIGN KEY(followee_id) REFERENCES users (id)
+            ) WITHOUT ROWID
+            """
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_follows_followee_id_follower_id"
+            " ON follows (followee_id, follower_id)"
+        )
+        connection.exec_driver_sql(
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_follows_after_insert AFTER INSERT ON follows
+            BEGIN
+                UPDATE users SET follower_count = follower_count + 1
+                WHERE id = NEW.followee_id;
+            END
+            """
+        )
+        connection.exec_driver_sql(
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_follows_after_delete AFTER DELETE ON follows
+            BEGIN
+                UPDATE users SET follower_count = follower_count - 1
+                WHERE id = OLD.followee_id;
+            END
+            """
+        )
+        connection.exec_driver_sql(
+            """
+            CREATE TABLE IF NOT EXISTS timelines (
+                user_id INTEGER NOT NULL,
+                post_id INTEGER NOT NULL,
+                PRIMARY KEY (user_id, post_id),
+                FOREIGN KEY(user_id) REFERENCES users (id),
+                FOREIGN KEY(post_id) REFERENCES posts (id)
+            ) WITHOUT ROWID
+            """
+        )
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS timelines")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS follows")
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_posts_user_id_id")
+        connection.exec_driver_sql("ALTER TABLE users DROP COLUMN follower_count")
@@ -0,0 +1,76 @@
+"""Add the time-decayed `posts.hot_score`, raised by triggers on new posts,
+likes and comments, and its partial index. Existing posts stay out of the
+hot ranking until their next like or comment."""
+
+import sqlalchemy
+
+from app.migrations import has_column
+
+# log2(2 ** (now / half-life) + 2 ** hot_score), with a 12 hour half-life,
+# for an event of weight 2 ** {points}.
+EVENT = "(CAST(strftime('%s', 'now') AS REAL) / 43200 + {points})"
+HOT_SCORE_AFTER = f"""
+    CASE WHEN hot_score IS NULL THEN {EVENT}
+    ELSE max(hot_score, {EVENT}) + log2(1 + pow(2, -abs(hot_score - {EVENT})))
+    END
+"""
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    if not has_column(engine, "posts", "hot_score"):
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ALTER TABLE posts ADD COLUMN hot_score FLOAT")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_posts_hot_score_id ON posts (hot_score, id)"
+            " WHERE hot_score IS NOT NULL"
+        )
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS tr_likes_after_insert")
+        connection.exec_driver_sql(
+            f"""
+            CREATE TRIGGER tr_likes_after_insert AFTER INSERT ON likes
+            BEGIN
+                UPDATE posts SET like_count = like_count + 1, revision = revision + 1,
+                    hot_score = {HOT_SCORE_AFTER.format(points=0.0)}
+                WHERE id = NEW.post_id;
+            END
+            """
+        )
+        connection.exec_driver_sql(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS tr_comments_after_insert
+            AFTER INSERT ON comments
+            BEGIN
+                UPDATE posts SET hot_score = {HOT_SCORE_AFTER.format(points=1.0)}
+                WHERE id = NEW.post_id;
+            END
+            """
+        )
+        connection.exec_driver_sql(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS tr_posts_hot_after_insert
+            AFTER INSERT ON posts
+            BEGIN
+                UPDATE posts SET hot_score = {HOT_SCORE_AFTER.format(points=0.0)}
+                WHERE id = NEW.id;
+            END
+            """
+        )
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS tr_posts_hot_after_insert")
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS tr_comments_after_insert")
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS tr_likes_after_insert")
+        connection.exec_driver_sql(
+            """
+            CREATE TRIGGER tr_likes_after_insert AFTER INSERT ON likes
+            BEGIN
+                UPDATE posts SET like_count = like_count + 1, revision = revision + 1
+                WHERE id = NEW.post_id;
+            END
+            """
+        )
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_posts_hot_score_id")
+        connection.exec_driver_sql("ALTER TABLE posts DROP COLUMN hot_score")
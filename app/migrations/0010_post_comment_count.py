@@ -0,0 +1,77 @@
+"""Store the comment count of every post in `posts.comment_count`, kept up to
+date by triggers on comments."""
+
+import sqlalchemy
+
+from app.migrations import has_column, run_in_batches
+
+# log2(2 ** (now / half-life) + 2 ** hot_score), with a 12 hour half-life,
+# for a comment (an event of weight 2).
+COMMENT = "(CAST(strftime('%s', 'now') AS REAL) / 43200 + 1.0)"
+HOT_SCORE_AFTER_COMMENT = f"""
+    CASE WHEN hot_score IS NULL THEN {COMMENT}
+    ELSE max(hot_score, {COMMENT}) + log2(1 + pow(2, -abs(hot_score - {COMMENT})))
+    END
+"""
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    if not has_column(engine, "posts", "comment_count"):
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "ALTER TABLE posts ADD COLUMN comment_count INTEGER NOT NULL DEFAULT 0"
+            )
+    # The triggers go first, so comments added during the backfill are counted
+    # either by them or by the batch covering their post.
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS tr_comments_after_insert")
+        connection.exec_driver_sql(
+            f"""
+            CREATE TRIGGER tr_comments_after_insert AFTER INSERT ON comments
+            BEGIN
+                UPDATE posts SET comment_count = comment_count + 1,
+                    hot_score = {HOT_SCORE_AFTER_COMMENT}
+                WHERE id = NEW.post_id;
+            END
+            """
+        )
+        connection.exec_driver_sql(
+            """
+            CREATE TRIGGER IF NOT EXISTS tr_comments_after_delete
+            AFTER DELETE ON comments
+            BEGIN
+                UPDATE posts SET comment_count = comment_count - 1
+                WHERE id = OLD.post_id;
+            END
+            """
+        )
+    run_in_batches(
+        engine,
+        "posts",
+        """
+        UPDATE posts
+        SET comment_count = (
+            SELECT count(*) FROM comments WHERE comments.post_id = posts.id
+        )
+        WHERE posts.id > :low AND posts.id <= :high
+        AND comment_count != (
+            SELECT count(*) FROM comments WHERE comments.post_id = posts.id
+        )
+        """,
+    )
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS tr_comments_after_delete")
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS tr_comments_after_insert")
+        connection.exec_driver_sql(
+            f"""
+            CREATE TRIGGER tr_comments_after_insert AFTER INSERT ON comments
+            BEGIN
+                UPDATE posts SET hot_score = {HOT_SCORE_AFTER_COMMENT}
+                WHERE id = NEW.post_id;
+            END
+            """
+        )
+        connection.exec_driver_sql("ALTER TABLE posts DROP COLUMN comment_count")
@@ -0,0 +1,38 @@
+"""Record in `users.unfanned_post_id` the latest post each account wrote while
+it was not fanned out, so feeds keep merging its posts at read time until the
+feed catch-up job has copied them into its followers' timelines."""
+
+import sqlalchemy
+
+from app.config import config
+from app.migrations import has_column
+
+
+def upgrade(engine: sqlalchemy.Engine) -> None:
+    if not has_column(engine, "users", "unfanned_post_id"):
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "ALTER TABLE users ADD COLUMN unfanned_post_id INTEGER"
+            )
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_users_unfanned_post_id"
+            " ON users (unfanned_post_id) WHERE unfanned_post_id IS NOT NULL"
+        )
+        # Accounts over the limit so far wrote their posts without fan-out.
+        connection.exec_driver_sql(
+            """
+            UPDATE users
+            SET unfanned_post_id = (
+                SELECT max(id) FROM posts WHERE posts.user_id = users.id
+            )
+            WHERE follower_count > ? AND unfanned_post_id IS NULL
+            """,
+            (config.FEED_FANOUT_MAX_FOLLOWERS,),
+        )
+
+
+def downgrade(engine: sqlalchemy.Engine) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_users_unfanned_post_id")
+        connection.exec_driver_sql("ALTER TABLE users DROP COLUMN unfanned_post_id")
@@ -0,0 +1,103 @@
+"""Versioned schema migrations for existing databases.
+
+Each migration is a module in this package named ``<version>_<name>.py`` that
+defines ``upgrade(engine)`` and ``downgrade(engine)``. The version of the last
+applied migration is kept in the ``schema_version`` table. Migrations only run
+when invoked through ``python -m app.cli migrate`` / ``downgrade``.
+"""
+
+import importlib
+import logging
+import pkgutil
+from types import ModuleType
+
+import sqlalchemy
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_version"
+BATCH_SIZE = 10_000
+
+
+def load_migrations() -> dict[int, ModuleType]:
+    migrations = {}
+    for module_info in pkgutil.iter_modules(__path__):
+        version, _, _ = module_info.name.partition("_")
+        if version.isdigit():
+            migrations[int(version)] = importlib.import_module(
+                f"{__name__}.{module_info.name}"
+            )
+    return dict(sorted(migrations.items()))
+
+
+def current_version(engine: sqlalchemy.Engine) -> int:
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (version INTEGER NOT NULL)"
+        )
+        version = connection.exec_driver_sql(
+            f"SELECT max(version) FROM {VERSION_TABLE}"
+        ).scalar()
+    return version or 0
+
+
+def set_version(engine: sqlalchemy.Engine, version: int) -> None:
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"DELETE FROM {VERSION_TABLE}")
+        connection.exec_driver_sql(
+            f"INSERT INTO {VERSION_TABLE} (version) VALUES (?)", (version,)
+        )
+
+
+def upgrade(engine: sqlalchemy.Engine, target: int | None = None) -> int:
+    migrations = load_migrations()
+    target = max(migrations) if target is None else target
+    version = current_version(engine)
+    for number, migration in migrations.items():
+        if version < number <= target:
+            logger.info(f"Applying migration {migration.__name__}")
+            migration.upgrade(engine)
+            set_version(engine, number)
+            version = number
+    return version
+
+
+def downgrade(engine: sqlalchemy.Engine, target: int) -> int:
+    migrations = load_migrations()
+    numbers = [0, *migrations]
+    version = current_version(engine)
+    for previous, number in reversed(list(zip(numbers, numbers[1:]))):
+        if target < number <= version:
+            logger.info(f"Reverting migration {migrations[number].__name__}")
+            migrations[number].downgrade(engine)
+            set_version(engine, previous)
+            version = previous
+    return version
+
+
+def has_column(engine: sqlalchemy.Engine, table: str, column: str) -> bool:
+    columns = sqlalchemy.inspect(engine).get_columns(table)
+    return any(info["name"] == column for info in columns)
+
+
+def run_in_batches(
+    engine: sqlalchemy.Engine,
+    table: str,
+    statement: str,
+    batch_size: int | None = None,
+) -> None:
+    """Run `statement` over consecutive id ranges of `table`.
+
+    The statement receives each range as the `:low` (exclusive) and `:high`
+    (inclusive) parameters and every range is committed on its own, so
+    backfills on large tables never hold the write lock for long. Statements
+    must be idempotent, since an interrupted migration is simply re-run.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    with engine.connect() as connection:
+        max_id = connection.exec_driver_sql(f"SELECT max(id) FROM {table}").scalar()
+    for low in range(0, max_id or 0, batch_size):
+        with engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.text(statement), {"low": low, "high": low + batch_size}
+            )
@@ -0,0 +1,90 @@
+import base64
+import binascii
+import json
+from http import HTTPStatus
+from typing import Any, Sequence
+
+import sqlalchemy
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def invalid_cursor_exception() -> HTTPException:
+    return HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
+
+
+def encode_cursor(sorting: str, values: Sequence[Any]) -> str:
+    """Pack the sort key of the last row of a page into an opaque token."""
+    payload = json.dumps({"s": sorting, "k": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, sorting: str, size: int, types: tuple[type, ...] = (int,)
+) -> list:
+    """Unpack a cursor, rejecting tokens issued for a different sort order or
+    holding values not of `types`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = payload["k"]
+        valid = payload["s"] == sorting and len(values) == size
+    except (binascii.Error, ValueError, UnicodeError, KeyError, TypeError) as e:
+        raise invalid_cursor_exception() from e
+    if not valid or not all(isinstance(value, types) for value in values):
+        raise invalid_cursor_exception()
+    return values
+
+
+def _after(column: sqlalchemy.ColumnElement, value: Any, descending: bool):
+    return column < value if descending else column > value
+
+
+def keyset_page(
+    query: sqlalchemy.Select,
+    key: dict[str, sqlalchemy.ColumnElement],
+    descending: bool,
+    values: Sequence[Any] | None,
+    limit: int,
+) -> sqlalchemy.Select | sqlalchemy.CompoundSelect:
+    """Up to `limit` rows of `query` in `key` order, after the row with `values`.
+
+    `key` maps result column names to the columns to sort on, the last one
+    being unique. A row-value comparison only bounds the leading column of a
+    composite index in SQLite, so deep pages inside a large group of ties
+    would scan the whole group. Composite keys are therefore split into a
+    seek within the current tie group and a seek past it, both index range
+    scans, whose (at most 2 * `limit`) rows are merged.
+    """
+    names, columns = list(key), list(key.values())
+    direction = sqlalchemy.desc if descending else sqlalchemy.asc
+    if values is None:
+        return query.order_by(*map(direction, columns)).limit(limit)
+    if len(columns) == 1:
+        return (
+            query.where(_after(columns[0], values[0], descending))
+            .order_by(direction(columns[0]))
+            .limit(limit)
+        )
+
+    ties = keyset_page(
+        query.where(columns[0] == values[0]),
+        dict(list(key.items())[1:]),
+        descending,
+        values[1:],
+        limit,
+    )
+    beyond = (
+        query.where(_after(columns[0], values[0], descending))
+        .order_by(*map(direction, columns))
+        .limit(limit)
+    )
+    return (
+        sqlalchemy.union_all(
+            sqlalchemy.select(ties.subquery()), sqlalchemy.select(beyond.subquery())
+        )
+        .order_by(*(direction(sqlalchemy.literal_column(name)) for name in names))
+        .limit(limit)
+    )
@@ -0,0 +1,116 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from typing import AsyncIterator, Callable, Hashable
+
+from fastapi import HTTPException
+
+from app.metrics import requests_shed
+
+logger = logging.getLogger(__name__)
+
+limiters: dict[str, "TokenBucketLimiter"] = {}
+"""Every rate limiter created in the process, by name."""
+
+
+def too_many_requests_exception(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.TOO_MANY_REQUESTS,
+        detail="Too many requests, please try again later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class TokenBucketLimiter:
+    """Allows `burst` requests per key at once, refilled at `rate` per second.
+
+    A key costs one (tokens, timestamp) entry, refilled lazily when the key
+    is next seen. Entries are kept in least recently seen order: those idle
+    long enough to have refilled completely are equivalent to no entry and
+    are evicted as other keys come in, and past `max_keys` the least recently
+    seen entry goes regardless. Not thread-safe; meant for the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_keys: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self.idle_seconds = burst / rate
+        self._buckets: OrderedDict[Hashable, tuple[float, float]] = OrderedDict()
+        limiters[name] = self
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: Hashable) -> float:
+        """Spend a token of `key`. Returns 0 if there was one, otherwise the
+        seconds until there will be."""
+        now = self.clock()
+        buckets = self._buckets
+        entry = buckets.pop(key, None)
+        if entry is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, entry[0] + (now - entry[1]) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        buckets[key] = (tokens, now)
+
+        # At most a couple of entries per call on average: each is evicted once.
+        idle_since = now - self.idle_seconds
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if oldest[1] > idle_since and len(buckets) <= self.max_keys:
+                break
+            buckets.popitem(last=False)
+        return wait
+
+    def check(self, key: Hashable) -> None:
+        """Spend a token of `key`, or fail with 429 Too Many Requests."""
+        wait = self.take(key)
+        if wait:
+            logger.warning(f"Rate limit '{self.name}' exceeded")
+            requests_shed.inc(self.name)
+            raise too_many_requests_exception(wait)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class ConcurrencyLimit:
+    """Dependency admitting at most `max_concurrent` requests at a time;
+    others fail with 503 Service Unavailable before doing any work."""
+
+    def __init__(self, name: str, max_concurrent: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+
+    async def __call__(self) -> AsyncIterator[None]:
+        if self.in_flight >= self.max_concurrent:
+            logger.warning(f"Concurrency limit '{self.name}' reached, shedding")
+            requests_shed.inc(self.name)
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again later",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,87 @@
+from http import HTTPStatus
+import logging
+from typing import Annotated, AsyncIterator
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+import sqlalchemy
+
+from app.config import config
+from app.database import comment_table, like_table, post_table, read_database
+from app.pagination import keyset_page
+from app.routers.post import select_post_and_likes
+from app.schemas.post import CommentRead, LikeRead, PostWithLikes
+from app.security import get_authenticated_user
+from app.serialization import encode_json, row_dicts
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"],
+    dependencies=[Depends(get_authenticated_user)],
+)
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+
+
+async def stream_ndjson(
+    query: sqlalchemy.Select,
+    id_column: sqlalchemy.Column,
+    schema: type[BaseModel],
+    since_id: int,
+) -> AsyncIterator[bytes]:
+    """Yield the rows of `query` after `since_id` as JSON lines, in id order.
+
+    Rows are read in short keyset batches of EXPORT_CHUNK_SIZE, one chunk of
+    output each, so memory stays constant and no read transaction is held
+    open for the whole export.
+    """
+    chunk_size = config.EXPORT_CHUNK_SIZE
+    last_id = since_id
+    while True:
+        page = keyset_page(query, {"id": id_column}, False, [last_id], chunk_size)
+        logger.debug(page)
+        rows = await read_database.fetch_all(page)
+        if not rows:
+            return
+        yield b"".join(encode_json(row) + b"\n" for row in row_dicts(rows, schema))
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1].id
+
+
+@router.get("/posts.ndjson", name="Export posts", status_code=HTTPStatus.OK)
+async def export_posts(
+    since_id: Annotated[int, Query(ge=0)] = 0,
+) -> StreamingResponse:
+    logger.info(f"Exporting posts after id {since_id}")
+    return StreamingResponse(
+        stream_ndjson(select_post_and_likes, post_table.c.id, PostWithLikes, since_id),
+        media_type=NDJSON,
+    )
+
+
+@router.get("/comments.ndjson", name="Export comments", status_code=HTTPStatus.OK)
+async def export_comments(
+    since_id: Annotated[int, Query(ge=0)] = 0,
+) -> StreamingResponse:
+    logger.info(f"Exporting comments after id {since_id}")
+    return StreamingResponse(
+        stream_ndjson(
+            comment_table.select(), comment_table.c.id, CommentRead, since_id
+        ),
+        media_type=NDJSON,
+    )
+
+
+@router.get("/likes.ndjson", name="Export likes", status_code=HTTPStatus.OK)
+async def export_likes(
+    since_id: Annotated[int, Query(ge=0)] = 0,
+) -> StreamingResponse:
+    logger.info(f"Exporting likes after id {since_id}")
+    return StreamingResponse(
+        stream_ndjson(like_table.select(), like_table.c.id, LikeRead, since_id),
+        media_type=NDJSON,
+    )
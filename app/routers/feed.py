@@ -0,0 +1,298 @@
+from http import HTTPStatus
+import logging
+import sqlite3
+from typing import Annotated, Optional
+
+import sqlalchemy
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.config import config
+from app.database import (
+    database,
+    follow_table,
+    post_table,
+    read_database,
+    timeline_table,
+    user_table,
+)
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+)
+from app.routers.post import is_fanned_out, select_post_and_likes
+from app.schemas.post import PostPage, PostWithLikes
+from app.schemas.user import FollowRead, UserRead
+from app.security import get_authenticated_user
+from app.serialization import json_response, row_dicts
+from app.tasks import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Feed"])
+
+# Feeds are newest first, their cursors carry the post id.
+FEED_SORTING = "feed"
+
+
+def backfill_query(follower_id: int, followee_id: int) -> sqlalchemy.Insert:
+    """Copy the latest posts of a newly followed account to the timeline."""
+    recent = (
+        sqlalchemy.select(sqlalchemy.literal(follower_id), post_table.c.id)
+        .where(post_table.c.user_id == followee_id, is_fanned_out(followee_id))
+        .order_by(post_table.c.id.desc())
+        .limit(config.FEED_BACKFILL_POSTS)
+    )
+    return (
+        timeline_table.insert()
+        .prefix_with("OR IGNORE")
+        .from_select(["user_id", "post_id"], recent)
+    )
+
+
+def catch_up_query(
+    followee_id: int, first_follower_id: int, last_follower_id: int
+) -> sqlalchemy.Insert:
+    """Copy the latest posts of an account that is fanned out again to the
+    timelines of its followers with ids in a range, since those it wrote while
+    it was not fanned out would no longer be merged into their feeds."""
+    recent = (
+        sqlalchemy.select(post_table.c.id)
+        .where(post_table.c.user_id == followee_id)
+        .order_by(post_table.c.id.desc())
+        .limit(config.FEED_BACKFILL_POSTS)
+        .subquery()
+    )
+    entries = (
+        sqlalchemy.select(follow_table.c.follower_id, recent.c.id)
+        .join(recent, sqlalchemy.true())
+        .where(
+            follow_table.c.followee_id == followee_id,
+            follow_table.c.follower_id.between(first_follower_id, last_follower_id),
+        )
+    )
+    return (
+        timeline_table.insert()
+        .prefix_with("OR IGNORE")
+        .from_select(["user_id", "post_id"], entries)
+    )
+
+
+def followers_query(user_id: int, after: int, limit: int) -> sqlalchemy.Select:
+    """Ids of the next `limit` followers of `user_id` after the id `after`."""
+    return (
+        sqlalchemy.select(follow_table.c.follower_id)
+        .where(
+            follow_table.c.followee_id == user_id,
+            follow_table.c.follower_id > after,
+        )
+        .order_by(follow_table.c.follower_id)
+        .limit(limit)
+    )
+
+
+async def catch_up_feeds(batch_size: int | None = None) -> int:
+    """Copy the latest posts of the accounts back under the fan-out limit that
+    wrote posts while over it into their followers' timelines, about
+    `batch_size` entries per transaction (FEED_CATCH_UP_BATCH_SIZE by
+    default), then stop merging them into feeds at read time. Returns the
+    number of accounts caught up."""
+    batch_size = config.FEED_CATCH_UP_BATCH_SIZE if batch_size is None else batch_size
+    followers_per_batch = max(1, batch_size // config.FEED_BACKFILL_POSTS)
+    pending = sqlalchemy.select(user_table.c.id, user_table.c.unfanned_post_id).where(
+        user_table.c.unfanned_post_id.is_not(None),
+        user_table.c.follower_count <= config.FEED_FANOUT_MAX_FOLLOWERS,
+    )
+    accounts = await database.fetch_all(pending)
+    for account in accounts:
+        after = 0
+        while True:
+            async with database.transaction():
+                followers = await database.fetch_all(
+                    followers_query(account.id, after, followers_per_batch)
+                )
+                if followers:
+                    await database.execute(
+                        catch_up_query(
+                            account.id,
+                            followers[0].follower_id,
+                            followers[-1].follower_id,
+                        )
+                    )
+            if len(followers) < followers_per_batch:
+                break
+            after = followers[-1].follower_id
+        # Unless the account went over the limit and posted again meanwhile.
+        query = (
+            user_table.update()
+            .where(
+                user_table.c.id == account.id,
+                user_table.c.unfanned_post_id == account.unfanned_post_id,
+            )
+            .values(unfanned_post_id=None)
+        )
+        await database.execute(query)
+    if accounts:
+        logger.info(f"Caught up the feeds of the followers of {len(accounts)} accounts")
+    return len(accounts)
+
+
+feed_catch_up = PeriodicTask(catch_up_feeds, config.FEED_CATCH_UP_INTERVAL)
+
+
+def celebrity_followees_query(user_id: int) -> sqlalchemy.Select:
+    """Followed accounts whose posts are not fanned out, or not yet caught up
+    since they are fanned out again."""
+    return (
+        sqlalchemy.select(follow_table.c.followee_id)
+        .join(user_table, user_table.c.id == follow_table.c.followee_id)
+        .where(
+            follow_table.c.follower_id == user_id,
+            sqlalchemy.or_(
+                user_table.c.follower_count > config.FEED_FANOUT_MAX_FOLLOWERS,
+                user_table.c.unfanned_post_id.is_not(None),
+            ),
+        )
+    )
+
+
+def feed_query(
+    user_id: int, celebrities: list[int], before: int | None, limit: int
+) -> sqlalchemy.Select:
+    """Newest posts of the home timeline of `user_id`, merged with those of
+    the followed `celebrities`, older than the post id `before`.
+
+    Each source is an index range scan of at most `limit` ids: the timeline
+    primary key, and posts by author for every celebrity.
+    """
+
+    def newest(query: sqlalchemy.Select, column) -> sqlalchemy.Select:
+        if before is not None:
+            query = query.where(column < before)
+        return query.order_by(column.desc()).limit(limit)
+
+    sources = [
+        newest(
+            sqlalchemy.select(timeline_table.c.post_id.label("id")).where(
+                timeline_table.c.user_id == user_id
+            ),
+            timeline_table.c.post_id,
+        )
+    ]
+    for author_id in celebrities:
+        sources.append(
+            newest(
+                sqlalchemy.select(post_table.c.id).where(
+                    post_table.c.user_id == author_id
+                ),
+                post_table.c.id,
+            )
+        )
+    if len(sources) == 1:
+        ids = sources[0].subquery()
+    else:
+        # A post can be in the timeline and by a celebrity if its author
+        # crossed the threshold after writing it.
+        ids = sqlalchemy.union(
+            *(sqlalchemy.select(source.subquery()) for source in sources)
+        ).subquery()
+    return (
+        select_post_and_likes.select_from(
+            ids.join(post_table, post_table.c.id == ids.c.id)
+        )
+        .order_by(ids.c.id.desc())
+        .limit(limit)
+    )
+
+
+@router.post(
+    "/users/{user_id}/follow", name="Follow user", status_code=HTTPStatus.CREATED
+)
+async def follow_user(
+    user_id: int, current_user: Annotated[UserRead, Depends(get_authenticated_user)]
+) -> FollowRead:
+    logger.info("Following user")
+    if user_id == current_user.id:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="Cannot follow yourself"
+        )
+    query = (
+        follow_table.insert()
+        .from_select(
+            ["follower_id", "followee_id"],
+            sqlalchemy.select(
+                sqlalchemy.literal(current_user.id), user_table.c.id
+            ).where(user_table.c.id == user_id),
+        )
+        .returning(follow_table.c.followee_id)
+    )
+    logger.debug(query)
+    async with database.transaction():
+        try:
+            followed = await database.fetch_one(query)
+        except sqlite3.IntegrityError as e:
+            raise HTTPException(
+                status_code=HTTPStatus.CONFLICT, detail="User already followed"
+            ) from e
+        if followed is None:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="User not found"
+            )
+        await database.execute(backfill_query(current_user.id, user_id))
+    return FollowRead(follower_id=current_user.id, followee_id=user_id)
+
+
+@router.delete(
+    "/users/{user_id}/follow", name="Unfollow user", status_code=HTTPStatus.NO_CONTENT
+)
+async def unfollow_user(
+    user_id: int, current_user: Annotated[UserRead, Depends(get_authenticated_user)]
+) -> None:
+    """Stop following a user, succeeding whether or not they were followed."""
+    logger.info("Unfollowing user")
+    query = (
+        follow_table.delete()
+        .where(
+            follow_table.c.follower_id == current_user.id,
+            follow_table.c.followee_id == user_id,
+        )
+        .returning(follow_table.c.followee_id)
+    )
+    entries = timeline_table.delete().where(
+        timeline_table.c.user_id == current_user.id,
+        timeline_table.c.post_id.in_(
+            sqlalchemy.select(post_table.c.id).where(post_table.c.user_id == user_id)
+        ),
+    )
+    logger.debug(query)
+    async with database.transaction():
+        if await database.fetch_one(query) is not None:
+            await database.execute(entries)
+
+
+@router.get("/feed", name="Home feed", status_code=HTTPStatus.OK)
+async def read_feed(
+    current_user: Annotated[UserRead, Depends(get_authenticated_user)],
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> PostPage:
+    """Posts of the current user and the accounts they follow, newest first."""
+    logger.info("Getting home feed")
+    before = decode_cursor(cursor, FEED_SORTING, 1)[0] if cursor else None
+    celebrities = await read_database.fetch_all(
+        celebrity_followees_query(current_user.id)
+    )
+    query = feed_query(
+        current_user.id, [row.followee_id for row in celebrities], before, limit + 1
+    )
+    logger.debug(query)
+    posts = await read_database.fetch_all(query)
+
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(FEED_SORTING, (posts[-1].id,))
+    return json_response(
+        {"posts": row_dicts(posts, PostWithLikes), "next_cursor": next_cursor}
+    )
@@ -0,0 +1,25 @@
+from http import HTTPStatus
+import logging
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Stats"])
+
+
+@router.get(
+    "/metrics",
+    name="Metrics",
+    status_code=HTTPStatus.OK,
+    response_class=PlainTextResponse,
+)
+async def read_metrics() -> PlainTextResponse:
+    """Request, query, bcrypt and email latencies in the Prometheus text
+    format. Each worker process reports its own."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,22 +1,55 @@
 from http import HTTPStatus
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Annotated
+from fastapi import APIRouter, Body, HTTPException, Depends, Header, Query
+from fastapi.responses import Response
+from typing import Annotated, Optional
 from enum import Enum
 import logging
+import sqlite3
+import orjson
 import sqlalchemy
 
-from app.database import database, post_table, comment_table, like_table
+from app.cache import CachedResponse, PageSpan, ResponseCache
+from app.config import config
+from app.like_buffer import LikeBuffer
+from app.database import (
+    comment_table,
+    database,
+    follow_table,
+    like_table,
+    post_table,
+    read_database,
+    timeline_table,
+    user_table,
+)
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+)
 from app.schemas.post import (
+    BatchCreated,
+    CommentPage,
     PostCreate,
     PostRead,
     CommentCreate,
     CommentRead,
+    LikeAccepted,
     LikeRead,
+    ListedPostPage,
+    PostPage,
     PostWithLikes,
+    PostWithLikesAndCommentCount,
     PostWithCommentsAndLikes,
 )
 from app.schemas.user import UserRead
-from app.security import get_authenticated_user
+from app.serialization import json_response, row_dicts, validated_dicts
+from app.security import (
+    get_authenticated_user,
+    optional_oauth2_scheme,
+    unauthorized_exception,
+)
 
 router = APIRouter(
     prefix="/posts",
@@ -25,10 +58,8 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
-select_post_and_likes = (
-    sqlalchemy.select(post_table, sqlalchemy.func.count(like_table.c.id).label("likes"))
-    .select_from(post_table.outerjoin(like_table))
-    .group_by(post_table.c.id)
+select_post_and_likes = sqlalchemy.select(
+    post_table, post_table.c.like_count.label("likes")
 )
 
 
@@ -36,13 +67,181 @@ class PostSorting(Enum):
     newest = "-id"
     oldest = "+id"
     most_likes = "-likes"
+    hot = "-hot"
 
 
-async def find_post(post_id: int) -> dict:
-    logger.info(f"Finding post with id {post_id}")
-    query = post_table.select().where(post_table.c.id == post_id)
-    logger.debug(query)
-    return await database.fetch_one(query)
+class PostField(Enum):
+    """Optional fields of the posts of `GET /posts`."""
+
+    comment_count = "comment_count"
+    liked_by_me = "liked_by_me"
+
+
+# Comments are listed oldest first, their cursors carry the comment id.
+COMMENTS_SORTING = "+id"
+
+post_sort_columns = {
+    "id": post_table.c.id,
+    "likes": post_table.c.like_count,
+    "hot_score": post_table.c.hot_score,
+}
+
+# Sort key (with the id last, as tie-breaker) and direction for each sorting.
+post_sort_keys = {
+    PostSorting.newest: (("id",), True),
+    PostSorting.oldest: (("id",), False),
+    PostSorting.most_likes: (("likes", "id"), True),
+    PostSorting.hot: (("hot_score", "id"), True),
+}
+
+
+def listing_query(sorting: PostSorting) -> sqlalchemy.Select:
+    """Posts and like counts listed in `sorting`, before ordering and paging."""
+    if sorting is PostSorting.hot:
+        # Posts compacted out of the hot ranking are not in its index.
+        return select_post_and_likes.where(post_table.c.hot_score.is_not(None))
+    return select_post_and_likes
+
+
+def listing_name(sorting: PostSorting, comment_counts: bool = False) -> tuple:
+    """Name of a listing in the response cache. Pages with comment counts
+    are cached apart, as only they change with new comments."""
+    if comment_counts:
+        return ("posts", sorting.value, PostField.comment_count.value)
+    return ("posts", sorting.value)
+
+
+response_cache = ResponseCache(
+    "responses", config.RESPONSE_CACHE_MAX_BYTES, config.RESPONSE_CACHE_TTL
+)
+
+
+def post_etag(post_id: int, revision: int) -> str:
+    return f'"{post_id}.{revision}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=HTTPStatus.NOT_MODIFIED, headers={"ETag": etag})
+
+
+def cached_response(key: tuple, if_none_match: str | None = None) -> Response | None:
+    if not config.RESPONSE_CACHE_ENABLED:
+        return None
+    cached = response_cache.get(key)
+    if cached is None:
+        return None
+    etag = cached.headers.get("ETag")
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return Response(cached.body, media_type="application/json", headers=cached.headers)
+
+
+def cache_response(
+    key: tuple,
+    content: dict,
+    snapshot: tuple[int, int],
+    span: PageSpan | None = None,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """Render `content` as JSON and keep the body for later requests."""
+    response = json_response(content, headers)
+    if config.RESPONSE_CACHE_ENABLED:
+        response_cache.set(
+            key, CachedResponse(response.body, headers or {}, span), snapshot=snapshot
+        )
+    return response
+
+
+def expire_post_detail(post_id: int, comment_id: int = 0, grace: float = 0.0) -> None:
+    """Expire the cached details of a post whose first page of comments
+    includes `comment_id`; the default of 0 sorts before any comment, so it
+    reaches them all."""
+    response_cache.expire_pages(("post", post_id), (comment_id,), grace)
+
+
+def expire_post_listings(
+    post_id: int,
+    likes: tuple[int, ...] = (),
+    grace: float = 0.0,
+    comment_counts: tuple[bool, ...] = (False, True),
+) -> None:
+    """Expire the cached listing pages a post appears on, with or without
+    comment counts as given by `comment_counts`.
+
+    `likes` are the like counts the post is (or was) sorted by in the
+    most_likes listing.
+    """
+    for with_counts in comment_counts:
+        for sorting in (PostSorting.newest, PostSorting.oldest):
+            response_cache.expire_pages(
+                listing_name(sorting, with_counts), (post_id,), grace
+            )
+        for count in likes:
+            response_cache.expire_pages(
+                listing_name(PostSorting.most_likes, with_counts),
+                (count, post_id),
+                grace,
+            )
+
+
+def expire_post_responses(
+    post_id: int, likes: tuple[int, ...] = (), grace: float = 0.0
+) -> None:
+    """Expire the cached detail of a post and the listing pages it appears on."""
+    expire_post_detail(post_id, grace=grace)
+    expire_post_listings(post_id, likes, grace)
+
+
+def is_fanned_out(user_id: int) -> sqlalchemy.ColumnElement:
+    """Whether new posts of `user_id` are written to their followers' home
+    timelines. Feeds read the posts of accounts with more followers than
+    FEED_FANOUT_MAX_FOLLOWERS directly instead."""
+    follower_count = (
+        sqlalchemy.select(user_table.c.follower_count)
+        .where(user_table.c.id == user_id)
+        .scalar_subquery()
+    )
+    return follower_count <= config.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def fan_out_query(user_id: int, first_id: int, last_id: int) -> sqlalchemy.Insert:
+    """Home timeline entries for the posts of `user_id` with ids in a range:
+    one for the author, and one per follower if the author is fanned out."""
+    written = sqlalchemy.and_(
+        post_table.c.user_id == user_id, post_table.c.id.between(first_id, last_id)
+    )
+    entries = sqlalchemy.union_all(
+        sqlalchemy.select(sqlalchemy.literal(user_id), post_table.c.id).where(written),
+        sqlalchemy.select(follow_table.c.follower_id, post_table.c.id)
+        .join(follow_table, follow_table.c.followee_id == post_table.c.user_id)
+        .where(written, is_fanned_out(user_id)),
+    )
+    return timeline_table.insert().from_select(["user_id", "post_id"], entries)
+
+
+def mark_unfanned_query(user_id: int, last_id: int) -> sqlalchemy.Update:
+    """Record `last_id` as the latest post of `user_id` written while they are
+    not fanned out, keeping their posts merged into feeds at read time until
+    the feed catch-up job has copied them into the timelines."""
+    return (
+        user_table.update()
+        .where(
+            user_table.c.id == user_id,
+            user_table.c.follower_count > config.FEED_FANOUT_MAX_FOLLOWERS,
+        )
+        .values(unfanned_post_id=last_id)
+    )
 
 
 @router.post("", name="Create post", status_code=HTTPStatus.CREATED)
@@ -53,22 +252,197 @@ async def create_post(
     data = {**post.model_dump(), "user_id": current_user.id}
     query = post_table.insert().values(data)
     logger.debug(query)
-    last_record_id = await database.execute(query)
+    async with database.transaction():
+        last_record_id = await database.execute(query)
+        await database.execute(
+            fan_out_query(current_user.id, last_record_id, last_record_id)
+        )
+        await database.execute(mark_unfanned_query(current_user.id, last_record_id))
+    expire_post_responses(last_record_id, likes=(0,))
     new_post = {**data, "id": last_record_id}
     return PostRead(**new_post)
 
 
+@router.post(":batch", name="Create posts", status_code=HTTPStatus.CREATED)
+async def create_posts(
+    posts: Annotated[
+        list[PostCreate], Body(min_length=1, max_length=config.BATCH_MAX_ITEMS)
+    ],
+    current_user: Annotated[UserRead, Depends(get_authenticated_user)],
+) -> BatchCreated:
+    """Create several posts in one statement, returning their ids in order.
+
+    The batch is all or nothing: if any item is invalid the request fails with
+    422 and no post is created.
+    """
+    logger.info(f"Creating {len(posts)} posts")
+    query = (
+        post_table.insert()
+        .values([{**post.model_dump(), "user_id": current_user.id} for post in posts])
+        .returning(post_table.c.id)
+    )
+    logger.debug(query)
+    async with database.transaction():
+        rows = await database.fetch_all(query)
+        # Rowids are assigned in VALUES order, RETURNING rows come in any order.
+        ids = sorted(row.id for row in rows)
+        await database.execute(fan_out_query(current_user.id, ids[0], ids[-1]))
+        await database.execute(mark_unfanned_query(current_user.id, ids[-1]))
+    for post_id in ids:
+        expire_post_responses(post_id, likes=(0,))
+    return BatchCreated(ids=ids)
+
+
+def liked_post_ids_query(user_id: int, post_ids: list[int]) -> sqlalchemy.Select:
+    """Which of `post_ids` `user_id` liked, in one lookup of the likes index
+    per post."""
+    return sqlalchemy.select(like_table.c.post_id).where(
+        like_table.c.post_id.in_(post_ids), like_table.c.user_id == user_id
+    )
+
+
+async def mark_liked_posts(posts: list[dict], user_id: int) -> None:
+    """Set `liked_by_me` on a page of posts, counting likes not yet written
+    by the like buffer."""
+    if not posts:
+        return
+    query = liked_post_ids_query(user_id, [post["id"] for post in posts])
+    logger.debug(query)
+    liked = {row.post_id for row in await read_database.fetch_all(query)}
+    for post in posts:
+        post["liked_by_me"] = (
+            post["id"] in liked or (post["id"], user_id) in like_buffer
+        )
+
+
+async def listing_page(
+    sorting: PostSorting, limit: int, cursor: str | None, comment_counts: bool
+) -> Response:
+    key, descending = post_sort_keys[sorting]
+    hot = sorting is PostSorting.hot
+    types = (float, int) if hot else (int,)
+    values = decode_cursor(cursor, sorting.value, len(key), types) if cursor else None
+    listing = listing_name(sorting, comment_counts)
+    # Every like or comment may reorder the hot listing, so it is not cached.
+    cache_key = (*listing, cursor, limit)
+    if not hot and (response := cached_response(cache_key)) is not None:
+        return response
+
+    snapshot = response_cache.snapshot()
+    query = keyset_page(
+        listing_query(sorting),
+        {name: post_sort_columns[name] for name in key},
+        descending,
+        values,
+        limit + 1,
+    )
+    logger.debug(query)
+    posts = await read_database.fetch_all(query)
+
+    next_cursor = last = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        last = tuple(getattr(posts[-1], name) for name in key)
+        next_cursor = encode_cursor(sorting.value, last)
+    span = PageSpan(listing, descending, tuple(values) if values else None, last)
+    model = PostWithLikesAndCommentCount if comment_counts else PostWithLikes
+    content = {"posts": row_dicts(posts, model), "next_cursor": next_cursor}
+    if hot:
+        return json_response(content)
+    return cache_response(cache_key, content, snapshot, span)
+
+
 @router.get("", name="List posts", status_code=HTTPStatus.OK)
-async def list_posts(sorting: PostSorting = PostSorting.newest) -> List[PostWithLikes]:
+async def list_posts(
+    token: Annotated[str | None, Depends(optional_oauth2_scheme)],
+    sorting: PostSorting = PostSorting.newest,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include: Annotated[list[PostField], Query()] = [],
+) -> ListedPostPage:
+    """List posts. Pass `include=comment_count` and, when authenticated,
+    `include=liked_by_me` to add those fields to every post, for the whole
+    page at once. The bearer token is only checked for `liked_by_me`, so
+    clients that always send theirs still list posts once it has expired."""
     logger.info("Getting all posts")
-    if sorting == PostSorting.newest:
-        query = select_post_and_likes.order_by(post_table.c.id.desc())
-    elif sorting == PostSorting.oldest:
-        query = select_post_and_likes.order_by(post_table.c.id)
-    elif sorting == PostSorting.most_likes:
-        query = select_post_and_likes.order_by(sqlalchemy.desc("likes"))
+    liked_by_me = PostField.liked_by_me in include
+    if liked_by_me:
+        if token is None:
+            raise unauthorized_exception("Not authenticated")
+        current_user = await get_authenticated_user(token)
+    response = await listing_page(
+        sorting, limit, cursor, PostField.comment_count in include
+    )
+    if not liked_by_me or response.status_code != HTTPStatus.OK:
+        return response
+    # The page itself is shared by all viewers; only their likes are added.
+    content = orjson.loads(response.body)
+    await mark_liked_posts(content["posts"], current_user.id)
+    return json_response(content)
+
+
+def search_statement(after: str = "") -> sqlalchemy.TextClause:
+    """Posts matching an FTS5 query with their relevance score, best first.
+
+    bm25 gives negative scores, lower being more relevant; multiplying them
+    by 1 + like_boost * ln(1 + likes) moves popular posts up.
+    """
+    return sqlalchemy.text(
+        f"""
+        SELECT id, body, user_id, likes, score FROM (
+            SELECT posts.id, posts.body, posts.user_id, posts.like_count AS likes,
+                bm25(posts_fts) * (1 + :like_boost * ln(1 + posts.like_count)) AS score
+            FROM posts_fts JOIN posts ON posts.id = posts_fts.rowid
+            WHERE posts_fts MATCH :match
+        )
+        {after}
+        ORDER BY score, id
+        LIMIT :limit
+        """
+    )
+
+
+search_query = search_statement()
+search_after_query = search_statement(
+    "WHERE score > :score OR (score = :score AND id > :id)"
+)
+
+
+def match_expression(q: str) -> str:
+    """FTS5 query for posts containing every word of `q`, taken literally."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+@router.get("/search", name="Search posts", status_code=HTTPStatus.OK)
+async def search_posts(
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    like_boost: Annotated[float, Query(ge=0, le=10)] = 0.0,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> PostPage:
+    """Posts whose body contains every word of `q`, most relevant first."""
+    logger.info("Searching posts")
+    sorting = f"bm25:{like_boost}"
+    values = decode_cursor(cursor, sorting, 2, (int, float)) if cursor else None
+    match = match_expression(q)
+    if not match:
+        return json_response({"posts": [], "next_cursor": None})
+
+    params = {"match": match, "like_boost": like_boost, "limit": limit + 1}
+    if values:
+        query = search_after_query.bindparams(**params, score=values[0], id=values[1])
+    else:
+        query = search_query.bindparams(**params)
     logger.debug(query)
-    return await database.fetch_all(query)
+    posts = await read_database.fetch_all(query)
+
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(sorting, (posts[-1].score, posts[-1].id))
+    return json_response(
+        {"posts": row_dicts(posts, PostWithLikes), "next_cursor": next_cursor}
+    )
 
 
 @router.post(
@@ -80,59 +454,352 @@ async def create_comment(
     current_user: Annotated[UserRead, Depends(get_authenticated_user)],
 ) -> CommentRead:
     logger.info("Creating comment")
-    post = await find_post(post_id)
-    if not post:
-        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Post not found")
-
     data = comment.model_dump()
     data = {**data, "post_id": post_id, "user_id": current_user.id}
     query = comment_table.insert().values(data)
+    revision_query = (
+        post_table.update()
+        .where(post_table.c.id == post_id)
+        .values(revision=post_table.c.revision + 1)
+        .returning(post_table.c.like_count)
+    )
     logger.debug(query)
-    last_record_id = await database.execute(query)
+    async with database.transaction():
+        like_count = await database.fetch_val(revision_query)
+        if like_count is None:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="Post not found"
+            )
+        last_record_id = await database.execute(query)
+    expire_post_detail(post_id, last_record_id)
+    expire_post_listings(post_id, (like_count,), comment_counts=(True,))
     new_comment = {**data, "id": last_record_id}
     return CommentRead(**new_comment)
 
 
+@router.post(
+    "/{post_id}/comments:batch", name="Create comments", status_code=HTTPStatus.CREATED
+)
+async def create_comments(
+    post_id: int,
+    comments: Annotated[
+        list[CommentCreate], Body(min_length=1, max_length=config.BATCH_MAX_ITEMS)
+    ],
+    current_user: Annotated[UserRead, Depends(get_authenticated_user)],
+) -> BatchCreated:
+    """Create several comments on a post in one statement, returning their ids
+    in order.
+
+    The batch is all or nothing: if any item is invalid the request fails with
+    422, and if the post does not exist with 404, without creating any comment.
+    """
+    logger.info(f"Creating {len(comments)} comments")
+    query = (
+        comment_table.insert()
+        .values(
+            [
+                {**comment.model_dump(), "post_id": post_id, "user_id": current_user.id}
+                for comment in comments
+            ]
+        )
+        .returning(comment_table.c.id)
+    )
+    revision_query = (
+        post_table.update()
+        .where(post_table.c.id == post_id)
+        .values(revision=post_table.c.revision + 1)
+        .returning(post_table.c.like_count)
+    )
+    logger.debug(query)
+    async with database.transaction():
+        like_count = await database.fetch_val(revision_query)
+        if like_count is None:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="Post not found"
+            )
+        rows = await database.fetch_all(query)
+    ids = sorted(row.id for row in rows)
+    expire_post_detail(post_id, ids[0])
+    expire_post_listings(post_id, (like_count,), comment_counts=(True,))
+    return BatchCreated(ids=ids)
+
+
+def comments_page(rows: list, limit: int, key: str = "id") -> tuple[list, int | None]:
+    """Trim the extra row fetched to detect a following page, returning the
+    rows and the comment id (`key`) of the last one if more follow."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, getattr(rows[-1], key)
+    return rows, None
+
+
 @router.get("/{post_id}/comments", name="List comments", status_code=HTTPStatus.OK)
-async def list_comments(post_id: int) -> List[CommentRead]:
+async def list_comments(
+    post_id: int,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> CommentPage:
     logger.info("Getting comments on post")
-    query = comment_table.select().where(comment_table.c.post_id == post_id)
+    values = decode_cursor(cursor, COMMENTS_SORTING, 1) if cursor else None
+    query = sqlalchemy.select(post_table.c.revision).where(post_table.c.id == post_id)
+    logger.debug(query)
+    revision = await read_database.fetch_val(query)
+    if revision is None:
+        return json_response({"comments": [], "next_cursor": None})
+
+    etag = post_etag(post_id, revision)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    query = keyset_page(
+        comment_table.select().where(comment_table.c.post_id == post_id),
+        {"id": comment_table.c.id},
+        False,
+        values,
+        limit + 1,
+    )
     logger.debug(query)
-    return await database.fetch_all(query)
+    comments, last = comments_page(await read_database.fetch_all(query), limit)
+    next_cursor = encode_cursor(COMMENTS_SORTING, [last]) if last else None
+    return json_response(
+        {"comments": row_dicts(comments, CommentRead), "next_cursor": next_cursor},
+        headers={"ETag": etag},
+    )
 
 
 @router.get("/{post_id}", name="Get post with comments", status_code=HTTPStatus.OK)
-async def read_post_with_comments(post_id: int) -> PostWithCommentsAndLikes:
+async def read_post_with_comments(
+    post_id: int,
+    comments_limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> PostWithCommentsAndLikes:
+    """The post with its first `comments_limit` comments; later comments are
+    listed from `next_comments_cursor` on by GET /posts/{post_id}/comments."""
     logger.info("Getting post and its comments")
+    cache_key = ("post", post_id, comments_limit)
+    if (response := cached_response(cache_key, if_none_match)) is not None:
+        return response
+
+    snapshot = response_cache.snapshot()
+    if if_none_match:
+        # Revalidation only needs the revision, not the comments.
+        query = sqlalchemy.select(post_table.c.revision).where(
+            post_table.c.id == post_id
+        )
+        logger.debug(query)
+        revision = await read_database.fetch_val(query)
+        if revision is not None and etag_matches(
+            if_none_match, etag := post_etag(post_id, revision)
+        ):
+            return not_modified(etag)
 
-    query = select_post_and_likes.where(post_table.c.id == post_id)
+    page = (
+        comment_table.select()
+        .where(comment_table.c.post_id == post_id)
+        .order_by(comment_table.c.id)
+        .limit(comments_limit + 1)
+        .subquery("page")
+    )
+    query = (
+        select_post_and_likes.add_columns(
+            page.c.id.label("comment_id"),
+            page.c.body.label("comment_body"),
+            page.c.user_id.label("comment_user_id"),
+        )
+        .outerjoin_from(post_table, page, sqlalchemy.true())
+        .where(post_table.c.id == post_id)
+        .order_by(page.c.id)
+    )
     logger.debug(query)
-    post_with_likes = await database.fetch_one(query)
-    if not post_with_likes:
+    rows = await read_database.fetch_all(query)
+    if not rows:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Post not found")
 
+    comments, last = comments_page(
+        [row for row in rows if row.comment_id is not None],
+        comments_limit,
+        key="comment_id",
+    )
+    # Same fields, in the same order, as CommentRead.
+    comments = [
+        {
+            "body": row.comment_body,
+            "id": row.comment_id,
+            "post_id": post_id,
+            "user_id": row.comment_user_id,
+        }
+        for row in comments
+    ]
+    if not config.FAST_JSON_RESPONSES:
+        comments = validated_dicts(comments, CommentRead)
     posts_with_comments_and_likes = {
-        "post": post_with_likes,
-        "comments": await list_comments(post_id),
+        "post": row_dicts(rows[:1], PostWithLikes)[0],
+        "comments": comments,
+        "next_comments_cursor": (
+            encode_cursor(COMMENTS_SORTING, [last]) if last else None
+        ),
     }
-    return PostWithCommentsAndLikes(**posts_with_comments_and_likes)
+    span = PageSpan(("post", post_id), False, None, (last,) if last else None)
+    return cache_response(
+        cache_key,
+        posts_with_comments_and_likes,
+        snapshot,
+        span,
+        headers={"ETag": post_etag(post_id, rows[0].revision)},
+    )
+
+
+def like_statement(on_conflict: str = "") -> sqlalchemy.TextClause:
+    """Insert a like if the post exists, returning the like id and the like
+    count. A missing post inserts, and so returns, nothing."""
+    return sqlalchemy.text(
+        f"""
+        INSERT INTO likes (post_id, user_id)
+        SELECT id, :user_id FROM posts WHERE id = :post_id
+        {on_conflict}
+        RETURNING id, (SELECT like_count FROM posts WHERE posts.id = likes.post_id) AS likes
+        """
+    )
+
+
+insert_like_query = like_statement()
+upsert_like_query = like_statement(
+    "ON CONFLICT (post_id, user_id) DO UPDATE SET user_id = excluded.user_id"
+)
+delete_like_query = sqlalchemy.text(
+    """
+    DELETE FROM likes WHERE post_id = :post_id AND user_id = :user_id
+    RETURNING id, (SELECT like_count FROM posts WHERE posts.id = likes.post_id) AS likes
+    """
+)
+
+
+def expire_like_responses(post_id: int, likes: int) -> None:
+    # The count is read around the trigger that updates it, so cover both
+    # sides of the change.
+    expire_post_responses(
+        post_id,
+        likes=(likes - 1, likes, likes + 1),
+        grace=config.RESPONSE_CACHE_STALENESS,
+    )
+
+
+def expire_flushed_likes(changes: list[tuple[int, int, int]]) -> None:
+    for post_id, before, after in changes:
+        expire_post_responses(
+            post_id, likes=(before, after), grace=config.RESPONSE_CACHE_STALENESS
+        )
+
+
+like_buffer = LikeBuffer(
+    config.LIKE_BUFFER_MAX_EVENTS,
+    config.LIKE_BUFFER_FLUSH_MS / 1000,
+    config.LIKE_BUFFER_MAX_PENDING,
+    on_flush=expire_flushed_likes,
+)
+
+like_state_query = sqlalchemy.text(
+    """
+    SELECT posts.id, likes.id AS like_id
+    FROM posts LEFT JOIN likes ON likes.post_id = posts.id AND likes.user_id = :user_id
+    WHERE posts.id = :post_id
+    """
+)
+
+
+async def written_like_id(post_id: int, user_id: int) -> int | None:
+    """Id of the like of `user_id` on a post if it is in the database, read
+    from a read connection. Fails with 404 if the post does not exist."""
+    row = await read_database.fetch_one(
+        like_state_query.bindparams(post_id=post_id, user_id=user_id)
+    )
+    if row is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Post not found")
+    return row.like_id
 
 
-@router.post("/{post_id}/like", name="Like post", status_code=HTTPStatus.CREATED)
+def accepted_like(data: dict) -> Response:
+    return json_response(
+        LikeAccepted(**data).model_dump(), status_code=HTTPStatus.ACCEPTED
+    )
+
+
+@router.post(
+    "/{post_id}/like",
+    name="Like post",
+    status_code=HTTPStatus.CREATED,
+    responses={HTTPStatus.ACCEPTED: {"model": LikeAccepted}},
+)
 async def like_post(
     post_id: int, current_user: Annotated[UserRead, Depends(get_authenticated_user)]
 ) -> LikeRead:
+    """Like a post. With the like buffer enabled the like is written shortly
+    after the 202 Accepted response."""
     logger.info("Liking post")
-
-    post = await find_post(post_id)
-    if not post:
+    data = {"post_id": post_id, "user_id": current_user.id}
+    if like_buffer.running:
+        if (post_id, current_user.id) in like_buffer or await written_like_id(
+            post_id, current_user.id
+        ) is not None:
+            raise HTTPException(
+                status_code=HTTPStatus.CONFLICT, detail="Post already liked"
+            )
+        if like_buffer.add(post_id, current_user.id):
+            return accepted_like(data)
+    logger.debug(insert_like_query)
+    try:
+        row = await database.fetch_one(insert_like_query.bindparams(**data))
+    except sqlite3.IntegrityError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT, detail="Post already liked"
+        ) from e
+    if row is None:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Post not found")
+    expire_like_responses(post_id, row.likes)
+    return LikeRead(**data, id=row.id)
+
 
+@router.put(
+    "/{post_id}/like",
+    name="Like post idempotently",
+    status_code=HTTPStatus.OK,
+    responses={HTTPStatus.ACCEPTED: {"model": LikeAccepted}},
+)
+async def put_like(
+    post_id: int, current_user: Annotated[UserRead, Depends(get_authenticated_user)]
+) -> LikeRead:
+    """Like a post, succeeding whether or not it was already liked."""
+    logger.info("Liking post")
     data = {"post_id": post_id, "user_id": current_user.id}
-    query = like_table.insert().values(data)
+    if like_buffer.running:
+        if (post_id, current_user.id) in like_buffer:
+            return accepted_like(data)
+        like_id = await written_like_id(post_id, current_user.id)
+        if like_id is not None:
+            return LikeRead(**data, id=like_id)
+        if like_buffer.add(post_id, current_user.id):
+            return accepted_like(data)
+    logger.debug(upsert_like_query)
+    row = await database.fetch_one(upsert_like_query.bindparams(**data))
+    if row is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Post not found")
+    expire_like_responses(post_id, row.likes)
+    return LikeRead(**data, id=row.id)
 
-    logger.debug(query)
 
-    last_record_id = await database.execute(query)
-    data = {**data, "id": last_record_id}
-    return LikeRead(**data)
+@router.delete("/{post_id}/like", name="Unlike post", status_code=HTTPStatus.NO_CONTENT)
+async def delete_like(
+    post_id: int, current_user: Annotated[UserRead, Depends(get_authenticated_user)]
+) -> None:
+    """Remove a like, succeeding whether or not the post was liked (or exists)."""
+    logger.info("Unliking post")
+    # A like may be pending in the buffer, or written already; or both, if
+    # it is being flushed.
+    like_buffer.discard(post_id, current_user.id)
+    logger.debug(delete_like_query)
+    row = await database.fetch_one(
+        delete_like_query.bindparams(post_id=post_id, user_id=current_user.id)
+    )
+    if row is not None:
+        expire_like_responses(post_id, row.likes)
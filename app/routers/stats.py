@@ -0,0 +1,27 @@
+from http import HTTPStatus
+import logging
+
+from fastapi import APIRouter
+
+from app import logging_config
+from app.cache import caches
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["Stats"],
+)
+
+
+@router.get("/cache", name="Cache statistics", status_code=HTTPStatus.OK)
+async def cache_stats() -> dict[str, dict]:
+    """Size and hit ratio of every in-process cache, for scraping."""
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+@router.get("/logging", name="Logging queue statistics", status_code=HTTPStatus.OK)
+async def logging_stats() -> dict:
+    """Records waiting for the logging thread and records dropped so far."""
+    handler = logging_config.queue_handler
+    return handler.stats() if handler is not None else {}
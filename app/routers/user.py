@@ -1,10 +1,12 @@
 from http import HTTPStatus
 import logging
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, Request, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.params import Depends
 from fastapi.security import OAuth2PasswordRequestForm
 
+from app.config import config
+from app.ratelimit import ConcurrencyLimit, TokenBucketLimiter
 from app.security import (
     get_user,
     get_password_hash,
@@ -12,10 +14,11 @@ from app.security import (
     create_access_token,
     create_confirmation_token,
     get_subject_for_token_type,
+    invalidate_user,
 )
 from app.database import database, user_table
 from app.schemas.user import UserCreate, UserRead
-from app.tasks import send_user_registration_email
+from app.tasks import email_worker, queue_user_registration_email
 
 
 logger = logging.getLogger(__name__)
@@ -23,33 +26,66 @@ router = APIRouter(
     tags=["Users"],
 )
 
+ip_limiter = TokenBucketLimiter(
+    "auth_ip",
+    config.AUTH_RATE_PER_IP,
+    config.AUTH_BURST_PER_IP,
+    config.RATE_LIMIT_MAX_KEYS,
+)
+username_limiter = TokenBucketLimiter(
+    "auth_username",
+    config.AUTH_RATE_PER_USERNAME,
+    config.AUTH_BURST_PER_USERNAME,
+    config.RATE_LIMIT_MAX_KEYS,
+)
+# Sheds login and registration requests before they queue up for bcrypt.
+auth_admission = ConcurrencyLimit("auth_concurrency", config.AUTH_MAX_CONCURRENCY)
+
+
+def limit_attempts(request: Request, username: str) -> None:
+    ip_limiter.check(request.client.host if request.client else None)
+    username_limiter.check(username.strip().lower())
+
+
+def limit_register(request: Request, user: UserCreate) -> None:
+    limit_attempts(request, user.email)
+
 
-@router.post("/register", status_code=HTTPStatus.CREATED)
-async def register(
-    user: UserCreate, background_tasks: BackgroundTasks, request: Request
-) -> UserRead:
+def limit_login(
+    request: Request, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+) -> None:
+    limit_attempts(request, form_data.username)
+
+
+@router.post(
+    "/register",
+    status_code=HTTPStatus.CREATED,
+    dependencies=[Depends(limit_register), Depends(auth_admission)],
+)
+async def register(user: UserCreate, request: Request) -> UserRead:
     if await get_user(user.email):
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT,
             detail="A user with that email already exists.",
         )
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     query = user_table.insert().values(email=user.email, password=hashed_password)
 
     logger.debug(query)
 
-    last_record_id = await database.execute(query)
-    new_user = {"email": user.email, "id": last_record_id}
-
-    background_tasks.add_task(
-        send_user_registration_email,
-        user.email,
-        request.url_for("confirm_email", token=create_confirmation_token(user.email)),
+    confirmation_url = request.url_for(
+        "confirm_email", token=create_confirmation_token(user.email)
     )
+    async with database.transaction():
+        last_record_id = await database.execute(query)
+        await queue_user_registration_email(user.email, str(confirmation_url))
+    email_worker.notify()
+
+    new_user = {"email": user.email, "id": last_record_id}
     return UserRead(**new_user)
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(limit_login), Depends(auth_admission)])
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> dict:
@@ -68,4 +104,5 @@ async def confirm_email(token: str) -> dict:
     logger.debug(query)
 
     await database.execute(query)
+    invalidate_user(email)
     return {"detail": "User confirmed."}
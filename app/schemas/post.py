@@ -26,6 +26,37 @@ class PostWithLikes(PostRead):
     likes: int
 
 
+class PostWithLikesAndCommentCount(PostWithLikes):
+    comment_count: int
+
+
+class ListedPost(PostWithLikes):
+    """A post of `GET /posts`, with the optional fields asked for through its
+    `include` parameter."""
+
+    comment_count: int | None = None
+    liked_by_me: bool | None = None
+
+
+class PostPage(BaseModel):
+    posts: list[PostWithLikes]
+    next_cursor: str | None = None
+
+
+class ListedPostPage(BaseModel):
+    posts: list[ListedPost]
+    next_cursor: str | None = None
+
+
+class BatchCreated(BaseModel):
+    ids: list[int]
+
+
+class CommentPage(BaseModel):
+    comments: list[CommentRead]
+    next_cursor: str | None = None
+
+
 class PostWithComments(BaseModel):
     post: PostWithLikes
     comments: list[CommentRead]
@@ -34,6 +65,7 @@ class PostWithComments(BaseModel):
 class PostWithCommentsAndLikes(BaseModel):
     post: PostWithLikes
     comments: list[CommentRead]
+    next_comments_cursor: str | None = None
 
 
 class LikeCreate(BaseModel):
@@ -44,3 +76,9 @@ class LikeRead(LikeCreate):
     model_config = ConfigDict(from_attributes=True)
     id: int
     user_id: int
+
+
+class LikeAccepted(LikeCreate):
+    """A like that will be written shortly, so has no id yet."""
+
+    user_id: int
@@ -9,3 +9,8 @@ class UserRead(BaseModel):
 class UserCreate(BaseModel):
     email: str
     password: str
+
+
+class FollowRead(BaseModel):
+    follower_id: int
+    followee_id: int
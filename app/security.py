@@ -1,14 +1,20 @@
+import asyncio
+import hashlib
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
-from typing import Annotated, Literal
+from typing import Annotated, Any, Callable, Literal
 from fastapi import HTTPException, Depends
 import bcrypt
 import datetime
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, ExpiredSignatureError, JWTError
 
+from app.cache import TTLCache
 from app.config import config
 from app.database import database, user_table
+from app.metrics import executor_call_duration
 
 
 logger = logging.getLogger(__name__)
@@ -16,6 +22,18 @@ logger = logging.getLogger(__name__)
 SECRET_KEY = config.APP_SECRET
 ALGORITHM = "HS256"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login", auto_error=False)
+user_cache = TTLCache("users", config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
+# Claims of tokens whose signature was already verified, by token digest. Each
+# entry expires with its token; the default only applies to tokens without exp.
+token_cache = TTLCache("tokens", config.TOKEN_CACHE_SIZE, ttl=30 * 60)
+token_cache_secret = SECRET_KEY
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
 
 
 def unauthorized_exception(message: str) -> HTTPException:
@@ -26,12 +44,91 @@ def unauthorized_exception(message: str) -> HTTPException:
     )
 
 
-def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+class BoundedExecutor:
+    """Thread pool for blocking work that sheds load instead of queueing it.
+
+    Once `max_workers` calls are running and `queue_limit` more are waiting,
+    further calls fail immediately with 503 Service Unavailable.
+    """
+
+    def __init__(self, max_workers: int, queue_limit: int, name: str):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.name = name
+        self.pending = 0
+        self._pool: ThreadPoolExecutor | None = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_workers + self.queue_limit:
+            logger.warning(f"Executor '{self.name}' saturated, rejecting call")
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again later",
+                headers={"Retry-After": "1"},
+            )
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix=self.name
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # Timed in the worker thread, recorded on the event loop.
+            result, elapsed = await loop.run_in_executor(
+                self._pool, _timed, func, *args
+            )
+        finally:
+            self.pending -= 1
+        executor_call_duration.observe(elapsed, self.name, func.__name__)
+        return result
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+# bcrypt releases the GIL while hashing, so threads give real parallelism.
+bcrypt_executor = BoundedExecutor(
+    config.BCRYPT_POOL_SIZE, config.BCRYPT_QUEUE_LIMIT, name="bcrypt"
+)
+bcrypt_rounds = config.BCRYPT_ROUNDS
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password)
+def calibrate_bcrypt_rounds(target_ms: float, max_rounds: int = 20) -> int:
+    """Lowest bcrypt cost whose hash takes at least `target_ms` on this machine."""
+    for rounds in range(4, max_rounds):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        if (time.perf_counter() - start) * 1000 >= target_ms:
+            return rounds
+    return max_rounds
+
+
+def set_bcrypt_rounds(rounds: int) -> None:
+    global bcrypt_rounds
+    logger.info(f"Hashing new passwords with bcrypt cost {rounds}")
+    bcrypt_rounds = rounds
+
+
+def password_hash_rounds(hashed_password: str | bytes) -> int:
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode("utf-8")
+    return int(hashed_password.split(b"$")[2])
+
+
+async def get_password_hash(password: str) -> bytes:
+    return await bcrypt_executor.run(
+        bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt(bcrypt_rounds)
+    )
+
+
+async def verify_password(plain_password: str, hashed_password: str | bytes) -> bool:
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode("utf-8")
+    return await bcrypt_executor.run(
+        bcrypt.checkpw, plain_password.encode("utf-8"), hashed_password
+    )
 
 
 def access_token_expire_minutes() -> int:
@@ -62,9 +159,25 @@ def create_confirmation_token(email: str):
     return encoded_jwt
 
 
-def get_subject_for_token_type(
-    token: str, type: Literal["access", "confirmation"]
-) -> str:
+def decode_token(token: str) -> tuple[str | None, str | None]:
+    """Subject and type of a token, verifying its signature only once.
+
+    Verified claims are cached until the token expires, and all of them are
+    dropped when the secret changes.
+    """
+    global token_cache_secret
+    if token_cache_secret != SECRET_KEY:
+        token_cache.clear()
+        token_cache_secret = SECRET_KEY
+
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        subject, token_type, expire = claims
+        if expire is None or expire > time.time():
+            return subject, token_type
+        token_cache.pop(key)
+
     try:
         payload = jwt.decode(token, key=SECRET_KEY, algorithms=[ALGORITHM])
     except ExpiredSignatureError as e:
@@ -72,11 +185,19 @@ def get_subject_for_token_type(
     except JWTError as e:
         raise unauthorized_exception("Invalid token") from e
 
-    email = payload.get("sub")
+    expire = payload.get("exp")
+    claims = (payload.get("sub"), payload.get("type"), expire)
+    token_cache.set(key, claims, ttl=None if expire is None else expire - time.time())
+    return claims[:2]
+
+
+def get_subject_for_token_type(
+    token: str, type: Literal["access", "confirmation"]
+) -> str:
+    email, token_type = decode_token(token)
     if email is None:
         raise unauthorized_exception("Token is missing 'sub' field")
 
-    token_type = payload.get("type")
     if token_type != type:
         raise unauthorized_exception(f"Token has incorrect type, expected '{type}'")
 
@@ -84,26 +205,50 @@ def get_subject_for_token_type(
 
 
 async def get_user(email: str):
+    if config.USER_CACHE_ENABLED:
+        user = user_cache.get(email)
+        if user is not None:
+            return user
     logger.debug("Fetching user from the database", extra={"email": email})
     query = user_table.select().where(user_table.c.email == email)
     result = await database.fetch_one(query)
     if result:
+        if config.USER_CACHE_ENABLED:
+            user_cache.set(email, result)
         return result
     return None
 
 
+def invalidate_user(email: str) -> None:
+    """Must be called whenever the row of the user with `email` changes."""
+    user_cache.pop(email)
+
+
 async def authenticate_user(email: str, password: str):
     logger.debug("Authenticating user", extra={"email": email})
     user = await get_user(email)
     if not user:
         raise unauthorized_exception("Inexistent user")
-    if not verify_password(password, user.password):
+    if not await verify_password(password, user.password):
         raise unauthorized_exception("Invalid credentials")
     if not user.confirmed:
         raise unauthorized_exception("User has not confirmed email")
+    if password_hash_rounds(user.password) != bcrypt_rounds:
+        await rehash_password(email, password)
     return user
 
 
+async def rehash_password(email: str, password: str) -> None:
+    logger.debug("Rehashing password with current cost", extra={"email": email})
+    query = (
+        user_table.update()
+        .where(user_table.c.email == email)
+        .values(password=await get_password_hash(password))
+    )
+    await database.execute(query)
+    invalidate_user(email)
+
+
 async def get_authenticated_user(token: Annotated[str, Depends(oauth2_scheme)]):
     email = get_subject_for_token_type(token, type="access")
     user = await get_user(email=email)
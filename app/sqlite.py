@@ -0,0 +1,204 @@
+import asyncio
+import functools
+import logging
+import math
+import re
+import sqlite3
+import time
+import typing
+
+import aiosqlite
+import databases
+from databases.backends.sqlite import SQLiteBackend, SQLiteConnection, SQLitePool
+from databases.core import DatabaseURL
+from sqlalchemy.sql import ClauseElement
+
+from app.metrics import db_query_duration
+
+logger = logging.getLogger(__name__)
+
+_first_table = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_name(sql: str) -> str:
+    """Label for a SQL statement: its verb and first table, e.g. `select posts`."""
+    verb = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else ""
+    table = _first_table.search(sql)
+    return f"{verb} {table.group(1)}" if table else verb
+
+
+def _null_on_error(func: typing.Callable) -> typing.Callable:
+    """Like SQLite's own math functions, return NULL for NULL or out of
+    domain arguments instead of failing the statement."""
+
+    @functools.wraps(func)
+    def wrapper(*args: typing.Any) -> typing.Any:
+        try:
+            return func(*args)
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+    return wrapper
+
+
+MATH_FUNCTIONS: dict[str, tuple[int, typing.Callable]] = {
+    "ln": (1, _null_on_error(math.log)),
+    "log2": (1, _null_on_error(math.log2)),
+    "pow": (2, _null_on_error(math.pow)),
+}
+"""Python versions of the SQLite math functions the schema's triggers and the
+    queries use, by name, with their number of arguments."""
+
+
+def missing_functions(
+    functions: dict[str, tuple[int, typing.Callable]],
+) -> dict[str, tuple[int, typing.Callable]]:
+    """Those of `functions` the SQLite library lacks, e.g. the math functions
+    of builds without SQLITE_ENABLE_MATH_FUNCTIONS."""
+    connection = sqlite3.connect(":memory:")
+    missing = {}
+    try:
+        for name, (num_params, func) in functions.items():
+            try:
+                connection.execute(f"SELECT {name}({', '.join('1' * num_params)})")
+            except sqlite3.OperationalError:
+                missing[name] = (num_params, func)
+    finally:
+        connection.close()
+    return missing
+
+
+FALLBACK_FUNCTIONS = missing_functions(MATH_FUNCTIONS)
+"""Math functions defined in Python on every connection, as SQLite lacks them."""
+
+
+def register_functions(
+    connection: sqlite3.Connection,
+    functions: dict[str, tuple[int, typing.Callable]] | None = None,
+) -> None:
+    """Define `functions`, FALLBACK_FUNCTIONS by default, on a connection."""
+    functions = FALLBACK_FUNCTIONS if functions is None else functions
+    for name, (num_params, func) in functions.items():
+        connection.create_function(name, num_params, func, deterministic=True)
+
+
+class PooledSQLitePool(SQLitePool):
+    """Reuses up to `pool_size` open connections instead of opening one per
+    query, running the `pragmas` and defining the FALLBACK_FUNCTIONS once on
+    each new connection."""
+
+    def __init__(
+        self,
+        url: DatabaseURL,
+        pool_size: int = 1,
+        pragmas: dict[str, typing.Any] | None = None,
+        **options: typing.Any,
+    ) -> None:
+        super().__init__(url, **options)
+        self.pool_size = pool_size
+        self.pragmas = pragmas or {}
+        self._idle: list[aiosqlite.Connection] = []
+        self._slots: asyncio.Semaphore | None = None
+
+    def open(self) -> None:
+        self._slots = asyncio.Semaphore(self.pool_size)
+
+    async def close(self) -> None:
+        while self._idle:
+            await super().release(self._idle.pop())
+        self._slots = None
+
+    async def acquire(self) -> aiosqlite.Connection:
+        assert self._slots is not None, "Pool is not open"
+        await self._slots.acquire()
+        try:
+            if self._idle:
+                return self._idle.pop()
+            connection = await super().acquire()
+            # Before any statement: functions cannot be redefined while one
+            # is active.
+            for name, (num_params, func) in FALLBACK_FUNCTIONS.items():
+                await connection.create_function(
+                    name, num_params, func, deterministic=True
+                )
+            for name, value in self.pragmas.items():
+                await connection.execute(f"PRAGMA {name} = {value}")
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, connection: aiosqlite.Connection) -> None:
+        if connection.in_transaction:
+            await connection.rollback()
+        self._idle.append(connection)
+        self._slots.release()
+
+
+class TimedSQLiteConnection(SQLiteConnection):
+    """Records the time taken by every statement, compilation included, in
+    the `db_query_duration` histogram."""
+
+    _statement = ""
+
+    def _compile(self, query: ClauseElement) -> tuple:
+        compiled = super()._compile(query)
+        self._statement = statement_name(compiled[0])
+        return compiled
+
+    async def fetch_all(self, query: ClauseElement) -> list:
+        start = time.perf_counter()
+        try:
+            return await super().fetch_all(query)
+        finally:
+            db_query_duration.observe(time.perf_counter() - start, self._statement)
+
+    async def fetch_one(self, query: ClauseElement) -> typing.Any:
+        start = time.perf_counter()
+        try:
+            return await super().fetch_one(query)
+        finally:
+            db_query_duration.observe(time.perf_counter() - start, self._statement)
+
+    async def execute(self, query: ClauseElement) -> typing.Any:
+        start = time.perf_counter()
+        try:
+            return await super().execute(query)
+        finally:
+            db_query_duration.observe(time.perf_counter() - start, self._statement)
+
+
+class PooledSQLiteBackend(SQLiteBackend):
+    def __init__(
+        self,
+        database_url: typing.Union[DatabaseURL, str],
+        pool_size: int = 1,
+        pragmas: dict[str, typing.Any] | None = None,
+        **options: typing.Any,
+    ) -> None:
+        super().__init__(database_url, **options)
+        self._pool = PooledSQLitePool(
+            self._database_url, pool_size, pragmas, **self._options
+        )
+
+    def connection(self) -> TimedSQLiteConnection:
+        return TimedSQLiteConnection(self._pool, self._dialect)
+
+    async def connect(self) -> None:
+        self._pool.open()
+
+    async def disconnect(self) -> None:
+        await super().disconnect()
+        await self._pool.close()
+
+
+class SQLiteDatabase(databases.Database):
+    """`databases.Database` whose SQLite connections are pooled and tuned,
+    see PooledSQLitePool, and whose statements are timed. Accepts `pool_size`
+    and `pragmas` options."""
+
+    SUPPORTED_BACKENDS = {
+        **databases.Database.SUPPORTED_BACKENDS,
+        "sqlite": "app.sqlite:PooledSQLiteBackend",
+    }
@@ -1,8 +1,24 @@
+import asyncio
 import logging
-import requests
-import json
+import math
+import random
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+import sqlalchemy
 
 from app.config import config
+from app.database import (
+    HOT_HALF_LIFE_SECONDS,
+    database,
+    email_outbox_table,
+    post_table,
+)
+from app.metrics import email_send_duration
+
+if TYPE_CHECKING:
+    # Only the email worker needs httpx, it is imported when the client opens.
+    import httpx
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +27,9 @@ class APIResponseError(Exception):
     pass
 
 
-async def send_email(to: str, subject: str, body: str) -> None:
+async def send_email(
+    client: "httpx.AsyncClient", to: str, subject: str, body: str
+) -> None:
     logger.debug(f"Sending email to '{to}' with subject '{subject[:20]}'")
 
     url = config.MAILTRAP_HOST
@@ -32,7 +50,14 @@ async def send_email(to: str, subject: str, body: str) -> None:
         "Content-Type": "application/json",
     }
 
-    response = requests.post(url, headers=headers, data=json.dumps(payload))
+    start = time.perf_counter()
+    try:
+        response = await client.post(url, headers=headers, json=payload)
+    except Exception:
+        email_send_duration.observe(time.perf_counter() - start, "error")
+        raise
+    outcome = "sent" if response.status_code == 200 else "rejected"
+    email_send_duration.observe(time.perf_counter() - start, outcome)
 
     if response.status_code != 200:
         logger.error(f"Mailtrap API error: {response.status_code} - {response.text}")
@@ -41,8 +66,16 @@ async def send_email(to: str, subject: str, body: str) -> None:
     logger.debug("Email sent successfully via Mailtrap.")
 
 
-async def send_user_registration_email(email: str, confirmation_url: str):
-    return await send_email(
+async def queue_email(to: str, subject: str, body: str) -> int:
+    """Write an email to the outbox; it is sent once the surrounding
+    transaction commits and the worker picks it up."""
+    query = email_outbox_table.insert().values(recipient=to, subject=subject, body=body)
+    logger.debug(query)
+    return await database.execute(query)
+
+
+async def queue_user_registration_email(email: str, confirmation_url: str) -> int:
+    return await queue_email(
         email,
         "Successfully signed up",
         (
@@ -51,3 +84,215 @@ async def send_user_registration_email(email: str, confirmation_url: str):
             f" following link: {confirmation_url}"
         ),
     )
+
+
+class EmailWorker:
+    """Drains the email outbox in the background.
+
+    Due emails are claimed in batches by pushing their next attempt past a
+    lease, so a crashed delivery is retried once the lease runs out, and sent
+    concurrently over one pooled keep-alive HTTP client. Failures are retried
+    with jittered exponential backoff until `max_attempts` is reached.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        concurrency: int,
+        max_attempts: int,
+        retry_base_seconds: float,
+        poll_interval: float,
+        lease_seconds: float = 60.0,
+    ):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.client: "httpx.AsyncClient | None" = None
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def open_client(self) -> "httpx.AsyncClient":
+        if self.client is None:
+            import httpx
+
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0),
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+            )
+        return self.client
+
+    async def start(self) -> None:
+        self.open_client()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def notify(self) -> None:
+        """Wake the worker up instead of waiting for the next poll."""
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.drain()
+            except Exception:
+                logger.exception("Email outbox drain failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    async def drain(self) -> int:
+        """Claim and deliver one batch of due emails. Returns the batch size."""
+        now = time.time()
+        due = (
+            sqlalchemy.select(email_outbox_table.c.id)
+            .where(
+                email_outbox_table.c.status == "pending",
+                email_outbox_table.c.next_attempt_at <= now,
+            )
+            .order_by(email_outbox_table.c.next_attempt_at)
+            .limit(self.batch_size)
+        )
+        query = (
+            email_outbox_table.update()
+            .where(email_outbox_table.c.id.in_(due))
+            .values(next_attempt_at=now + self.lease_seconds)
+            .returning(email_outbox_table)
+        )
+        emails = await database.fetch_all(query)
+        if not emails:
+            return 0
+
+        client = self.open_client()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        sent = []
+
+        async def deliver(email) -> None:
+            async with semaphore:
+                try:
+                    await send_email(client, email.recipient, email.subject, email.body)
+                # Any failure, e.g. a misconfigured mail host, counts as an
+                # attempt, so that the rest of the batch is still marked sent.
+                except Exception as e:
+                    await self._record_failure(email, e)
+                else:
+                    sent.append(email.id)
+
+        await asyncio.gather(*(deliver(email) for email in emails))
+        if sent:
+            query = (
+                email_outbox_table.update()
+                .where(email_outbox_table.c.id.in_(sent))
+                .values(status="sent", sent_at=time.time())
+            )
+            await database.execute(query)
+        logger.info(f"Delivered {len(sent)} of {len(emails)} queued emails")
+        return len(emails)
+
+    async def _record_failure(self, email, error: Exception) -> None:
+        attempts = email.attempts + 1
+        values = {"attempts": attempts, "last_error": str(error)[:500]}
+        if attempts >= self.max_attempts:
+            logger.error(f"Giving up on email {email.id} after {attempts} attempts")
+            values["status"] = "failed"
+        else:
+            delay = self.retry_base_seconds * 2 ** (attempts - 1)
+            values["next_attempt_at"] = time.time() + delay * random.uniform(1, 1.5)
+        query = (
+            email_outbox_table.update()
+            .where(email_outbox_table.c.id == email.id)
+            .values(**values)
+        )
+        await database.execute(query)
+
+
+email_worker = EmailWorker(
+    batch_size=config.EMAIL_BATCH_SIZE,
+    concurrency=config.EMAIL_CONCURRENCY,
+    max_attempts=config.EMAIL_MAX_ATTEMPTS,
+    retry_base_seconds=config.EMAIL_RETRY_BASE_SECONDS,
+    poll_interval=config.EMAIL_POLL_INTERVAL,
+)
+
+
+async def compact_hot_scores(
+    min_weight: float | None = None, batch_size: int = 10_000
+) -> int:
+    """Clear the hot score of posts whose weight has decayed below
+    `min_weight` (HOT_MIN_WEIGHT by default), which drops them out of the hot
+    ranking and its index. Returns the number of posts dropped."""
+    min_weight = config.HOT_MIN_WEIGHT if min_weight is None else min_weight
+    cutoff = time.time() / HOT_HALF_LIFE_SECONDS + math.log2(min_weight)
+    stale = (
+        sqlalchemy.select(post_table.c.id)
+        .where(post_table.c.hot_score < cutoff)
+        .limit(batch_size)
+    )
+    query = (
+        post_table.update()
+        .where(post_table.c.id.in_(stale))
+        .values(hot_score=None)
+        .returning(post_table.c.id)
+    )
+    dropped = 0
+    while True:
+        async with database.transaction():
+            batch = len(await database.fetch_all(query))
+        dropped += batch
+        if batch < batch_size:
+            break
+    logger.info(f"Compacted the hot ranking, {dropped} posts dropped")
+    return dropped
+
+
+class PeriodicTask:
+    """Runs a coroutine function every `interval` seconds in the background,
+    logging rather than propagating its failures."""
+
+    def __init__(self, func: Callable[[], Awaitable], interval: float):
+        self.func = func
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.func()
+            except Exception:
+                logger.exception(f"Periodic task {self.func.__name__} failed")
+            await asyncio.sleep(self.interval)
+
+
+hot_compaction = PeriodicTask(compact_hot_scores, config.HOT_COMPACTION_INTERVAL)
@@ -0,0 +1,145 @@
+"""Compare reading a home feed from the timeline table with the naive join of
+posts and follows, as the number of followed accounts grows, and measure what
+fanning out a new post costs as its author's follower count grows.
+
+Run with `python -m benchmarks.bench_feed [--followees N ...] [--posts N]`.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import timeit
+
+os.environ.setdefault("ENV_STATE", "test")
+
+import sqlalchemy  # noqa: E402
+
+from app import migrations  # noqa: E402
+from app.database import follow_table, post_table  # noqa: E402
+from app.routers.feed import feed_query  # noqa: E402
+from app.routers.post import fan_out_query, select_post_and_likes  # noqa: E402
+from app.sqlite import register_functions  # noqa: E402
+
+READER = 1
+PAGE = 20
+
+
+def compile_sql(query, dialect) -> str:
+    return str(query.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+def seed(path: str, followees: int, posts: int) -> None:
+    """The reader follows `followees` accounts with `posts` posts each, written
+    in turns, and has every one of them in their timeline."""
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine)
+    engine.dispose()
+
+    connection = sqlite3.connect(path)
+    register_functions(connection)
+    with connection:
+        connection.executemany(
+            "INSERT INTO users (id, email, password, confirmed) VALUES (?, ?, '', 1)",
+            ((i, f"user{i}@example.net") for i in range(1, followees + 2)),
+        )
+        connection.executemany(
+            "INSERT INTO follows (follower_id, followee_id) VALUES (?, ?)",
+            ((READER, i) for i in range(2, followees + 2)),
+        )
+        connection.executemany(
+            "INSERT INTO posts (id, body, user_id) VALUES (?, 'Post', ?)",
+            (
+                (n * followees + i + 1, i + 2)
+                for n in range(posts)
+                for i in range(followees)
+            ),
+        )
+        connection.execute(
+            "INSERT INTO timelines (user_id, post_id) SELECT ?, id FROM posts",
+            (READER,),
+        )
+    connection.execute("ANALYZE")
+    connection.close()
+
+
+def read_latency(path: str, sql: str, number: int) -> float:
+    connection = sqlite3.connect(path)
+    try:
+        seconds = timeit.timeit(
+            lambda: connection.execute(sql).fetchall(), number=number
+        )
+    finally:
+        connection.close()
+    return seconds / number
+
+
+def fan_out_latency(path: str, sql: str, number: int) -> float:
+    """Time writing the timeline entries of one post, rolled back each time."""
+    connection = sqlite3.connect(path, isolation_level=None)
+    total = 0.0
+    try:
+        for _ in range(number):
+            connection.execute("BEGIN")
+            total += timeit.timeit(lambda: connection.execute(sql), number=1)
+            connection.execute("ROLLBACK")
+    finally:
+        connection.close()
+    return total / number
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--followees", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--posts", type=int, default=100, help="Per followee.")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    dialect = sqlalchemy.create_engine("sqlite://").dialect
+    naive = compile_sql(
+        select_post_and_likes.join(
+            follow_table, follow_table.c.followee_id == post_table.c.user_id
+        )
+        .where(follow_table.c.follower_id == READER)
+        .order_by(post_table.c.id.desc())
+        .limit(PAGE + 1),
+        dialect,
+    )
+    timeline = compile_sql(feed_query(READER, [], None, PAGE + 1), dialect)
+
+    print(
+        f"{'accounts':>8} {'posts':>10} {'join ms':>9} {'timeline ms':>12}"
+        f" {'speedup':>8} {'fan-out ms':>11}"
+    )
+    for followees in args.followees:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "feed.db")
+            seed(path, followees, args.posts)
+            before = read_latency(path, naive, args.number)
+            after = read_latency(path, timeline, args.number)
+            # In reverse: the reader is the only follower of every account, so
+            # have each account follow the reader and time the reader posting.
+            connection = sqlite3.connect(path)
+            register_functions(connection)
+            with connection:
+                connection.execute(
+                    "INSERT INTO follows (follower_id, followee_id)"
+                    " SELECT id, ? FROM users WHERE id != ?",
+                    (READER, READER),
+                )
+                connection.execute(
+                    "INSERT INTO posts (id, body, user_id) VALUES (0, 'Post', ?)",
+                    (READER,),
+                )
+            connection.close()
+            fan_out = fan_out_latency(
+                path, compile_sql(fan_out_query(READER, 0, 0), dialect), args.number
+            )
+        print(
+            f"{followees:>8,} {followees * args.posts:>10,} {before * 1000:>9.3f}"
+            f" {after * 1000:>12.3f} {before / after:>7.1f}x {fan_out * 1000:>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
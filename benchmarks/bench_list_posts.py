@@ -0,0 +1,81 @@
+"""Compare rendering a page of `list_posts` by validating the rows into
+response models (FastAPI's default path) with the row-to-JSON fast path.
+
+Run with `python -m benchmarks.bench_list_posts [--rows N] [--number N]`.
+"""
+
+import argparse
+import asyncio
+import os
+import timeit
+
+os.environ.setdefault("ENV_STATE", "test")
+os.environ.setdefault("TEST_FAST_JSON_RESPONSES", "true")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.database import (  # noqa: E402
+    create_engine,
+    database,
+    metadata,
+    post_table,
+    user_table,
+)
+from app.routers.post import select_post_and_likes  # noqa: E402
+from app.schemas.post import PostPage, PostWithLikes  # noqa: E402
+from app.serialization import json_response, row_dicts  # noqa: E402
+
+
+async def fetch_rows(count: int) -> list:
+    await database.execute(user_table.insert().values(email="bench", password="x"))
+    user_id = await database.fetch_val(
+        user_table.select().with_only_columns(user_table.c.id).limit(1)
+    )
+    await database.execute(
+        post_table.insert().values(
+            [
+                {"body": f"Benchmark post {i} ✓", "user_id": user_id}
+                for i in range(count)
+            ]
+        )
+    )
+    return await database.fetch_all(select_post_and_likes.limit(count))
+
+
+async def run(args: argparse.Namespace) -> None:
+    engine = create_engine()
+    metadata.create_all(engine)
+    engine.dispose()
+    # The test configuration rolls everything back on disconnect.
+    await database.connect()
+    try:
+        rows = await fetch_rows(args.rows)
+    finally:
+        await database.disconnect()
+
+    def validated():
+        page = PostPage(posts=rows, next_cursor=None)
+        return JSONResponse(content=page.model_dump(mode="json")).body
+
+    def fast():
+        content = {"posts": row_dicts(rows, PostWithLikes), "next_cursor": None}
+        return json_response(content).body
+
+    assert validated() == fast(), "outputs differ"
+    before = timeit.timeit(validated, number=args.number) / args.number
+    after = timeit.timeit(fast, number=args.number) / args.number
+
+    print(f"validated: {args.rows / before:12,.0f} rows/s")
+    print(f"fast path: {args.rows / after:12,.0f} rows/s")
+    print(f"speedup:   {before / after:12.1f}x")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--number", type=int, default=500)
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
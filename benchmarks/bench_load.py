@@ -0,0 +1,533 @@
+"""Load test every endpoint of the posts and users routers against a large
+synthetic data set, in-process through ASGI and over HTTP through uvicorn.
+
+Run with `python -m benchmarks.bench_load [--scale small|medium|large]
+[--target asgi uvicorn] [--output FILE] [--baseline FILE]`.
+
+The data set is seeded with bulk inserts into a SQLite file. Likes follow a
+Zipf distribution over posts, so a few posts collect most of them. Pass
+`--database PATH` to keep the file and reuse it on the next run; seeding
+the large scale (100k users, 5M posts, 50M likes) takes a while. Each
+scenario runs for `--seconds` with `--concurrency` clients. Throughput and
+p50/p95/p99 latencies are printed as JSON. Given a previous output as
+`--baseline`, every scenario is compared with it, and the command exits
+with status 1 when one regressed by more than `--tolerance`. Pass
+`--like-buffer` to run with likes written through the like buffer.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+SCALES = {
+    "small": {"users": 1_000, "posts": 10_000, "likes": 100_000, "comments": 20_000},
+    "medium": {
+        "users": 10_000,
+        "posts": 500_000,
+        "likes": 5_000_000,
+        "comments": 1_000_000,
+    },
+    "large": {
+        "users": 100_000,
+        "posts": 5_000_000,
+        "likes": 50_000_000,
+        "comments": 10_000_000,
+    },
+}
+PASSWORD = "benchmark"
+VOCABULARY = [f"word{n}" for n in range(10_000)]
+
+
+def app_environment(path: str, like_buffer: bool = False) -> dict[str, str]:
+    """Settings for the app under test, for this process and uvicorn's."""
+    return {
+        "ENV_STATE": "test",
+        "TEST_DATABASE_URL": f"sqlite:///{path}",
+        "TEST_DB_FORCE_ROLLBACK": "false",
+        "TEST_EMAIL_WORKER_ENABLED": "false",
+        "TEST_HOT_COMPACTION_ENABLED": "false",
+        "TEST_LIKE_BUFFER_ENABLED": str(like_buffer).lower(),
+        # Every simulated client logs in from the same address.
+        "TEST_AUTH_RATE_PER_IP": "1e9",
+        "TEST_AUTH_BURST_PER_IP": "1000000000",
+        "TEST_AUTH_RATE_PER_USERNAME": "1e9",
+        "TEST_AUTH_BURST_PER_USERNAME": "1000000000",
+    }
+
+
+class PostRanks:
+    """Scatters popularity ranks over post ids with a multiplicative
+    permutation, so the most liked posts are not simply the oldest."""
+
+    def __init__(self, posts: int, skew: float):
+        self.posts = posts
+        self.skew = skew
+        self.factor = 7_919
+        while math.gcd(self.factor, posts) != 1:
+            self.factor += 1
+        self.inverse = pow(self.factor, -1, posts)
+        self.norm = sum((rank + 1) ** -skew for rank in range(posts))
+
+    def post_id(self, rank: int) -> int:
+        return rank * self.factor % self.posts + 1
+
+    def rank(self, post_id: int) -> int:
+        return (post_id - 1) * self.inverse % self.posts
+
+    def likes(self, post_id: int, likes: int, users: int) -> int:
+        share = (self.rank(post_id) + 1) ** -self.skew / self.norm
+        return min(users, int(likes * share))
+
+
+def seed(path: str, sizes: dict[str, int], skew: float, seed: int) -> dict:
+    """Bulk load the data set into a new database file; returns its row counts."""
+    import bcrypt
+    import sqlalchemy
+
+    from app.database import HOT_HALF_LIFE_SECONDS, metadata
+    from app.sqlite import register_functions
+
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    metadata.create_all(engine)
+    engine.dispose()
+
+    rng = random.Random(seed)
+    ranks = PostRanks(sizes["posts"], skew)
+    users, posts = sizes["users"], sizes["posts"]
+    password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+
+    connection = sqlite3.connect(path, isolation_level=None)
+    register_functions(connection)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    # Counters are written with the posts; the triggers would redo that per like.
+    triggers = connection.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+    ).fetchall()
+    for name, _ in triggers:
+        connection.execute(f"DROP TRIGGER {name}")
+
+    connection.execute("BEGIN")
+    connection.executemany(
+        "INSERT INTO users (id, email, password, confirmed) VALUES (?, ?, ?, 1)",
+        ((i, f"user{i}@example.net", password) for i in range(1, users + 1)),
+    )
+    connection.executemany(
+        "INSERT INTO posts (id, body, user_id, like_count) VALUES (?, ?, ?, ?)",
+        (
+            (
+                i,
+                " ".join(["Post", *rng.choices(VOCABULARY, k=8)]),
+                rng.randint(1, users),
+                ranks.likes(i, sizes["likes"], users),
+            )
+            for i in range(1, posts + 1)
+        ),
+    )
+
+    def likes():
+        for post_id in range(1, posts + 1):
+            offset = rng.randrange(users)
+            for k in range(ranks.likes(post_id, sizes["likes"], users)):
+                yield post_id, (offset + k) % users + 1
+
+    connection.executemany(
+        "INSERT INTO likes (post_id, user_id) VALUES (?, ?)", likes()
+    )
+    connection.executemany(
+        "INSERT INTO comments (body, post_id, user_id) VALUES (?, ?, ?)",
+        (
+            (f"Comment {i}", rng.randint(1, posts), rng.randint(1, users))
+            for i in range(sizes["comments"])
+        ),
+    )
+    connection.execute(
+        "UPDATE posts SET comment_count = counts.n FROM"
+        " (SELECT post_id, count(*) AS n FROM comments GROUP BY post_id) AS counts"
+        " WHERE posts.id = counts.post_id"
+    )
+    # Posts were written over the last week, their likes along with them.
+    connection.execute(
+        "UPDATE posts SET hot_score = ? - 14.0 * (? - id) / ? + log2(1 + like_count)",
+        (time.time() / HOT_HALF_LIFE_SECONDS, posts, posts),
+    )
+    connection.execute("COMMIT")
+    for _, sql in triggers:
+        connection.execute(sql)
+    connection.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    connection.execute("ANALYZE")
+
+    counts = {
+        table: connection.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        for table in ("users", "posts", "likes", "comments")
+    }
+    connection.close()
+    return counts
+
+
+@dataclass
+class Context:
+    """What scenarios draw their requests from."""
+
+    rng: random.Random
+    users: int
+    ranks: PostRanks
+    tokens: list[str]
+
+    def hot_post(self) -> int:
+        """A post id, the most liked posts being picked far more often."""
+        return self.ranks.post_id(int(self.ranks.posts * self.rng.random() ** 3))
+
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.rng.choice(self.tokens)}"}
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable[[Context], tuple[str, str, dict]]
+    """Method, URL and httpx keyword arguments of the next request."""
+    ok: frozenset = frozenset({200})
+
+
+def random_page(ctx: Context) -> tuple[str, str, dict]:
+    from app.pagination import encode_cursor
+
+    cursor = encode_cursor("-id", [ctx.rng.randint(1, ctx.ranks.posts)])
+    return "GET", "/posts", {"params": {"cursor": cursor}}
+
+
+def register(ctx: Context) -> tuple[str, str, dict]:
+    email = f"load{time.time_ns()}@example.net"
+    return "POST", "/register", {"json": {"email": email, "password": PASSWORD}}
+
+
+def confirm(ctx: Context) -> tuple[str, str, dict]:
+    from app.security import create_confirmation_token
+
+    email = f"user{ctx.rng.randint(1, ctx.users)}@example.net"
+    return "GET", f"/confirm/{create_confirmation_token(email)}", {}
+
+
+SCENARIOS = [
+    Scenario("list_posts", lambda ctx: ("GET", "/posts", {})),
+    Scenario("list_posts_page", random_page),
+    Scenario(
+        "list_posts_most_likes",
+        lambda ctx: ("GET", "/posts", {"params": {"sorting": "-likes"}}),
+    ),
+    Scenario(
+        "list_posts_hot",
+        lambda ctx: ("GET", "/posts", {"params": {"sorting": "-hot"}}),
+    ),
+    Scenario(
+        "list_posts_for_viewer",
+        lambda ctx: (
+            "GET",
+            "/posts",
+            {
+                "params": {"include": ["comment_count", "liked_by_me"]},
+                "headers": ctx.auth(),
+            },
+        ),
+    ),
+    Scenario("read_post", lambda ctx: ("GET", f"/posts/{ctx.hot_post()}", {})),
+    Scenario(
+        "search_posts",
+        lambda ctx: (
+            "GET",
+            "/posts/search",
+            {"params": {"q": ctx.rng.choice(VOCABULARY), "like_boost": 1}},
+        ),
+    ),
+    Scenario(
+        "list_comments", lambda ctx: ("GET", f"/posts/{ctx.hot_post()}/comments", {})
+    ),
+    Scenario(
+        "create_post",
+        lambda ctx: (
+            "POST",
+            "/posts",
+            {"json": {"body": "Load"}, "headers": ctx.auth()},
+        ),
+        frozenset({201}),
+    ),
+    Scenario(
+        "create_posts_batch",
+        lambda ctx: (
+            "POST",
+            "/posts:batch",
+            {"json": [{"body": "Load"}] * 20, "headers": ctx.auth()},
+        ),
+        frozenset({201}),
+    ),
+    Scenario(
+        "create_comment",
+        lambda ctx: (
+            "POST",
+            f"/posts/{ctx.hot_post()}/comments",
+            {"json": {"body": "Load"}, "headers": ctx.auth()},
+        ),
+        frozenset({201}),
+    ),
+    Scenario(
+        "create_comments_batch",
+        lambda ctx: (
+            "POST",
+            f"/posts/{ctx.hot_post()}/comments:batch",
+            {"json": [{"body": "Load"}] * 20, "headers": ctx.auth()},
+        ),
+        frozenset({201}),
+    ),
+    Scenario(
+        "like_post",
+        lambda ctx: ("POST", f"/posts/{ctx.hot_post()}/like", {"headers": ctx.auth()}),
+        frozenset({201, 202, 409}),
+    ),
+    Scenario(
+        "put_like",
+        lambda ctx: ("PUT", f"/posts/{ctx.hot_post()}/like", {"headers": ctx.auth()}),
+        frozenset({200, 202}),
+    ),
+    Scenario(
+        "unlike_post",
+        lambda ctx: (
+            "DELETE",
+            f"/posts/{ctx.hot_post()}/like",
+            {"headers": ctx.auth()},
+        ),
+        frozenset({204}),
+    ),
+    Scenario("register", register, frozenset({201})),
+    Scenario(
+        "login",
+        lambda ctx: (
+            "POST",
+            "/login",
+            {
+                "data": {
+                    "username": f"user{ctx.rng.randint(1, ctx.users)}@example.net",
+                    "password": PASSWORD,
+                }
+            },
+        ),
+    ),
+    Scenario("confirm_email", confirm),
+]
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+async def run_scenario(
+    client, scenario: Scenario, ctx: Context, concurrency: int, seconds: float
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    start = time.perf_counter()
+    stop = start + seconds
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < stop:
+            method, url, kwargs = scenario.request(ctx)
+            sent = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - sent)
+            if response.status_code not in scenario.ok:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def run_scenarios(client, args: argparse.Namespace, counts: dict) -> dict:
+    from app.security import create_access_token
+
+    rng = random.Random(args.seed)
+    tokens = [
+        create_access_token(f"user{rng.randint(1, counts['users'])}@example.net")
+        for _ in range(args.concurrency)
+    ]
+    ranks = PostRanks(counts["posts"], args.skew)
+    ctx = Context(rng, counts["users"], ranks, tokens)
+    results = {}
+    for scenario in SCENARIOS:
+        if args.scenarios and scenario.name not in args.scenarios:
+            continue
+        results[scenario.name] = await run_scenario(
+            client, scenario, ctx, args.concurrency, args.seconds
+        )
+        print(f"{scenario.name}: {results[scenario.name]}", file=sys.stderr)
+    return results
+
+
+async def run_asgi(args: argparse.Namespace, counts: dict) -> dict:
+    import httpx
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            return await run_scenarios(client, args, counts)
+
+
+async def run_uvicorn(args: argparse.Namespace, counts: dict, env: dict) -> dict:
+    import httpx
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env={**os.environ, **env},
+        stdout=sys.stderr,
+    )
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30
+        ) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/posts")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            return await run_scenarios(client, args, counts)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> dict:
+    """Changes against `baseline`, per target and scenario present in both."""
+    comparison = {}
+    for target, scenarios in results["runs"].items():
+        for name, current in scenarios.items():
+            before = baseline.get("runs", {}).get(target, {}).get(name)
+            if before is None:
+                continue
+            throughput = current["throughput_rps"] / before["throughput_rps"] - 1
+            p95 = current["p95_ms"] / before["p95_ms"] - 1
+            comparison[f"{target}/{name}"] = {
+                "throughput_change": round(throughput, 3),
+                "p95_change": round(p95, 3),
+                "regressed": throughput < -tolerance or p95 > tolerance,
+            }
+    return comparison
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    for table in ("users", "posts", "likes", "comments"):
+        parser.add_argument(f"--{table}", type=int, help="Overrides the scale.")
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database", help="Seeded database file to create or reuse.")
+    parser.add_argument(
+        "--target", nargs="+", choices=["asgi", "uvicorn"], default=["asgi"]
+    )
+    parser.add_argument("--scenarios", nargs="+", help="Only run these scenarios.")
+    parser.add_argument("--like-buffer", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--output", help="Also write the results to this file.")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare.")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    sizes = {
+        table: getattr(args, table) or size
+        for table, size in SCALES[args.scale].items()
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.database or os.path.join(directory, "load.db")
+        env = app_environment(path, args.like_buffer)
+        # The app reads its configuration when first imported.
+        os.environ.update(env)
+        if os.path.exists(path):
+            connection = sqlite3.connect(path)
+            counts = {
+                table: connection.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                for table in ("users", "posts", "likes", "comments")
+            }
+            connection.close()
+        else:
+            started = time.perf_counter()
+            counts = seed(path, sizes, args.skew, args.seed)
+            print(
+                f"Seeded {counts} in {time.perf_counter() - started:.1f}s",
+                file=sys.stderr,
+            )
+
+        results = {
+            "dataset": counts,
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "runs": {},
+        }
+        for target in args.target:
+            if target == "asgi":
+                # Keep the app's console log out of the JSON on stdout.
+                with contextlib.redirect_stdout(sys.stderr):
+                    results["runs"][target] = asyncio.run(run_asgi(args, counts))
+            else:
+                results["runs"][target] = asyncio.run(run_uvicorn(args, counts, env))
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f), args.tolerance)
+        regressed = any(c["regressed"] for c in results["comparison"].values())
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Compare the cost of a log call on the calling thread when the file handler
+writes directly and when the record is handed to the queue listener.
+
+Run with `python -m benchmarks.bench_logging [--number N]`.
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import timeit
+from logging.handlers import QueueListener, RotatingFileHandler
+
+os.environ.setdefault("ENV_STATE", "test")
+
+from app.logging_config import BoundedQueueHandler  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    formatter = logging.Formatter(
+        "%(asctime)s %(msecs)03dZ | %(levelname)-8s | %(name)s:%(lineno)d - %(message)s"
+    )
+    logger = logging.getLogger("bench")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as directory:
+        file = RotatingFileHandler(
+            os.path.join(directory, "bench.log"), maxBytes=1024 * 1024, backupCount=2
+        )
+        file.setFormatter(formatter)
+
+        logger.handlers = [file]
+        direct = timeit.timeit(lambda: logger.info("Listing posts"), number=args.number)
+
+        handler = BoundedQueueHandler(maxsize=args.number)
+        listener = QueueListener(handler.queue, file)
+        listener.start()
+        logger.handlers = [handler]
+        queued = timeit.timeit(lambda: logger.info("Listing posts"), number=args.number)
+        listener.stop()
+        file.close()
+
+    print(f"direct file handler: {direct / args.number * 1e6:8.2f} us/call")
+    print(f"queue handler:       {queued / args.number * 1e6:8.2f} us/call")
+    print(f"dropped:             {handler.dropped:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Measure the per-request cost of the metrics middleware by calling a bare
+ASGI endpoint directly and through the middleware.
+
+Run with `python -m benchmarks.bench_metrics [--number N] [--repeat N]`.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("ENV_STATE", "test")
+
+from starlette.routing import Route  # noqa: E402
+
+from app.metrics import MetricsMiddleware  # noqa: E402
+
+route = Route("/items/{item_id}", endpoint=lambda request: None)
+
+scope = {
+    "type": "http",
+    "method": "GET",
+    "path": "/items/1",
+    "headers": [],
+}
+
+
+async def endpoint(scope, receive, send):
+    """Stands in for the routed application: labels the route and responds."""
+    scope["route"] = route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def per_request(app, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / number
+
+
+async def best_of(apps: list, number: int, repeat: int) -> list[float]:
+    """Fastest of `repeat` rounds for each app, interleaved to even out noise."""
+    best = [float("inf")] * len(apps)
+    for _ in range(repeat):
+        for i, app in enumerate(apps):
+            best[i] = min(best[i], await per_request(app, number))
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    plain, instrumented = asyncio.run(
+        best_of([endpoint, MetricsMiddleware(endpoint)], args.number, args.repeat)
+    )
+
+    print(f"bare endpoint:   {plain * 1e6:8.2f} us/request")
+    print(f"with metrics:    {instrumented * 1e6:8.2f} us/request")
+    print(f"overhead:        {(instrumented - plain) * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Measure the cost of the login rate limiter: a token bucket lookup for a
+returning key, for a stream of new keys that keeps evicting, and the memory
+held per tracked key.
+
+Run with `python -m benchmarks.bench_ratelimit [--keys N] [--number N]`.
+"""
+
+import argparse
+import os
+import timeit
+import tracemalloc
+
+os.environ.setdefault("ENV_STATE", "test")
+
+from app.ratelimit import TokenBucketLimiter  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--number", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    limiter = TokenBucketLimiter("bench", 1e9, 10**9, args.keys)
+    same = timeit.timeit(lambda: limiter.take("10.0.0.1"), number=args.number)
+
+    # Twice as many addresses as fit, so every call evicts one.
+    addresses = [
+        f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(args.keys * 2)
+    ]
+    limiter = TokenBucketLimiter("bench", 1.0, 20, args.keys)
+    calls = iter(addresses * (args.number // len(addresses) + 1))
+    churn = timeit.timeit(lambda: limiter.take(next(calls)), number=args.number)
+
+    limiter = TokenBucketLimiter("bench", 1.0, 20, args.keys)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for address in addresses[: args.keys]:
+        limiter.take(address)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(f"returning key: {same / args.number * 1e9:8.0f} ns per call")
+    print(f"new keys:      {churn / args.number * 1e9:8.0f} ns per call, evicting")
+    print(
+        f"memory:        {held / args.keys:8.0f} bytes per key, besides the key itself"
+    )
+
+
+if __name__ == "__main__":
+    main()
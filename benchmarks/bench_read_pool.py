@@ -0,0 +1,108 @@
+"""Measure read throughput of the post listing query while likes and
+comments are written concurrently, for a plain shared `databases.Database`
+and for the WAL-tuned read pool at several sizes.
+
+Run with `python -m benchmarks.bench_read_pool [--seconds S] [--readers N]`.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("ENV_STATE", "test")
+
+import databases  # noqa: E402
+
+from app.database import (  # noqa: E402
+    comment_table,
+    create_engine,
+    like_table,
+    metadata,
+    post_table,
+    sqlite_pragmas,
+    user_table,
+)
+from app.routers.post import select_post_and_likes  # noqa: E402
+from app.sqlite import SQLiteDatabase  # noqa: E402
+
+
+def create_schema(url: str, posts: int) -> None:
+    engine = create_engine(url)
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            user_table.insert(),
+            [{"email": f"user{i}@example.net", "password": "x"} for i in range(100)],
+        )
+        connection.execute(
+            post_table.insert(),
+            [{"body": f"Post {i}", "user_id": 1} for i in range(posts)],
+        )
+    engine.dispose()
+
+
+async def measure(writer, reader, seconds: float, readers: int) -> float:
+    stop = time.perf_counter() + seconds
+    query = select_post_and_likes.order_by(post_table.c.id.desc()).limit(20)
+    reads = 0
+
+    async def read() -> None:
+        nonlocal reads
+        while time.perf_counter() < stop:
+            await reader.fetch_all(query)
+            reads += 1
+
+    async def write() -> None:
+        n = 0
+        while time.perf_counter() < stop:
+            n += 1
+            await writer.execute(
+                comment_table.insert().values(body="c", post_id=n % 100 + 1, user_id=1)
+            )
+            await writer.execute(
+                like_table.insert()
+                .prefix_with("OR IGNORE")
+                .values(post_id=n % 1000 + 1, user_id=n // 1000 % 100 + 1)
+            )
+
+    await asyncio.gather(write(), *(read() for _ in range(readers)))
+    return reads / seconds
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{directory}/bench.db"
+        create_schema(url, args.posts)
+
+        shared = databases.Database(url)
+        await shared.connect()
+        rate = await measure(shared, shared, args.seconds, args.readers)
+        await shared.disconnect()
+        print(f"shared databases.Database: {rate:10,.0f} reads/s")
+
+        writer = SQLiteDatabase(url, pool_size=1, pragmas=sqlite_pragmas())
+        await writer.connect()
+        for size in args.pool_sizes:
+            reader = SQLiteDatabase(
+                url, pool_size=size, pragmas=sqlite_pragmas(read_only=True)
+            )
+            await reader.connect()
+            rate = await measure(writer, reader, args.seconds, args.readers)
+            await reader.disconnect()
+            print(f"read pool of {size:2}:           {rate:10,.0f} reads/s")
+        await writer.disconnect()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
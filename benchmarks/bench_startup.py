@@ -0,0 +1,80 @@
+"""Measure cold start: importing the app, running its startup and serving
+the first request, each in a fresh interpreter.
+
+Run with `python -m benchmarks.bench_startup [--runs N] [--output FILE]`.
+Prints the median of every phase in milliseconds as JSON, so results can be
+stored and compared over time.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    started = time.perf_counter()
+    assert client.get("/posts").status_code == 200
+    served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "first_request_ms": (served - started) * 1000,
+    "total_ms": (served - start) * 1000,
+}))
+"""
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "ENV_STATE": "test",
+            "TEST_DATABASE_URL": f"sqlite:///{directory}/startup.db",
+            "TEST_EMAIL_WORKER_ENABLED": "false",
+        }
+        subprocess.run(
+            [sys.executable, "-m", "app.cli", "create-schema"],
+            env=env,
+            check=True,
+            capture_output=True,
+        )
+        runs = [
+            json.loads(
+                subprocess.run(
+                    [sys.executable, "-c", CHILD],
+                    env=env,
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout.splitlines()[-1]
+            )
+            for _ in range(args.runs)
+        ]
+
+    result = {
+        phase: round(statistics.median(run[phase] for run in runs), 1)
+        for phase in runs[0]
+    }
+    result["runs"] = args.runs
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,13 @@ os.environ["ENV_STATE"] = "test"
 
 from typing import AsyncGenerator, Generator
 import pytest
-from unittest.mock import patch
 from fastapi.testclient import TestClient
 from httpx import AsyncClient, ASGITransport
 
 from app.main import app
-from app.database import database, user_table
+from app.cache import caches
+from app.ratelimit import limiters
+from app.database import create_engine, database, metadata, user_table
 
 
 @pytest.fixture(scope="session")
@@ -17,11 +18,31 @@ def anyio_backend():
     return "asyncio"
 
 
+@pytest.fixture(scope="session", autouse=True)
+def schema() -> None:
+    engine = create_engine()
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    engine.dispose()
+
+
 @pytest.fixture()
 def client() -> Generator:
     yield TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def clear_caches() -> None:
+    for cache in caches.values():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_rate_limits() -> None:
+    for limiter in limiters.values():
+        limiter.clear()
+
+
 @pytest.fixture(autouse=True)
 async def db() -> AsyncGenerator:
     await database.connect()
@@ -76,11 +97,3 @@ async def confirmed_user_with_password(registered_user: dict) -> dict:
     )
     await database.execute(query)
     return {**registered_user, "password": registered_user["password"]}
-
-
-@pytest.fixture(autouse=True)
-def mock_mailtrap_post():
-    with patch("requests.post") as mock_post:
-        mock_post.return_value.status_code = 200
-        mock_post.return_value.text = '{"success": true}'
-        yield mock_post
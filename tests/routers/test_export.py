@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+from http import HTTPStatus
+
+from app.database import database
+from tests.routers.conftest import create_comment, create_post, like_post
+
+
+def ndjson(content: bytes) -> list[dict]:
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+@pytest.fixture()
+async def exported_data(async_client: AsyncClient, logged_in_token: str) -> None:
+    for body in ("First", "Second", "Third"):
+        post = await create_post(body, async_client, logged_in_token)
+        await create_comment(body, post["id"], async_client, logged_in_token)
+    await like_post(2, async_client, logged_in_token)
+
+
+@pytest.mark.anyio
+async def test_export_posts(
+    async_client: AsyncClient, logged_in_token: str, exported_data
+):
+    response = await async_client.get(
+        "/export/posts.ndjson", headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    posts = ndjson(response.content)
+    assert [post["id"] for post in posts] == [1, 2, 3]
+    assert [post["likes"] for post in posts] == [0, 1, 0]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "path, expected_ids",
+    [("/export/comments.ndjson", [2, 3]), ("/export/likes.ndjson", [])],
+)
+async def test_export_since_id(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    exported_data,
+    path: str,
+    expected_ids: list[int],
+):
+    response = await async_client.get(
+        path,
+        params={"since_id": 1},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [row["id"] for row in ndjson(response.content)] == expected_ids
+
+
+@pytest.mark.anyio
+async def test_export_reads_in_chunks(
+    async_client: AsyncClient, logged_in_token: str, exported_data, mocker
+):
+    mocker.patch("app.routers.export.config.EXPORT_CHUNK_SIZE", 2)
+    fetch_all = mocker.spy(database, "fetch_all")
+
+    response = await async_client.get(
+        "/export/comments.ndjson",
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert [comment["body"] for comment in ndjson(response.content)] == [
+        "First",
+        "Second",
+        "Third",
+    ]
+    assert fetch_all.call_count == 2
+
+
+@pytest.mark.anyio
+async def test_export_requires_authentication(async_client: AsyncClient):
+    response = await async_client.get("/export/likes.ndjson")
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
@@ -0,0 +1,280 @@
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+
+from app.config import config
+from app.database import database, timeline_table, user_table
+from app.routers.feed import catch_up_feeds
+from app.security import create_access_token
+
+from tests.routers.conftest import create_post
+
+
+@pytest.fixture()
+async def author(confirmed_user: dict) -> dict:
+    """A second user, with an access token, for the logged in user to follow."""
+    email = "author@example.net"
+    user_id = await database.execute(
+        user_table.insert().values(email=email, password="", confirmed=True)
+    )
+    return {"id": user_id, "email": email, "token": create_access_token(email)}
+
+
+async def follow(user_id: int, async_client: AsyncClient, token: str):
+    return await async_client.post(
+        f"/users/{user_id}/follow", headers={"Authorization": f"Bearer {token}"}
+    )
+
+
+async def read_feed(async_client: AsyncClient, token: str, **params) -> dict:
+    response = await async_client.get(
+        "/feed", params=params, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+async def feed_ids(async_client: AsyncClient, token: str) -> list[int]:
+    data = await read_feed(async_client, token)
+    return [post["id"] for post in data["posts"]]
+
+
+async def timeline_post_ids(user_id: int) -> list[int]:
+    query = timeline_table.select().where(timeline_table.c.user_id == user_id)
+    return [entry.post_id for entry in await database.fetch_all(query)]
+
+
+async def follower_count(user_id: int) -> int:
+    query = user_table.select().where(user_table.c.id == user_id)
+    return (await database.fetch_one(query)).follower_count
+
+
+@pytest.mark.anyio
+async def test_follow_user(
+    async_client: AsyncClient, logged_in_token: str, confirmed_user: dict, author
+):
+    response = await follow(author["id"], async_client, logged_in_token)
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json() == {
+        "follower_id": confirmed_user["id"],
+        "followee_id": author["id"],
+    }
+    assert await follower_count(author["id"]) == 1
+
+
+@pytest.mark.anyio
+async def test_follow_user_twice(
+    async_client: AsyncClient, logged_in_token: str, author
+):
+    await follow(author["id"], async_client, logged_in_token)
+    response = await follow(author["id"], async_client, logged_in_token)
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert await follower_count(author["id"]) == 1
+
+
+@pytest.mark.anyio
+async def test_follow_missing_user(async_client: AsyncClient, logged_in_token: str):
+    response = await follow(123, async_client, logged_in_token)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_follow_yourself(
+    async_client: AsyncClient, logged_in_token: str, confirmed_user: dict
+):
+    response = await follow(confirmed_user["id"], async_client, logged_in_token)
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_feed_has_own_and_followed_posts_newest_first(
+    async_client: AsyncClient, logged_in_token: str, author
+):
+    await follow(author["id"], async_client, logged_in_token)
+    first = await create_post("By author", async_client, author["token"])
+    second = await create_post("Own post", async_client, logged_in_token)
+    third = await create_post("By author again", async_client, author["token"])
+
+    data = await read_feed(async_client, logged_in_token)
+
+    assert [post["id"] for post in data["posts"]] == [
+        third["id"],
+        second["id"],
+        first["id"],
+    ]
+    assert data["posts"][0]["likes"] == 0
+    assert data["next_cursor"] is None
+
+
+@pytest.mark.anyio
+async def test_feed_excludes_unfollowed_users(
+    async_client: AsyncClient, logged_in_token: str, author
+):
+    await create_post("By author", async_client, author["token"])
+
+    assert await feed_ids(async_client, logged_in_token) == []
+
+
+@pytest.mark.anyio
+async def test_follow_backfills_recent_posts(
+    async_client: AsyncClient, logged_in_token: str, author, mocker
+):
+    mocker.patch.object(config, "FEED_BACKFILL_POSTS", 2)
+    posts = [
+        await create_post(f"Post {i}", async_client, author["token"]) for i in range(3)
+    ]
+
+    await follow(author["id"], async_client, logged_in_token)
+
+    assert await feed_ids(async_client, logged_in_token) == [
+        posts[2]["id"],
+        posts[1]["id"],
+    ]
+
+
+@pytest.mark.anyio
+async def test_create_posts_batch_fans_out(
+    async_client: AsyncClient, logged_in_token: str, author
+):
+    await follow(author["id"], async_client, logged_in_token)
+    response = await async_client.post(
+        "/posts:batch",
+        json=[{"body": "One"}, {"body": "Two"}],
+        headers={"Authorization": f"Bearer {author['token']}"},
+    )
+    ids = response.json()["ids"]
+
+    assert await feed_ids(async_client, logged_in_token) == ids[::-1]
+
+
+@pytest.mark.anyio
+async def test_unfollow_user_removes_posts_from_feed(
+    async_client: AsyncClient, logged_in_token: str, author
+):
+    await follow(author["id"], async_client, logged_in_token)
+    await create_post("By author", async_client, author["token"])
+    own = await create_post("Own post", async_client, logged_in_token)
+
+    response = await async_client.delete(
+        f"/users/{author['id']}/follow",
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert await feed_ids(async_client, logged_in_token) == [own["id"]]
+    assert await follower_count(author["id"]) == 0
+
+
+@pytest.mark.anyio
+async def test_unfollow_user_not_followed(
+    async_client: AsyncClient, logged_in_token: str, author
+):
+    response = await async_client.delete(
+        f"/users/{author['id']}/follow",
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert await follower_count(author["id"]) == 0
+
+
+@pytest.mark.anyio
+async def test_feed_reads_posts_of_accounts_over_fanout_limit(
+    async_client: AsyncClient, logged_in_token: str, author, mocker
+):
+    mocker.patch.object(config, "FEED_FANOUT_MAX_FOLLOWERS", 0)
+    await follow(author["id"], async_client, logged_in_token)
+    post = await create_post("By author", async_client, author["token"])
+    own = await create_post("Own post", async_client, logged_in_token)
+
+    entries = await database.fetch_all(
+        timeline_table.select().where(timeline_table.c.post_id == post["id"])
+    )
+    assert [entry.user_id for entry in entries] == [author["id"]]
+    assert await feed_ids(async_client, logged_in_token) == [own["id"], post["id"]]
+
+
+@pytest.mark.anyio
+async def test_feed_keeps_posts_of_accounts_back_under_fanout_limit(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    confirmed_user: dict,
+    author,
+    mocker,
+):
+    mocker.patch.object(config, "FEED_FANOUT_MAX_FOLLOWERS", 1)
+    email = "other@example.net"
+    await database.execute(
+        user_table.insert().values(email=email, password="", confirmed=True)
+    )
+    other_token = create_access_token(email)
+    await follow(author["id"], async_client, logged_in_token)
+    await follow(author["id"], async_client, other_token)
+    post = await create_post("By author", async_client, author["token"])
+
+    await async_client.delete(
+        f"/users/{author['id']}/follow",
+        headers={"Authorization": f"Bearer {other_token}"},
+    )
+
+    assert await follower_count(author["id"]) == 1
+    assert await timeline_post_ids(confirmed_user["id"]) == []
+    assert await feed_ids(async_client, logged_in_token) == [post["id"]]
+    assert await feed_ids(async_client, other_token) == []
+
+    assert await catch_up_feeds(batch_size=1) == 1
+
+    assert await timeline_post_ids(confirmed_user["id"]) == [post["id"]]
+    assert await feed_ids(async_client, logged_in_token) == [post["id"]]
+    assert await catch_up_feeds() == 0
+
+
+@pytest.mark.anyio
+async def test_catch_up_skips_accounts_that_did_not_post_over_fanout_limit(
+    async_client: AsyncClient, logged_in_token: str, author, mocker
+):
+    await follow(author["id"], async_client, logged_in_token)
+    post = await create_post("By author", async_client, author["token"])
+    # Over the limit and back, without posting in between.
+    mocker.patch.object(config, "FEED_FANOUT_MAX_FOLLOWERS", 0)
+    assert await catch_up_feeds() == 0
+    mocker.patch.object(config, "FEED_FANOUT_MAX_FOLLOWERS", 1)
+
+    assert await catch_up_feeds() == 0
+    assert await feed_ids(async_client, logged_in_token) == [post["id"]]
+
+
+@pytest.mark.anyio
+async def test_feed_pagination(
+    async_client: AsyncClient, logged_in_token: str, author, mocker
+):
+    mocker.patch.object(config, "FEED_FANOUT_MAX_FOLLOWERS", 0)
+    await follow(author["id"], async_client, logged_in_token)
+    ids = []
+    for i in range(5):
+        token = author["token"] if i % 2 else logged_in_token
+        ids.append((await create_post(f"Post {i}", async_client, token))["id"])
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        data = await read_feed(async_client, logged_in_token, **params)
+        seen += [post["id"] for post in data["posts"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == ids[::-1]
+
+
+@pytest.mark.anyio
+async def test_feed_requires_authentication(async_client: AsyncClient):
+    response = await async_client.get("/feed")
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
@@ -0,0 +1,64 @@
+import pytest
+from httpx import AsyncClient
+from http import HTTPStatus
+
+from app.metrics import (
+    db_query_duration,
+    executor_call_duration,
+    http_request_duration,
+    http_requests,
+    http_requests_in_flight,
+)
+
+
+@pytest.mark.anyio
+async def test_requests_are_labelled_by_route(
+    async_client: AsyncClient, created_post: dict
+):
+    requests = http_requests.value("GET", "/posts/{post_id}", 200)
+    timed = http_request_duration.count("GET", "/posts/{post_id}")
+
+    await async_client.get(f"/posts/{created_post['id']}")
+
+    assert http_requests.value("GET", "/posts/{post_id}", 200) == requests + 1
+    assert http_request_duration.count("GET", "/posts/{post_id}") == timed + 1
+    assert http_requests_in_flight.value("GET") == 0
+
+
+@pytest.mark.anyio
+async def test_unmatched_requests_share_a_label(async_client: AsyncClient):
+    requests = http_requests.value("GET", "unmatched", 404)
+
+    await async_client.get("/no/such/path/123")
+
+    assert http_requests.value("GET", "unmatched", 404) == requests + 1
+
+
+@pytest.mark.anyio
+async def test_queries_and_bcrypt_are_timed(async_client: AsyncClient):
+    inserts = db_query_duration.count("insert users")
+    hashes = executor_call_duration.count("bcrypt", "hashpw")
+
+    await async_client.post(
+        "/register", json={"email": "metrics@example.net", "password": "1234"}
+    )
+
+    assert db_query_duration.count("insert users") > inserts
+    assert executor_call_duration.count("bcrypt", "hashpw") == hashes + 1
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint(async_client: AsyncClient, created_post: dict):
+    await async_client.get("/posts")
+
+    response = await async_client.get("/metrics")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert 'http_requests_total{method="GET",route="/posts",status="200"}' in (
+        response.text
+    )
+    assert 'db_query_duration_seconds_count{statement="select posts"}' in (
+        response.text
+    )
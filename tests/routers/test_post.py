@@ -2,6 +2,12 @@ import pytest
 from httpx import AsyncClient
 from http import HTTPStatus
 
+from app.config import config
+from app.database import database, post_table, read_database
+from app.routers.post import like_buffer, response_cache
+
+from tests.routers.conftest import create_comment, create_post, like_post
+
 
 @pytest.mark.anyio
 async def test_create_post(
@@ -40,7 +46,7 @@ async def test_list_all_posts(async_client: AsyncClient, created_post: dict):
     response = await async_client.get("/posts")
 
     assert response.status_code == HTTPStatus.OK
-    assert created_post.items() <= response.json()[0].items()
+    assert created_post.items() <= response.json()["posts"][0].items()
 
 
 @pytest.mark.anyio
@@ -63,7 +69,7 @@ async def test_list_all_posts_sorting(
     assert response.status_code == HTTPStatus.OK
 
     data = response.json()
-    post_ids = [post["id"] for post in data]
+    post_ids = [post["id"] for post in data["posts"]]
     assert post_ids == expected_order
 
 
@@ -77,7 +83,210 @@ async def test_get_all_posts_sorting_likes(
     response = await async_client.get("/posts", params={"sorting": "-likes"})
     assert response.status_code == HTTPStatus.OK
     data = response.json()
-    assert [post["id"] for post in data] == [2, 1]
+    assert [post["id"] for post in data["posts"]] == [2, 1]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "sorting, expected_order",
+    [
+        ("-id", [3, 2, 1]),
+        ("+id", [1, 2, 3]),
+        ("-likes", [2, 3, 1]),
+        ("-hot", [2, 3, 1]),
+    ],
+)
+async def test_list_posts_pagination(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    sorting: str,
+    expected_order: list[int],
+):
+    await create_post("First", async_client, logged_in_token)
+    await create_post("Second", async_client, logged_in_token)
+    await create_post("Third", async_client, logged_in_token)
+    await like_post(2, async_client, logged_in_token)
+
+    post_ids = []
+    cursor = None
+    for _ in range(3):
+        params = {"sorting": sorting, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await async_client.get("/posts", params=params)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        post_ids += [post["id"] for post in data["posts"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert post_ids == expected_order
+    assert cursor is None
+
+
+@pytest.mark.anyio
+async def test_list_posts_hot_follows_comments(
+    async_client: AsyncClient, logged_in_token: str
+):
+    await create_post("First", async_client, logged_in_token)
+    await create_post("Second", async_client, logged_in_token)
+    await like_post(2, async_client, logged_in_token)
+    for body in ("One", "Two"):
+        await create_comment(body, 1, async_client, logged_in_token)
+
+    response = await async_client.get("/posts", params={"sorting": "-hot"})
+
+    assert [post["id"] for post in response.json()["posts"]] == [1, 2]
+
+
+@pytest.mark.anyio
+async def test_list_posts_hot_skips_compacted_posts(
+    async_client: AsyncClient, logged_in_token: str
+):
+    await create_post("First", async_client, logged_in_token)
+    await create_post("Second", async_client, logged_in_token)
+    await database.execute(
+        post_table.update().where(post_table.c.id == 1).values(hot_score=None)
+    )
+
+    response = await async_client.get("/posts", params={"sorting": "-hot"})
+
+    assert [post["id"] for post in response.json()["posts"]] == [2]
+
+
+@pytest.mark.anyio
+async def test_list_posts_last_page_has_no_cursor(
+    async_client: AsyncClient, created_post: dict
+):
+    response = await async_client.get("/posts", params={"limit": 1})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["next_cursor"] is None
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "eyJzIjoiLWlkIn0"])
+async def test_list_posts_invalid_cursor(async_client: AsyncClient, cursor: str):
+    response = await async_client.get("/posts", params={"cursor": cursor})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.anyio
+async def test_list_posts_cursor_from_other_sorting(
+    async_client: AsyncClient, logged_in_token: str
+):
+    await create_post("First", async_client, logged_in_token)
+    await create_post("Second", async_client, logged_in_token)
+    response = await async_client.get("/posts", params={"limit": 1})
+    cursor = response.json()["next_cursor"]
+
+    response = await async_client.get(
+        "/posts", params={"sorting": "-likes", "cursor": cursor}
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_search_posts(async_client: AsyncClient, logged_in_token: str):
+    await create_post("Ripe apples", async_client, logged_in_token)
+    await create_post("Bananas and apples and pears", async_client, logged_in_token)
+    await create_post("Only pears", async_client, logged_in_token)
+
+    response = await async_client.get("/posts/search", params={"q": "apples"})
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert [post["body"] for post in data["posts"]] == [
+        "Ripe apples",
+        "Bananas and apples and pears",
+    ]
+    assert data["posts"][0] == {
+        "body": "Ripe apples",
+        "id": 1,
+        "user_id": 1,
+        "likes": 0,
+    }
+    assert data["next_cursor"] is None
+
+
+@pytest.mark.anyio
+async def test_search_posts_matches_every_word(
+    async_client: AsyncClient, logged_in_token: str
+):
+    await create_post("Ripe apples", async_client, logged_in_token)
+    await create_post("Apples and pears", async_client, logged_in_token)
+
+    response = await async_client.get("/posts/search", params={"q": "pears APPLES"})
+
+    assert [post["id"] for post in response.json()["posts"]] == [2]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("q", ['"unbalanced', "apples OR", "NEAR(", "*", "  "])
+async def test_search_posts_query_syntax_is_literal(
+    async_client: AsyncClient, created_post: dict, q: str
+):
+    response = await async_client.get("/posts/search", params={"q": q})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["posts"] == []
+
+
+@pytest.mark.anyio
+async def test_search_posts_pagination(async_client: AsyncClient, logged_in_token: str):
+    for i in range(5):
+        await create_post(
+            f"Post number {i} " + "word " * i, async_client, logged_in_token
+        )
+
+    post_ids = []
+    cursor = None
+    for _ in range(5):
+        params = {"q": "post", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        data = (await async_client.get("/posts/search", params=params)).json()
+        post_ids += [post["id"] for post in data["posts"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    # Shorter bodies are more relevant.
+    assert post_ids == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.anyio
+async def test_search_posts_like_boost(async_client: AsyncClient, logged_in_token: str):
+    await create_post("Apples", async_client, logged_in_token)
+    await create_post("Apples and many pears", async_client, logged_in_token)
+    await like_post(2, async_client, logged_in_token)
+
+    plain = await async_client.get("/posts/search", params={"q": "apples"})
+    boosted = await async_client.get(
+        "/posts/search", params={"q": "apples", "like_boost": 10}
+    )
+
+    assert [post["id"] for post in plain.json()["posts"]] == [1, 2]
+    assert [post["id"] for post in boosted.json()["posts"]] == [2, 1]
+
+
+@pytest.mark.anyio
+async def test_search_posts_cursor_from_other_boost(
+    async_client: AsyncClient, logged_in_token: str
+):
+    await create_post("Apples", async_client, logged_in_token)
+    await create_post("Apples too", async_client, logged_in_token)
+    response = await async_client.get(
+        "/posts/search", params={"q": "apples", "limit": 1}
+    )
+    cursor = response.json()["next_cursor"]
+
+    response = await async_client.get(
+        "/posts/search", params={"q": "apples", "like_boost": 1, "cursor": cursor}
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
 
 
 @pytest.mark.anyio
@@ -111,7 +320,7 @@ async def test_get_comments_on_post(
     response = await async_client.get(f"/posts/{created_post['id']}/comments")
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == [created_comment]
+    assert response.json() == {"comments": [created_comment], "next_cursor": None}
 
 
 @pytest.mark.anyio
@@ -121,7 +330,7 @@ async def test_get_comments_on_post_without_comments(
     response = await async_client.get(f"/posts/{created_post['id']}/comments")
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == []
+    assert response.json() == {"comments": [], "next_cursor": None}
 
 
 @pytest.mark.anyio
@@ -134,6 +343,7 @@ async def test_post_with_comments(
     assert response.json() == {
         "post": {**created_post, "likes": 0},
         "comments": [created_comment],
+        "next_comments_cursor": None,
     }
 
 
@@ -155,3 +365,664 @@ async def test_like_post(
         headers={"Authorization": f"Bearer {logged_in_token}"},
     )
     assert response.status_code == HTTPStatus.CREATED
+
+
+@pytest.mark.anyio
+async def test_like_post_updates_like_count(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    await like_post(created_post["id"], async_client, logged_in_token)
+
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 1
+
+
+@pytest.mark.anyio
+async def test_like_post_twice(
+    async_client: AsyncClient, created_post_with_like: dict, logged_in_token: str
+):
+    response = await async_client.post(
+        f"/posts/{created_post_with_like['id']}/like",
+        json={},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == HTTPStatus.CONFLICT
+
+    response = await async_client.get(f"/posts/{created_post_with_like['id']}")
+    assert response.json()["post"]["likes"] == 1
+
+
+@pytest.mark.anyio
+async def test_list_posts_served_from_cache(
+    async_client: AsyncClient, created_post: dict, mocker
+):
+    first = await async_client.get("/posts")
+    fetch_all = mocker.spy(database, "fetch_all")
+    second = await async_client.get("/posts")
+
+    assert second.status_code == HTTPStatus.OK
+    assert second.content == first.content
+    assert second.headers["content-type"] == first.headers["content-type"]
+    fetch_all.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_post_with_comments_served_from_cache(
+    async_client: AsyncClient, created_post: dict, mocker
+):
+    first = await async_client.get(f"/posts/{created_post['id']}")
+    fetch_one = mocker.spy(database, "fetch_one")
+    second = await async_client.get(f"/posts/{created_post['id']}")
+
+    assert second.content == first.content
+    fetch_one.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_create_post_invalidates_listings(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    for sorting in ("-id", "+id", "-likes"):
+        await async_client.get("/posts", params={"sorting": sorting})
+
+    await create_post("Second post", async_client, logged_in_token)
+
+    for sorting in ("-id", "+id", "-likes"):
+        response = await async_client.get("/posts", params={"sorting": sorting})
+        assert len(response.json()["posts"]) == 2
+
+
+@pytest.mark.anyio
+async def test_create_post_keeps_unaffected_pages(
+    async_client: AsyncClient, logged_in_token: str, mocker
+):
+    for body in ("First", "Second", "Third"):
+        await create_post(body, async_client, logged_in_token)
+    first = await async_client.get("/posts", params={"limit": 2})
+    cursor = first.json()["next_cursor"]
+    await async_client.get("/posts", params={"limit": 2, "cursor": cursor})
+
+    await create_post("Fourth", async_client, logged_in_token)
+    fetch_all = mocker.spy(database, "fetch_all")
+    second_page = await async_client.get(
+        "/posts", params={"limit": 2, "cursor": cursor}
+    )
+    first_page = await async_client.get("/posts", params={"limit": 2})
+
+    assert [post["id"] for post in second_page.json()["posts"]] == [1]
+    assert [post["id"] for post in first_page.json()["posts"]] == [4, 3]
+    assert fetch_all.call_count == 1
+
+
+@pytest.mark.anyio
+async def test_create_comment_invalidates_post(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    await async_client.get(f"/posts/{created_post['id']}")
+    comment = await create_comment(
+        "New comment", created_post["id"], async_client, logged_in_token
+    )
+
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    assert response.json()["comments"] == [comment]
+
+
+@pytest.mark.anyio
+async def test_like_post_invalidates_listings(
+    async_client: AsyncClient,
+    created_post: dict,
+    created_post_with_like: dict,
+    logged_in_token: str,
+):
+    await async_client.get("/posts", params={"sorting": "-likes"})
+    await async_client.get(f"/posts/{created_post['id']}")
+
+    await like_post(created_post["id"], async_client, logged_in_token)
+
+    response = await async_client.get("/posts", params={"sorting": "-likes"})
+    assert [post["likes"] for post in response.json()["posts"]] == [1, 1]
+    assert [post["id"] for post in response.json()["posts"]] == [2, 1]
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 1
+
+
+@pytest.mark.anyio
+async def test_like_post_allows_bounded_staleness(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, mocker
+):
+    mocker.patch("app.routers.post.config.RESPONSE_CACHE_STALENESS", 60.0)
+    await async_client.get(f"/posts/{created_post['id']}")
+
+    await like_post(created_post["id"], async_client, logged_in_token)
+
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 0
+
+
+@pytest.mark.anyio
+async def test_response_cache_disabled(
+    async_client: AsyncClient, created_post: dict, mocker
+):
+    mocker.patch("app.routers.post.config.RESPONSE_CACHE_ENABLED", False)
+    await async_client.get("/posts")
+    fetch_all = mocker.spy(database, "fetch_all")
+    await async_client.get("/posts")
+
+    fetch_all.assert_called_once()
+
+
+@pytest.mark.anyio
+async def test_post_with_comments_etag(
+    async_client: AsyncClient, created_post: dict, mocker
+):
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    etag = response.headers["ETag"]
+
+    response_cache.clear()
+    fetch_all = mocker.spy(database, "fetch_all")
+    response = await async_client.get(
+        f"/posts/{created_post['id']}", headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    fetch_all.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_post_with_comments_etag_from_cache(
+    async_client: AsyncClient, created_post: dict
+):
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    etag = response.headers["ETag"]
+
+    response = await async_client.get(
+        f"/posts/{created_post['id']}", headers={"If-None-Match": f'"x", W/{etag}'}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("write", ["comment", "like"])
+async def test_writes_change_etag(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, write
+):
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    etag = response.headers["ETag"]
+
+    if write == "comment":
+        await create_comment("New", created_post["id"], async_client, logged_in_token)
+    else:
+        await like_post(created_post["id"], async_client, logged_in_token)
+
+    for path in (
+        f"/posts/{created_post['id']}",
+        f"/posts/{created_post['id']}/comments",
+    ):
+        response = await async_client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["ETag"] != etag
+
+
+@pytest.mark.anyio
+async def test_get_comments_etag(
+    async_client: AsyncClient, created_comment: dict, mocker
+):
+    path = f"/posts/{created_comment['post_id']}/comments"
+    response = await async_client.get(path)
+    assert response.json()["comments"] == [created_comment]
+    etag = response.headers["ETag"]
+
+    fetch_all = mocker.spy(database, "fetch_all")
+    response = await async_client.get(path, headers={"If-None-Match": etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    fetch_all.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_create_comment_missing_post(
+    async_client: AsyncClient, logged_in_token: str
+):
+    response = await async_client.post(
+        "/posts/2/comments",
+        json={"body": "Test comment"},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_create_posts_batch(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    await async_client.get("/posts")
+    response = await async_client.post(
+        "/posts:batch",
+        json=[{"body": "Second"}, {"body": "Third"}],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json() == {"ids": [2, 3]}
+    response = await async_client.get("/posts")
+    assert [post["body"] for post in response.json()["posts"]] == [
+        "Third",
+        "Second",
+        "Test post",
+    ]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("posts", [[], [{"body": "Valid"}, {}]])
+async def test_create_posts_batch_is_all_or_nothing(
+    async_client: AsyncClient, logged_in_token: str, posts: list
+):
+    response = await async_client.post(
+        "/posts:batch",
+        json=posts,
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    response = await async_client.get("/posts")
+    assert response.json()["posts"] == []
+
+
+@pytest.mark.anyio
+async def test_create_posts_batch_too_large(
+    async_client: AsyncClient, logged_in_token: str
+):
+    response = await async_client.post(
+        "/posts:batch",
+        json=[{"body": "Post"}] * (config.BATCH_MAX_ITEMS + 1),
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.anyio
+async def test_create_comments_batch(
+    async_client: AsyncClient, created_comment: dict, logged_in_token: str
+):
+    post_id = created_comment["post_id"]
+    await async_client.get(f"/posts/{post_id}")
+    response = await async_client.post(
+        f"/posts/{post_id}/comments:batch",
+        json=[{"body": "Second"}, {"body": "Third"}],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json() == {"ids": [2, 3]}
+    response = await async_client.get(f"/posts/{post_id}")
+    assert [comment["body"] for comment in response.json()["comments"]] == [
+        "Test comment",
+        "Second",
+        "Third",
+    ]
+
+
+@pytest.mark.anyio
+async def test_create_comments_batch_missing_post(
+    async_client: AsyncClient, logged_in_token: str
+):
+    response = await async_client.post(
+        "/posts/2/comments:batch",
+        json=[{"body": "Comment"}],
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_put_like_is_idempotent(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, mocker
+):
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    first = await async_client.put(f"/posts/{created_post['id']}/like", headers=headers)
+    fetch_one = mocker.spy(database, "fetch_one")
+    second = await async_client.put(
+        f"/posts/{created_post['id']}/like", headers=headers
+    )
+
+    assert first.status_code == second.status_code == HTTPStatus.OK
+    assert first.json() == second.json()
+    assert fetch_one.call_count == 1
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 1
+
+
+@pytest.mark.anyio
+async def test_put_like_missing_post(async_client: AsyncClient, logged_in_token: str):
+    response = await async_client.put(
+        "/posts/2/like", headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_delete_like(
+    async_client: AsyncClient, created_post_with_like: dict, logged_in_token: str
+):
+    path = f"/posts/{created_post_with_like['id']}"
+    headers = {"Authorization": f"Bearer {logged_in_token}"}
+    await async_client.get("/posts", params={"sorting": "-likes"})
+    await async_client.get(path)
+
+    for _ in range(2):
+        response = await async_client.delete(f"{path}/like", headers=headers)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+    response = await async_client.get(path)
+    assert response.json()["post"]["likes"] == 0
+    response = await async_client.get("/posts", params={"sorting": "-likes"})
+    assert response.json()["posts"][0]["likes"] == 0
+
+
+@pytest.mark.anyio
+async def test_delete_like_missing_post(
+    async_client: AsyncClient, logged_in_token: str
+):
+    response = await async_client.delete(
+        "/posts/2/like", headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+    assert response.status_code == HTTPStatus.NO_CONTENT
+
+
+@pytest.mark.anyio
+async def test_post_with_comments_single_query(
+    async_client: AsyncClient, created_comment: dict, mocker
+):
+    fetch_all = mocker.spy(database, "fetch_all")
+    fetch_one = mocker.spy(database, "fetch_one")
+    response = await async_client.get(f"/posts/{created_comment['post_id']}")
+
+    assert response.json()["comments"] == [created_comment]
+    assert fetch_all.call_count == 1
+    fetch_one.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_post_with_comments_pagination(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    for body in ("First", "Second", "Third"):
+        await create_comment(body, created_post["id"], async_client, logged_in_token)
+
+    response = await async_client.get(
+        f"/posts/{created_post['id']}", params={"comments_limit": 2}
+    )
+    data = response.json()
+    assert [comment["body"] for comment in data["comments"]] == ["First", "Second"]
+
+    response = await async_client.get(
+        f"/posts/{created_post['id']}/comments",
+        params={"limit": 2, "cursor": data["next_comments_cursor"]},
+    )
+    data = response.json()
+    assert [comment["body"] for comment in data["comments"]] == ["Third"]
+    assert data["next_cursor"] is None
+
+
+@pytest.mark.anyio
+async def test_list_comments_pagination(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    for body in ("First", "Second", "Third"):
+        await create_comment(body, created_post["id"], async_client, logged_in_token)
+
+    bodies = []
+    cursor = None
+    for _ in range(3):
+        params = {"limit": 1}
+        if cursor:
+            params["cursor"] = cursor
+        response = await async_client.get(
+            f"/posts/{created_post['id']}/comments", params=params
+        )
+        data = response.json()
+        bodies += [comment["body"] for comment in data["comments"]]
+        cursor = data["next_cursor"]
+
+    assert bodies == ["First", "Second", "Third"]
+    assert cursor is None
+
+
+@pytest.mark.anyio
+async def test_comment_expires_post_details_showing_it(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, mocker
+):
+    path = f"/posts/{created_post['id']}"
+    for body in ("First", "Second"):
+        await create_comment(body, created_post["id"], async_client, logged_in_token)
+    await async_client.get(path, params={"comments_limit": 1})
+    await async_client.get(path, params={"comments_limit": 3})
+
+    await create_comment("Third", created_post["id"], async_client, logged_in_token)
+    fetch_all = mocker.spy(database, "fetch_all")
+    full = await async_client.get(path, params={"comments_limit": 1})
+    partial = await async_client.get(path, params={"comments_limit": 3})
+
+    assert len(full.json()["comments"]) == 1
+    assert len(partial.json()["comments"]) == 3
+    assert fetch_all.call_count == 1
+
+
+@pytest.fixture()
+async def buffered_likes(mocker):
+    """Start the like buffer, flushed only when a test asks for it."""
+    mocker.patch.object(like_buffer, "flush_interval", 60)
+    await like_buffer.start()
+    yield like_buffer
+    await like_buffer.stop()
+
+
+async def buffered_like(post_id: int, async_client: AsyncClient, token: str):
+    return await async_client.post(
+        f"/posts/{post_id}/like", json={}, headers={"Authorization": f"Bearer {token}"}
+    )
+
+
+@pytest.mark.anyio
+async def test_like_post_buffered(
+    async_client: AsyncClient,
+    created_post: dict,
+    logged_in_token: str,
+    confirmed_user: dict,
+    buffered_likes,
+):
+    response = await buffered_like(created_post["id"], async_client, logged_in_token)
+
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.json() == {
+        "post_id": created_post["id"],
+        "user_id": confirmed_user["id"],
+    }
+    assert len(buffered_likes) == 1
+
+    await buffered_likes.flush()
+
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 1
+
+
+@pytest.mark.anyio
+async def test_like_post_buffered_twice(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, buffered_likes
+):
+    await buffered_like(created_post["id"], async_client, logged_in_token)
+    pending = await buffered_like(created_post["id"], async_client, logged_in_token)
+    await buffered_likes.flush()
+    written = await buffered_like(created_post["id"], async_client, logged_in_token)
+
+    assert pending.status_code == HTTPStatus.CONFLICT
+    assert written.status_code == HTTPStatus.CONFLICT
+
+
+@pytest.mark.anyio
+async def test_like_missing_post_buffered(
+    async_client: AsyncClient, logged_in_token: str, buffered_likes
+):
+    response = await buffered_like(123, async_client, logged_in_token)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert len(buffered_likes) == 0
+
+
+@pytest.mark.anyio
+async def test_put_like_buffered(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, buffered_likes
+):
+    async def put_like():
+        return await async_client.put(
+            f"/posts/{created_post['id']}/like",
+            headers={"Authorization": f"Bearer {logged_in_token}"},
+        )
+
+    pending = await put_like()
+    again = await put_like()
+    await buffered_likes.flush()
+    written = await put_like()
+
+    assert pending.status_code == HTTPStatus.ACCEPTED
+    assert again.status_code == HTTPStatus.ACCEPTED
+    assert written.status_code == HTTPStatus.OK
+    assert written.json()["post_id"] == created_post["id"]
+
+
+@pytest.mark.anyio
+async def test_unlike_pending_like(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, buffered_likes
+):
+    await buffered_like(created_post["id"], async_client, logged_in_token)
+
+    response = await async_client.delete(
+        f"/posts/{created_post['id']}/like",
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    await buffered_likes.flush()
+
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 0
+
+
+@pytest.mark.anyio
+async def test_like_buffer_flush_invalidates_cached_post(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, buffered_likes
+):
+    await async_client.get(f"/posts/{created_post['id']}")
+    await buffered_like(created_post["id"], async_client, logged_in_token)
+    await buffered_likes.flush()
+
+    response = await async_client.get(f"/posts/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 1
+
+
+@pytest.mark.anyio
+async def test_list_posts_with_comment_counts(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    await create_comment("Comment", created_post["id"], async_client, logged_in_token)
+    await create_comment("Comment", created_post["id"], async_client, logged_in_token)
+
+    response = await async_client.get("/posts", params={"include": "comment_count"})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["posts"][0]["comment_count"] == 2
+    assert "liked_by_me" not in response.json()["posts"][0]
+
+
+@pytest.mark.anyio
+async def test_new_comment_invalidates_comment_counts(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    params = {"include": "comment_count", "sorting": "-likes"}
+    await async_client.get("/posts", params=params)
+
+    await create_comment("Comment", created_post["id"], async_client, logged_in_token)
+
+    response = await async_client.get("/posts", params=params)
+    assert response.json()["posts"][0]["comment_count"] == 1
+
+
+@pytest.mark.anyio
+async def test_list_posts_liked_by_me(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    other = await create_post("Other", async_client, logged_in_token)
+    await like_post(created_post["id"], async_client, logged_in_token)
+    # Cached before the viewer asks for their likes, which are not cached.
+    await async_client.get("/posts")
+
+    response = await async_client.get(
+        "/posts",
+        params={"include": ["liked_by_me", "comment_count"]},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [
+        (post["id"], post["liked_by_me"], post["comment_count"])
+        for post in response.json()["posts"]
+    ] == [(other["id"], False, 0), (created_post["id"], True, 0)]
+
+
+@pytest.mark.anyio
+async def test_list_posts_liked_by_me_counts_buffered_likes(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, buffered_likes
+):
+    await buffered_like(created_post["id"], async_client, logged_in_token)
+
+    response = await async_client.get(
+        "/posts",
+        params={"include": "liked_by_me"},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert response.json()["posts"][0]["liked_by_me"] is True
+
+
+@pytest.mark.anyio
+async def test_list_posts_liked_by_me_requires_authentication(
+    async_client: AsyncClient, created_post: dict
+):
+    response = await async_client.get("/posts", params={"include": "liked_by_me"})
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.anyio
+async def test_list_posts_ignores_invalid_token(
+    async_client: AsyncClient, created_post: dict
+):
+    headers = {"Authorization": "Bearer garbage"}
+
+    plain = await async_client.get("/posts", headers=headers)
+    liked = await async_client.get(
+        "/posts", params={"include": "liked_by_me"}, headers=headers
+    )
+
+    assert plain.status_code == HTTPStatus.OK
+    assert [post["id"] for post in plain.json()["posts"]] == [created_post["id"]]
+    assert liked.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.anyio
+async def test_list_posts_liked_by_me_queries_do_not_grow_with_page(
+    async_client: AsyncClient, logged_in_token: str, mocker
+):
+    for i in range(5):
+        await create_post(f"Post {i}", async_client, logged_in_token)
+    fetch_all = mocker.spy(read_database, "fetch_all")
+
+    response = await async_client.get(
+        "/posts",
+        params={"include": ["liked_by_me", "comment_count"]},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+    assert len(response.json()["posts"]) == 5
+    assert fetch_all.call_count == 2
@@ -0,0 +1,30 @@
+import pytest
+from httpx import AsyncClient
+from http import HTTPStatus
+
+from app.logging_config import BoundedQueueHandler
+
+
+@pytest.mark.anyio
+async def test_cache_stats(async_client: AsyncClient, created_post: dict):
+    await async_client.get("/posts")
+    await async_client.get("/posts")
+
+    response = await async_client.get("/stats/cache")
+
+    assert response.status_code == HTTPStatus.OK
+    stats = response.json()["responses"]
+    assert stats["size"] == 1
+    assert stats["hits"] >= 1
+    assert stats["bytes"] > 0
+    assert {"users", "tokens"} <= response.json().keys()
+
+
+@pytest.mark.anyio
+async def test_logging_stats(async_client: AsyncClient, mocker):
+    mocker.patch("app.logging_config.queue_handler", BoundedQueueHandler(maxsize=8))
+
+    response = await async_client.get("/stats/logging")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"queued": 0, "maxsize": 8, "dropped": 0}
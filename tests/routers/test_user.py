@@ -2,7 +2,9 @@ from http import HTTPStatus
 
 import pytest
 from httpx import AsyncClient
-from app.security import create_confirmation_token
+from app.database import database, email_outbox_table
+from app.routers.user import auth_admission, ip_limiter, username_limiter
+from app.security import bcrypt_executor, create_confirmation_token, get_user
 
 
 async def register_user(async_client: AsyncClient, email: str, password: str):
@@ -20,6 +22,25 @@ async def test_register_user(async_client: AsyncClient):
     assert {"id": 1, "email": email}.items() <= response.json().items()
 
 
+@pytest.mark.anyio
+async def test_register_user_queues_confirmation_email(async_client: AsyncClient):
+    await register_user(async_client, "test@example.net", "password")
+
+    emails = await database.fetch_all(email_outbox_table.select())
+    assert [email.recipient for email in emails] == ["test@example.net"]
+    assert "/confirm/" in emails[0].body
+    assert emails[0].status == "pending"
+
+
+@pytest.mark.anyio
+async def test_register_user_when_hashing_saturated(async_client: AsyncClient, mocker):
+    mocker.patch.object(bcrypt_executor, "pending", bcrypt_executor.max_workers)
+    mocker.patch.object(bcrypt_executor, "queue_limit", 0)
+    response = await register_user(async_client, "test@example.net", "password")
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
 @pytest.mark.anyio
 async def test_register_user_already_exists(
     async_client: AsyncClient, registered_user: dict
@@ -44,6 +65,20 @@ async def test_confirm_email(async_client: AsyncClient, mocker):
     assert response.json()["detail"] == "User confirmed."
 
 
+@pytest.mark.anyio
+async def test_confirm_email_invalidates_cached_user(
+    async_client: AsyncClient, registered_user: dict
+):
+    user = await get_user(registered_user["email"])
+    assert not user.confirmed
+
+    token = create_confirmation_token(registered_user["email"])
+    await async_client.get(f"/confirm/{token}")
+
+    user = await get_user(registered_user["email"])
+    assert user.confirmed
+
+
 @pytest.mark.anyio
 async def test_confirm_user_invalid_token(async_client: AsyncClient):
     response = await async_client.get("/confirm/invalid_token")
@@ -102,6 +137,47 @@ async def test_login_user(
     assert response.status_code == HTTPStatus.OK
 
 
+@pytest.mark.anyio
+async def test_login_rate_limited_by_username(
+    async_client: AsyncClient, registered_user: dict, mocker
+):
+    mocker.patch.object(username_limiter, "burst", 1)
+    form = {"username": registered_user["email"], "password": "wrong password"}
+    await async_client.post("/login", data=form)
+
+    response = await async_client.post(
+        "/login", data={**form, "username": registered_user["email"].upper()}
+    )
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+@pytest.mark.anyio
+async def test_register_rate_limited_by_ip(async_client: AsyncClient, mocker):
+    mocker.patch.object(ip_limiter, "burst", 1)
+    await register_user(async_client, "a@example.net", "password")
+
+    response = await register_user(async_client, "b@example.net", "password")
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert await get_user("b@example.net") is None
+
+
+@pytest.mark.anyio
+async def test_login_shed_when_auth_saturated(
+    async_client: AsyncClient, registered_user: dict, mocker
+):
+    mocker.patch.object(auth_admission, "in_flight", auth_admission.max_concurrent)
+    response = await async_client.post(
+        "/login",
+        data={"username": registered_user["email"], "password": "1234"},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
 @pytest.mark.anyio
 async def test_login_user_wrong_password(
     async_client: AsyncClient, registered_user: dict
@@ -0,0 +1,155 @@
+from app.cache import CachedResponse, PageSpan, ResponseCache, TTLCache, caches
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_get_and_set():
+    cache = TTLCache("test", maxsize=2, ttl=10)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats() == {
+        "size": 1,
+        "weight": 1,
+        "maxsize": 2,
+        "hits": 1,
+        "misses": 1,
+        "hit_ratio": 0.5,
+    }
+    assert caches["test"] is cache
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache("test", maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_cache_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache("test", maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_cache_pop_and_clear():
+    cache = TTLCache("test", maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_cache_expire_with_grace():
+    clock = FakeClock()
+    cache = TTLCache("test", maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.expire("a")
+    cache.expire("b", grace=2)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+    clock.now = 2
+    assert cache.get("b") is None
+
+
+def page(after, last, body=b"[]") -> CachedResponse:
+    return CachedResponse(body, {}, PageSpan("listing", True, after, last))
+
+
+def test_page_span_covers():
+    first = PageSpan("listing", True, None, (5,))
+    middle = PageSpan("listing", True, (5,), (3,))
+    final = PageSpan("listing", False, (3,), None)
+
+    assert first.covers((9,)) and first.covers((5,)) and not first.covers((4,))
+    assert middle.covers((4,)) and middle.covers((3,)) and not middle.covers((5,))
+    assert final.covers((4,)) and not final.covers((3,))
+
+
+def test_response_cache_bounded_by_bytes():
+    cache = ResponseCache("test", max_bytes=10, ttl=10)
+    cache.set("a", CachedResponse(b"12345", {}))
+    cache.set("b", CachedResponse(b"12345", {}))
+    cache.set("c", CachedResponse(b"1", {}))
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.stats()["bytes"] == 6
+
+
+def test_response_cache_expire_pages():
+    cache = ResponseCache("test", max_bytes=100, ttl=10)
+    cache.set("first", page(None, (5,)))
+    cache.set("second", page((5,), (3,)))
+    cache.set("third", page((3,), None))
+
+    cache.expire_pages("listing", (4,))
+
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+
+
+def test_response_cache_forgets_listings_without_pages():
+    cache = ResponseCache("test", max_bytes=10, ttl=10)
+    for post_id in range(100):
+        span = PageSpan(("post", post_id), False, None, None)
+        cache.set(("post", post_id), CachedResponse(b"12345", {}, span))
+
+    assert len(cache) == 2
+    assert len(cache._pages) == 2
+
+    cache.clear()
+    assert cache._pages == {}
+
+
+def test_response_cache_drops_responses_read_before_a_write():
+    cache = ResponseCache("test", max_bytes=100, ttl=10)
+    snapshot = cache.snapshot()
+    cache.expire("other")
+
+    cache.set("a", CachedResponse(b"stale", {}), snapshot=snapshot)
+    assert cache.get("a") is None
+
+    cache.set("a", CachedResponse(b"fresh", {}), snapshot=cache.snapshot())
+    assert cache.get("a").body == b"fresh"
+
+
+def test_response_cache_bounds_racing_responses_by_grace():
+    clock = FakeClock()
+    cache = ResponseCache("test", max_bytes=100, ttl=10, clock=clock)
+    snapshot = cache.snapshot()
+    cache.expire("other", grace=2)
+
+    cache.set("a", CachedResponse(b"stale", {}), snapshot=snapshot)
+    assert cache.get("a") is not None
+
+    clock.now = 2
+    assert cache.get("a") is None
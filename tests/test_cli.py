@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import sqlalchemy
+
+from app import cli, migrations
+from app.database import database, like_table, metadata, post_table, user_table
+
+
+async def create_post_with_likes(user_id: int, likes: int, like_count: int) -> int:
+    post_id = await database.execute(
+        post_table.insert().values(body="Post", user_id=user_id, like_count=like_count)
+    )
+    for i in range(likes):
+        liker_id = await database.execute(
+            user_table.insert().values(email=f"liker{post_id}-{i}@example.net")
+        )
+        await database.execute(
+            like_table.insert().values(post_id=post_id, user_id=liker_id)
+        )
+    return post_id
+
+
+@pytest.mark.anyio
+async def test_reconcile_like_counts(registered_user: dict):
+    drifted = await create_post_with_likes(registered_user["id"], 2, like_count=0)
+    correct = await create_post_with_likes(registered_user["id"], 1, like_count=1)
+    inflated = await create_post_with_likes(registered_user["id"], 0, like_count=5)
+
+    corrected = await cli.reconcile_like_counts(batch_size=2)
+
+    assert corrected == 2
+    rows = await database.fetch_all(post_table.select().order_by(post_table.c.id))
+    assert {row.id: row.like_count for row in rows} == {
+        drifted: 2,
+        correct: 1,
+        inflated: 0,
+    }
+
+
+@pytest.mark.anyio
+async def test_reconcile_like_counts_empty_table():
+    assert await cli.reconcile_like_counts() == 0
+
+
+@pytest.mark.anyio
+async def test_rebuild_search_index(registered_user: dict):
+    await database.execute(
+        post_table.insert().values(body="Findable", user_id=registered_user["id"])
+    )
+    clear = "INSERT INTO posts_fts (posts_fts) VALUES ('delete-all')"
+    await database.execute(sqlalchemy.text(clear))
+    search = sqlalchemy.text(
+        "SELECT count(*) FROM posts_fts WHERE posts_fts MATCH 'findable'"
+    )
+    assert await database.fetch_val(search) == 0
+
+    await cli.rebuild_search_index()
+
+    assert await database.fetch_val(search) == 1
+
+
+def test_create_schema(tmp_path, mocker):
+    url = f"sqlite:///{tmp_path / 'new.db'}"
+    mocker.patch("app.database.config.DATABASE_URL", url)
+
+    cli.main(["create-schema"])
+
+    engine = sqlalchemy.create_engine(url)
+    assert set(metadata.tables) <= set(sqlalchemy.inspect(engine).get_table_names())
+    assert migrations.current_version(engine) == max(migrations.load_migrations())
+    engine.dispose()
+
+
+def test_import_has_no_side_effects(tmp_path):
+    database_file = tmp_path / "untouched.db"
+    subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        env={
+            **os.environ,
+            "ENV_STATE": "test",
+            "TEST_DATABASE_URL": f"sqlite:///{database_file}",
+        },
+        check=True,
+    )
+    assert not database_file.exists()
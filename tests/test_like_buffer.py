@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from app.database import database, like_table, post_table, user_table
+from app.like_buffer import LikeBuffer
+from app.metrics import like_buffer_depth, like_buffer_flush_duration
+
+
+@pytest.fixture()
+async def posts() -> list[int]:
+    user_id = await database.execute(user_table.insert().values(email="a"))
+    return [
+        await database.execute(post_table.insert().values(user_id=user_id))
+        for _ in range(2)
+    ]
+
+
+@pytest.fixture()
+async def buffer():
+    flushed = []
+    buffer = LikeBuffer(
+        max_events=3, flush_interval=60, max_pending=4, on_flush=flushed.extend
+    )
+    buffer.flushed = flushed
+    await buffer.start()
+    yield buffer
+    await buffer.stop()
+
+
+async def like_counts() -> list[int]:
+    rows = await database.fetch_all(post_table.select().order_by(post_table.c.id))
+    return [row.like_count for row in rows]
+
+
+@pytest.mark.anyio
+async def test_flush_writes_likes_and_counters(buffer, posts):
+    first, second = posts
+    for like in ((first, 1), (first, 2), (first, 1), (second, 1)):
+        buffer.add(*like)
+    assert len(buffer) == 3
+    assert like_buffer_depth.value() == 3
+
+    count = like_buffer_flush_duration.count()
+    assert await buffer.flush() == 3
+
+    assert len(buffer) == 0
+    assert await like_counts() == [2, 1]
+    assert sorted(buffer.flushed) == [(first, 0, 2), (second, 0, 1)]
+    assert like_buffer_flush_duration.count() == count + 1
+
+
+@pytest.mark.anyio
+async def test_flush_skips_written_likes_and_missing_posts(buffer, posts):
+    first, _ = posts
+    await database.execute(like_table.insert().values(post_id=first, user_id=1))
+    buffer.add(first, 1)
+    buffer.add(first, 2)
+    buffer.add(999, 1)
+
+    await buffer.flush()
+
+    assert await like_counts() == [2, 0]
+    assert buffer.flushed == [(first, 1, 2)]
+
+
+@pytest.mark.anyio
+async def test_discard_pending_like(buffer, posts):
+    buffer.add(posts[0], 1)
+
+    assert buffer.discard(posts[0], 1)
+    assert not buffer.discard(posts[0], 1)
+    assert await buffer.flush() == 0
+
+
+@pytest.mark.anyio
+async def test_add_refused_when_full_or_stopped(posts):
+    buffer = LikeBuffer(max_events=10, flush_interval=60, max_pending=1)
+    assert not buffer.add(posts[0], 1)
+
+    await buffer.start()
+    assert buffer.add(posts[0], 1)
+    assert not buffer.add(posts[0], 2)
+    await buffer.stop()
+
+
+@pytest.mark.anyio
+async def test_failed_flush_keeps_likes(buffer, posts, mocker):
+    buffer.add(posts[0], 1)
+    mocker.patch("app.like_buffer.insert_likes_query", side_effect=RuntimeError)
+
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+
+    assert (posts[0], 1) in buffer
+
+
+@pytest.mark.anyio
+async def test_flushes_when_max_events_pending(buffer, posts):
+    for user_id in (1, 2, 3):
+        buffer.add(posts[0], user_id)
+
+    for _ in range(100):
+        if not len(buffer):
+            break
+        await asyncio.sleep(0.01)
+    assert await like_counts() == [3, 0]
+
+
+@pytest.mark.anyio
+async def test_stop_drains_buffer(posts):
+    buffer = LikeBuffer(max_events=10, flush_interval=60, max_pending=10)
+    await buffer.start()
+    buffer.add(posts[1], 1)
+
+    await buffer.stop()
+
+    assert await like_counts() == [0, 1]
@@ -0,0 +1,104 @@
+import json
+import logging
+import sys
+
+import pytest
+
+from app import logging_config
+from app.logging_config import (
+    BoundedQueueHandler,
+    JsonFormatter,
+    configure_logging,
+    stop_logging,
+)
+
+
+def make_record(exc_info=None) -> logging.LogRecord:
+    return logging.LogRecord(
+        "app.test", logging.INFO, __file__, 1, "hello %s", ("world",), exc_info
+    )
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture()
+def sink(mocker):
+    sink = Capture()
+    mocker.patch("app.logging_config.sink_handlers", return_value=[sink])
+    configure_logging()
+    yield sink
+    stop_logging()
+    for name in ("app", "uvicorn", "databases", "aiosqlite"):
+        logger = logging.getLogger(name)
+        logger.handlers.clear()
+        logger.setLevel(logging.NOTSET)
+        logger.propagate = True
+
+
+def test_queue_handler_drops_when_full():
+    handler = BoundedQueueHandler(maxsize=2)
+
+    for _ in range(5):
+        handler.handle(make_record())
+
+    assert handler.stats() == {"queued": 2, "maxsize": 2, "dropped": 3}
+
+
+def test_queue_handler_defers_message_formatting():
+    handler = BoundedQueueHandler(maxsize=1)
+
+    handler.handle(make_record())
+
+    record = handler.queue.get_nowait()
+    assert (record.msg, record.args) == ("hello %s", ("world",))
+
+
+def test_queue_handler_renders_tracebacks():
+    handler = BoundedQueueHandler(maxsize=1)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        handler.handle(make_record(exc_info=sys.exc_info()))
+
+    record = handler.queue.get_nowait()
+    assert record.exc_info is None
+    assert "ValueError: boom" in record.exc_text
+
+
+def test_json_formatter():
+    record = make_record()
+    record.correlation_id = "abc123"
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "hello world"
+    assert entry["correlation_id"] == "abc123"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["time"].endswith("Z")
+
+
+def test_records_reach_sinks_through_listener(sink):
+    logging.getLogger("app.test").info("through the queue")
+    stop_logging()
+
+    [record] = sink.records
+    assert record.getMessage() == "through the queue"
+    assert record.correlation_id == "-"
+    assert logging_config.queue_handler.stats()["dropped"] == 0
+
+
+def test_reconfiguring_replaces_listener(sink):
+    first = logging_config.listener
+
+    configure_logging()
+
+    assert logging_config.listener is not first
+    assert first._thread is None
@@ -0,0 +1,53 @@
+from app.metrics import Counter, Gauge, Histogram, metrics, render
+
+
+def test_counter_and_gauge():
+    counter = Counter("test_events_total", "Events.", ("kind",))
+    gauge = Gauge("test_depth", "Depth.")
+
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    assert counter.value("a") == 3
+    assert counter.value("b") == 0
+    assert gauge.value() == 1
+    assert counter.render() == (
+        "# HELP test_events_total Events.\n"
+        "# TYPE test_events_total counter\n"
+        'test_events_total{kind="a"} 3'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Seconds.", ("op",), buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "x")
+
+    assert histogram.count("x") == 4
+    assert histogram.render().splitlines()[2:] == [
+        'test_seconds_bucket{op="x",le="0.1"} 2',
+        'test_seconds_bucket{op="x",le="1.0"} 3',
+        'test_seconds_bucket{op="x",le="+Inf"} 4',
+        'test_seconds_sum{op="x"} 2.65',
+        'test_seconds_count{op="x"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_escaped_total", "Escaped.", ("path",))
+
+    counter.inc('a"b\\c')
+
+    assert 'test_escaped_total{path="a\\"b\\\\c"} 1' in counter.render()
+
+
+def test_render_includes_every_metric():
+    text = render()
+
+    for name in metrics:
+        assert f"# TYPE {name} " in text
+    assert text.endswith("\n")
@@ -0,0 +1,248 @@
+import pytest
+import sqlalchemy
+
+from app import migrations
+from app.database import (
+    comment_table,
+    create_engine,
+    metadata,
+    post_table,
+    user_table,
+)
+from app.pagination import keyset_page
+from app.routers.feed import (
+    catch_up_query,
+    celebrity_followees_query,
+    feed_query,
+    followers_query,
+)
+from app.routers.post import (
+    PostSorting,
+    liked_post_ids_query,
+    listing_query,
+    post_sort_columns,
+    post_sort_keys,
+    select_post_and_likes,
+)
+
+
+LATEST = max(migrations.load_migrations())
+
+
+@pytest.fixture()
+def engine(tmp_path) -> sqlalchemy.Engine:
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def index_names(engine: sqlalchemy.Engine, table: str) -> set[str]:
+    return {index["name"] for index in sqlalchemy.inspect(engine).get_indexes(table)}
+
+
+def query_plan(engine: sqlalchemy.Engine, query) -> list[str]:
+    sql = query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return [row[3] for row in rows]
+
+
+def test_upgrade_creates_schema(engine):
+    assert migrations.upgrade(engine) == LATEST
+    assert migrations.current_version(engine) == LATEST
+    assert {"users", "posts", "comments", "likes"} <= set(
+        sqlalchemy.inspect(engine).get_table_names()
+    )
+    assert index_names(engine, "posts") == {
+        "ix_posts_hot_score_id",
+        "ix_posts_like_count_id",
+        "ix_posts_user_id_id",
+    }
+    assert index_names(engine, "comments") == {"ix_comments_post_id"}
+    assert index_names(engine, "likes") == {
+        "ix_likes_user_id",
+        "ux_likes_post_id_user_id",
+    }
+
+
+def test_like_triggers_maintain_post_counters(engine):
+    migrations.upgrade(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO users (id, email) VALUES (1, 'a')")
+        connection.exec_driver_sql("INSERT INTO posts (id, user_id) VALUES (1, 1)")
+        connection.exec_driver_sql("INSERT INTO likes (post_id, user_id) VALUES (1, 1)")
+        counters = "SELECT like_count, revision FROM posts"
+        assert connection.exec_driver_sql(counters).one() == (1, 1)
+        connection.exec_driver_sql("DELETE FROM likes")
+        assert connection.exec_driver_sql(counters).one() == (0, 2)
+
+
+def test_comment_triggers_maintain_comment_count(engine):
+    migrations.upgrade(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO users (id, email) VALUES (1, 'a')")
+        connection.exec_driver_sql("INSERT INTO posts (id, user_id) VALUES (1, 1)")
+        connection.exec_driver_sql(
+            "INSERT INTO comments (post_id, user_id) VALUES (1, 1), (1, 1)"
+        )
+        count = "SELECT comment_count FROM posts"
+        assert connection.exec_driver_sql(count).scalar() == 2
+        connection.exec_driver_sql("DELETE FROM comments WHERE id = 1")
+        assert connection.exec_driver_sql(count).scalar() == 1
+
+
+def test_hot_score_triggers(engine):
+    migrations.upgrade(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO users (id, email) VALUES (1, 'a')")
+        connection.exec_driver_sql("INSERT INTO posts (id, user_id) VALUES (1, 1)")
+        score = "SELECT hot_score - strftime('%s', 'now') / 43200.0 FROM posts"
+        # Weights at the current time: the post itself, a like, a comment.
+        assert connection.exec_driver_sql(score).scalar() == pytest.approx(0, abs=1e-3)
+        connection.exec_driver_sql("INSERT INTO likes (post_id, user_id) VALUES (1, 1)")
+        assert connection.exec_driver_sql(score).scalar() == pytest.approx(1, abs=1e-3)
+        connection.exec_driver_sql(
+            "INSERT INTO comments (post_id, user_id) VALUES (1, 1)"
+        )
+        assert connection.exec_driver_sql(score).scalar() == pytest.approx(2, abs=1e-3)
+
+
+def test_search_index_follows_posts(engine):
+    migrations.upgrade(engine)
+    search = "SELECT rowid FROM posts_fts WHERE posts_fts MATCH ? ORDER BY rowid"
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO users (id, email) VALUES (1, 'a')")
+        connection.exec_driver_sql(
+            "INSERT INTO posts (id, user_id, body) VALUES (1, 1, 'red'), (2, 1, 'blue')"
+        )
+        assert connection.exec_driver_sql(search, ("red",)).all() == [(1,)]
+        connection.exec_driver_sql("UPDATE posts SET body = 'blue' WHERE id = 1")
+        assert connection.exec_driver_sql(search, ("red",)).all() == []
+        assert connection.exec_driver_sql(search, ("blue",)).all() == [(1,), (2,)]
+        connection.exec_driver_sql("DELETE FROM posts WHERE id = 2")
+        assert connection.exec_driver_sql(search, ("blue",)).all() == [(1,)]
+
+
+def test_upgrade_is_noop_when_current(engine):
+    migrations.upgrade(engine)
+    assert migrations.upgrade(engine) == LATEST
+
+
+def test_downgrade(engine):
+    migrations.upgrade(engine)
+
+    assert migrations.downgrade(engine, 1) == 1
+    assert index_names(engine, "likes") == set()
+    assert not migrations.has_column(engine, "posts", "like_count")
+
+    assert migrations.downgrade(engine, 0) == 0
+    assert sqlalchemy.inspect(engine).get_table_names() == [migrations.VERSION_TABLE]
+
+
+def test_upgrade_existing_database(engine):
+    migrations.upgrade(engine, 1)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO users (id, email) VALUES (1, 'a')")
+        connection.exec_driver_sql("INSERT INTO users (id, email) VALUES (2, 'b')")
+        connection.exec_driver_sql("INSERT INTO posts (id, user_id) VALUES (1, 1)")
+        connection.exec_driver_sql("INSERT INTO posts (id, user_id) VALUES (2, 1)")
+        connection.exec_driver_sql(
+            "INSERT INTO likes (post_id, user_id) VALUES (1, 1), (1, 1), (1, 2)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO comments (post_id, user_id) VALUES (2, 1), (2, 2)"
+        )
+
+    assert migrations.upgrade(engine) == LATEST
+
+    with engine.connect() as connection:
+        likes = connection.exec_driver_sql(
+            "SELECT post_id, user_id FROM likes ORDER BY id"
+        ).all()
+        counts = connection.exec_driver_sql(
+            "SELECT id, like_count, comment_count FROM posts ORDER BY id"
+        ).all()
+    assert likes == [(1, 1), (1, 2)]
+    assert counts == [(1, 2, 0), (2, 0, 2)]
+
+
+def test_upgrade_database_created_from_metadata(engine):
+    metadata.create_all(bind=engine)
+    assert migrations.upgrade(engine) == LATEST
+
+
+def test_run_in_batches(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+        connection.exec_driver_sql("CREATE TABLE ranges (low INTEGER, high INTEGER)")
+        connection.exec_driver_sql("INSERT INTO items (id) VALUES (1), (2), (5)")
+
+    migrations.run_in_batches(
+        engine, "items", "INSERT INTO ranges VALUES (:low, :high)", batch_size=2
+    )
+
+    with engine.connect() as connection:
+        ranges = connection.exec_driver_sql("SELECT * FROM ranges").all()
+    assert ranges == [(0, 2), (2, 4), (4, 6)]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        post_table.select().where(post_table.c.id == 1),
+        select_post_and_likes.where(post_table.c.id == 1),
+        comment_table.select().where(comment_table.c.post_id == 1),
+        keyset_page(
+            comment_table.select().where(comment_table.c.post_id == 1),
+            {"id": comment_table.c.id},
+            False,
+            [5],
+            21,
+        ),
+        user_table.select().where(user_table.c.email == "test@example.net"),
+        liked_post_ids_query(1, list(range(1, 21))),
+    ],
+)
+def test_router_queries_use_indexes(engine, query):
+    migrations.upgrade(engine)
+    for step in query_plan(engine, query):
+        assert step.startswith("SEARCH") and "USING" in step, step
+
+
+@pytest.mark.parametrize("sorting", list(PostSorting))
+def test_post_pages_use_indexes(engine, sorting):
+    migrations.upgrade(engine)
+    key, descending = post_sort_keys[sorting]
+    query = keyset_page(
+        listing_query(sorting),
+        {name: post_sort_columns[name] for name in key},
+        descending,
+        [5] * len(key),
+        21,
+    )
+    table_steps = [step for step in query_plan(engine, query) if " posts" in step]
+    assert table_steps
+    for step in table_steps:
+        assert step.startswith("SEARCH") and "USING" in step, step
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        celebrity_followees_query(1),
+        feed_query(1, [], None, 21),
+        feed_query(1, [2, 3], 5, 21),
+        catch_up_query(2, 1, 100),
+        followers_query(2, 0, 100),
+    ],
+)
+def test_feed_queries_use_indexes(engine, query):
+    migrations.upgrade(engine)
+    table_steps = [
+        step
+        for step in query_plan(engine, query)
+        if step.split()[1] in ("users", "posts", "follows", "timelines")
+    ]
+    assert table_steps
+    for step in table_steps:
+        assert step.startswith("SEARCH") and "USING" in step, step
@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+
+from app.metrics import requests_shed
+from app.ratelimit import ConcurrencyLimit, TokenBucketLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(clock, rate=1.0, burst=2, max_keys=10) -> TokenBucketLimiter:
+    return TokenBucketLimiter("test", rate, burst, max_keys, clock=clock)
+
+
+def test_bucket_allows_burst_then_waits():
+    limiter = make_limiter(FakeClock(), rate=0.5)
+
+    assert [limiter.take("a") for _ in range(3)] == [0, 0, 2.0]
+    assert limiter.take("b") == 0
+
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.take("a")
+    limiter.take("a")
+
+    clock.now = 0.5
+    assert limiter.take("a") == pytest.approx(0.5)
+    clock.now = 1.0
+    assert limiter.take("a") == 0
+
+
+def test_idle_keys_are_evicted():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.take("a")
+    clock.now = 1.0
+    limiter.take("b")
+
+    clock.now = 2.5
+    limiter.take("c")
+
+    assert len(limiter) == 2
+    # A full bucket is the same as none.
+    assert limiter.take("a") == 0
+
+
+def test_keys_are_bounded():
+    limiter = make_limiter(FakeClock(), max_keys=2)
+
+    for key in ("a", "b", "c"):
+        limiter.take(key)
+
+    assert len(limiter) == 2
+
+
+def test_check_raises_too_many_requests():
+    limiter = make_limiter(FakeClock(), rate=0.4, burst=1)
+    limiter.check("a")
+    shed = requests_shed.value("test")
+
+    with pytest.raises(HTTPException) as exc_info:
+        limiter.check("a")
+
+    assert exc_info.value.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert exc_info.value.headers == {"Retry-After": "3"}
+    assert requests_shed.value("test") == shed + 1
+
+
+@pytest.mark.anyio
+async def test_concurrency_limit_sheds_when_full():
+    limit = ConcurrencyLimit("test", max_concurrent=1)
+    admitted = limit()
+    await anext(admitted)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await anext(limit())
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+
+    await admitted.aclose()
+    assert limit.in_flight == 0
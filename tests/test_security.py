@@ -1,11 +1,46 @@
+import asyncio
+import threading
+import time
+
 from jose import jwt
 from app import security
+from app.database import database, user_table
 import pytest
 
 
-def test_password_hashes():
+@pytest.mark.anyio
+async def test_password_hashes():
     password = "password"
-    assert security.verify_password(password, security.get_password_hash(password))
+    hashed_password = await security.get_password_hash(password)
+    assert await security.verify_password(password, hashed_password)
+    assert security.password_hash_rounds(hashed_password) == security.bcrypt_rounds
+
+
+@pytest.mark.anyio
+async def test_bounded_executor_rejects_when_saturated():
+    executor = security.BoundedExecutor(max_workers=1, queue_limit=1, name="test")
+    release = threading.Event()
+    running = [
+        asyncio.create_task(executor.run(release.wait)),
+        asyncio.create_task(executor.run(release.wait)),
+    ]
+    await asyncio.sleep(0)
+
+    with pytest.raises(security.HTTPException) as exc_info:
+        await executor.run(release.wait)
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
+
+    release.set()
+    await asyncio.gather(*running)
+    assert executor.pending == 0
+    assert await executor.run(sum, [1, 2]) == 3
+    executor.shutdown()
+
+
+def test_calibrate_bcrypt_rounds():
+    assert security.calibrate_bcrypt_rounds(0) == 4
+    assert security.calibrate_bcrypt_rounds(float("inf"), max_rounds=6) == 6
 
 
 def test_access_token_expire_minutes():
@@ -86,6 +121,48 @@ def test_get_subject_for_token_with_missing_sub():
     assert exc_info.value.detail == "Token is missing 'sub' field"
 
 
+def test_get_subject_skips_decode_for_cached_token(mocker):
+    token = security.create_access_token("test@example.com")
+    security.get_subject_for_token_type(token, type="access")
+    decode = mocker.spy(security.jwt, "decode")
+
+    assert security.get_subject_for_token_type(token, type="access") == (
+        "test@example.com"
+    )
+    decode.assert_not_called()
+
+
+def test_get_subject_cached_token_wrong_type():
+    token = security.create_confirmation_token("test@example.com")
+    security.get_subject_for_token_type(token, type="confirmation")
+
+    with pytest.raises(security.HTTPException) as exc_info:
+        security.get_subject_for_token_type(token, type="access")
+    assert exc_info.value.detail == "Token has incorrect type, expected 'access'"
+
+
+def test_get_subject_cached_token_past_expiry(mocker):
+    token = security.create_access_token("test@example.com")
+    security.get_subject_for_token_type(token, type="access")
+    mocker.patch("app.security.time.time", return_value=time.time() + 3600)
+    decode = mocker.spy(security.jwt, "decode")
+
+    security.get_subject_for_token_type(token, type="access")
+
+    decode.assert_called_once()
+
+
+def test_token_cache_cleared_when_secret_changes(mocker):
+    token = security.create_access_token("test@example.com")
+    security.get_subject_for_token_type(token, type="access")
+    mocker.patch("app.security.SECRET_KEY", "rotated")
+
+    with pytest.raises(security.HTTPException) as exc_info:
+        security.get_subject_for_token_type(token, type="access")
+    assert exc_info.value.detail == "Invalid token"
+    assert len(security.token_cache) == 0
+
+
 @pytest.mark.anyio
 async def test_get_user(registered_user: dict):
     user = await security.get_user(registered_user["email"])
@@ -93,6 +170,37 @@ async def test_get_user(registered_user: dict):
     assert user.email == registered_user["email"]
 
 
+@pytest.mark.anyio
+async def test_get_user_is_cached(registered_user: dict, mocker):
+    await security.get_user(registered_user["email"])
+    fetch_one = mocker.spy(database, "fetch_one")
+    hits = security.user_cache.hits
+
+    user = await security.get_user(registered_user["email"])
+
+    assert user.email == registered_user["email"]
+    fetch_one.assert_not_called()
+    assert security.user_cache.hits == hits + 1
+
+
+@pytest.mark.anyio
+async def test_get_user_cache_disabled(registered_user: dict, mocker):
+    mocker.patch("app.security.config.USER_CACHE_ENABLED", False)
+    await security.get_user(registered_user["email"])
+    fetch_one = mocker.spy(database, "fetch_one")
+
+    await security.get_user(registered_user["email"])
+
+    fetch_one.assert_called_once()
+    assert len(security.user_cache) == 0
+
+
+@pytest.mark.anyio
+async def test_get_user_missing_is_not_cached():
+    assert await security.get_user("test@example.net") is None
+    assert len(security.user_cache) == 0
+
+
 @pytest.mark.anyio
 async def test_authenticate_user_not_found():
     with pytest.raises(security.HTTPException):
@@ -123,3 +231,23 @@ async def test_get_current_user_wrong_type_token(registered_user: dict):
     token = security.create_confirmation_token(registered_user["email"])
     with pytest.raises(security.HTTPException):
         await security.get_authenticated_user(token)
+
+
+@pytest.mark.anyio
+async def test_authenticate_user_rehashes_password(
+    confirmed_user_with_password: dict, mocker
+):
+    mocker.patch("app.security.bcrypt_rounds", security.bcrypt_rounds + 1)
+
+    await security.authenticate_user(
+        confirmed_user_with_password["email"], confirmed_user_with_password["password"]
+    )
+
+    query = user_table.select().where(
+        user_table.c.id == confirmed_user_with_password["id"]
+    )
+    user = await database.fetch_one(query)
+    assert security.password_hash_rounds(user.password) == security.bcrypt_rounds
+    assert await security.verify_password(
+        confirmed_user_with_password["password"], user.password
+    )
@@ -0,0 +1,60 @@
+import pytest
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from app.config import config
+from app.database import database, post_table, user_table
+from app.routers.post import select_post_and_likes
+from app.schemas.post import CommentRead, PostPage, PostWithLikes
+from app.serialization import encode_json, json_response, row_dicts
+
+
+@pytest.fixture()
+async def post_rows() -> list:
+    await database.execute(user_table.insert().values(email="a", password="b"))
+    bodies = ["plain", 'quote " and \\ slash /', "línea\nnueva\t\x00\x1f", "😀  "]
+    for body in bodies:
+        await database.execute(post_table.insert().values(body=body, user_id=1))
+    return await database.fetch_all(select_post_and_likes)
+
+
+@pytest.fixture()
+def fast_json(mocker):
+    mocker.patch.object(config, "FAST_JSON_RESPONSES", True)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("fast", [False, True])
+async def test_row_dicts(post_rows, mocker, fast):
+    mocker.patch.object(config, "FAST_JSON_RESPONSES", fast)
+    assert row_dicts(post_rows, PostWithLikes)[0] == {
+        "body": "plain",
+        "id": 1,
+        "user_id": 1,
+        "likes": 0,
+    }
+    assert row_dicts([], PostWithLikes) == []
+
+
+@pytest.mark.anyio
+async def test_row_dicts_validates_rows(post_rows, mocker):
+    mocker.patch.object(config, "FAST_JSON_RESPONSES", False)
+    with pytest.raises(ValidationError):
+        row_dicts(post_rows, CommentRead)
+
+
+@pytest.mark.anyio
+async def test_fast_path_matches_validated_response(post_rows, fast_json):
+    validated = PostPage(posts=post_rows, next_cursor="abc")
+    expected = JSONResponse(content=validated.model_dump(mode="json"))
+
+    response = json_response(
+        {"posts": row_dicts(post_rows, PostWithLikes), "next_cursor": "abc"}
+    )
+
+    assert response.body == expected.body
+    assert response.headers["content-type"] == expected.headers["content-type"]
+
+
+def test_encode_json_keeps_non_ascii():
+    assert encode_json({"a": "é", "b": None}) == '{"a":"é","b":null}'.encode()
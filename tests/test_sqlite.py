@@ -0,0 +1,89 @@
+import asyncio
+import sqlite3
+
+import aiosqlite
+import pytest
+
+from app.database import sqlite_pragmas
+from app.sqlite import MATH_FUNCTIONS, SQLiteDatabase, register_functions
+
+
+@pytest.fixture()
+async def pools(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    writer = SQLiteDatabase(url, pool_size=1, pragmas=sqlite_pragmas())
+    reader = SQLiteDatabase(url, pool_size=2, pragmas=sqlite_pragmas(read_only=True))
+    await writer.connect()
+    await reader.connect()
+    await writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    yield writer, reader
+    await reader.disconnect()
+    await writer.disconnect()
+
+
+@pytest.mark.anyio
+async def test_pragmas_applied(pools):
+    writer, reader = pools
+
+    assert await writer.fetch_val("PRAGMA journal_mode") == "wal"
+    assert await writer.fetch_val("PRAGMA synchronous") == 1
+    assert await writer.fetch_val("PRAGMA busy_timeout") == 5_000
+    assert await reader.fetch_val("PRAGMA query_only") == 1
+
+
+@pytest.mark.anyio
+async def test_read_pool_rejects_writes(pools):
+    _, reader = pools
+
+    with pytest.raises(sqlite3.OperationalError):
+        await reader.execute("INSERT INTO items (name) VALUES ('a')")
+
+
+@pytest.mark.anyio
+async def test_connections_are_reused(pools, mocker):
+    _, reader = pools
+    connect = mocker.spy(aiosqlite, "connect")
+
+    for _ in range(3):
+        await asyncio.gather(
+            *(reader.fetch_all("SELECT * FROM items") for _ in range(10))
+        )
+
+    assert connect.call_count == 2
+
+
+@pytest.mark.anyio
+async def test_readers_not_blocked_by_writer(pools):
+    writer, reader = pools
+    await writer.execute("INSERT INTO items (name) VALUES ('committed')")
+
+    async with writer.transaction():
+        await writer.execute("INSERT INTO items (name) VALUES ('pending')")
+        rows = await asyncio.wait_for(
+            reader.fetch_all("SELECT name FROM items"), timeout=1
+        )
+
+    assert [row.name for row in rows] == ["committed"]
+    assert len(await reader.fetch_all("SELECT name FROM items")) == 2
+
+
+def test_math_function_fallbacks():
+    connection = sqlite3.connect(":memory:")
+    register_functions(connection, MATH_FUNCTIONS)
+
+    row = connection.execute(
+        "SELECT log2(8), pow(2, -1), ln(1), log2(0), pow(NULL, 1)"
+    ).fetchone()
+
+    assert row == (3.0, 0.5, 0.0, None, None)
+    connection.close()
+
+
+@pytest.mark.anyio
+async def test_fallback_functions_defined_on_connections(pools, mocker):
+    _, reader = pools
+    mocker.patch.dict(
+        "app.sqlite.FALLBACK_FUNCTIONS", {"twice": (1, lambda value: 2 * value)}
+    )
+
+    assert await reader.fetch_val("SELECT twice(21)") == 42
@@ -1,24 +1,229 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
 import pytest
+
+from app.database import (
+    HOT_HALF_LIFE_SECONDS,
+    database,
+    email_outbox_table,
+    post_table,
+    user_table,
+)
+from app.metrics import email_send_duration
 from app.tasks import (
     APIResponseError,
+    EmailWorker,
+    PeriodicTask,
+    compact_hot_scores,
+    queue_email,
     send_email,
 )
-from requests.models import Response
+
+
+class MailtrapStandIn(BaseHTTPRequestHandler):
+    """Records posted emails and answers with the queued status codes (200
+    once they run out)."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append(
+            {"headers": dict(self.headers), "payload": json.loads(body)}
+        )
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        response = b'{"success": true}' if status == 200 else b"Internal Server Error"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def mail_server(mocker):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MailtrapStandIn)
+    server.received = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    mocker.patch(
+        "app.tasks.config.MAILTRAP_HOST",
+        f"http://127.0.0.1:{server.server_address[1]}/api/send",
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+async def worker():
+    worker = EmailWorker(
+        batch_size=10,
+        concurrency=2,
+        max_attempts=2,
+        retry_base_seconds=10,
+        poll_interval=1,
+    )
+    yield worker
+    await worker.stop()
+
+
+async def outbox() -> list:
+    query = email_outbox_table.select().order_by(email_outbox_table.c.id)
+    return await database.fetch_all(query)
+
+
+@pytest.mark.anyio
+async def test_send_email(mail_server):
+    sent = email_send_duration.count("sent")
+
+    async with httpx.AsyncClient() as client:
+        await send_email(client, "test@example.net", "Test Subject", "Test Body")
+
+    assert email_send_duration.count("sent") == sent + 1
+
+    assert len(mail_server.received) == 1
+    request = mail_server.received[0]
+    assert request["headers"]["Authorization"] == "Bearer testkey"
+    assert {
+        "to": [{"email": "test@example.net"}],
+        "subject": "Test Subject",
+        "text": "Test Body",
+    }.items() <= request["payload"].items()
+
+
+@pytest.mark.anyio
+async def test_send_email_api_error(mail_server):
+    mail_server.statuses = [500]
+
+    async with httpx.AsyncClient() as client:
+        with pytest.raises(APIResponseError):
+            await send_email(client, "test@example.net", "Test Subject", "Test Body")
+
+
+@pytest.mark.anyio
+async def test_worker_delivers_queued_emails(mail_server, worker):
+    await queue_email("a@example.net", "Subject A", "Body A")
+    await queue_email("b@example.net", "Subject B", "Body B")
+
+    assert await worker.drain() == 2
+
+    assert sorted(r["payload"]["to"][0]["email"] for r in mail_server.received) == [
+        "a@example.net",
+        "b@example.net",
+    ]
+    assert [email.status for email in await outbox()] == ["sent", "sent"]
+    assert await worker.drain() == 0
+
+
+@pytest.mark.anyio
+async def test_worker_retries_with_backoff(mail_server, worker, mocker):
+    mail_server.statuses = [500]
+    await queue_email("a@example.net", "Subject", "Body")
+
+    assert await worker.drain() == 1
+    [email] = await outbox()
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert email.next_attempt_at >= time.time() + 10
+    assert await worker.drain() == 0
+
+    mocker.patch("app.tasks.time.time", return_value=email.next_attempt_at)
+    assert await worker.drain() == 1
+    [email] = await outbox()
+    assert email.status == "sent"
+    assert len(mail_server.received) == 2
+
+
+@pytest.mark.anyio
+async def test_worker_gives_up_after_max_attempts(mail_server, worker, mocker):
+    mail_server.statuses = [500, 500]
+    await queue_email("a@example.net", "Subject", "Body")
+
+    await worker.drain()
+    mocker.patch("app.tasks.time.time", return_value=time.time() + 3600)
+    await worker.drain()
+
+    [email] = await outbox()
+    assert email.status == "failed"
+    assert email.attempts == 2
+    assert "Internal Server Error" in email.last_error
+
+
+@pytest.mark.anyio
+async def test_worker_records_unexpected_send_errors(mail_server, worker, mocker):
+    deliver = send_email
+
+    async def send_or_fail(client, recipient, subject, body):
+        if recipient == "b@example.net":
+            raise TypeError("Invalid URL")
+        await deliver(client, recipient, subject, body)
+
+    mocker.patch("app.tasks.send_email", side_effect=send_or_fail)
+    await queue_email("a@example.net", "Subject", "Body")
+    await queue_email("b@example.net", "Subject", "Body")
+
+    assert await worker.drain() == 2
+
+    sent, failed = await outbox()
+    assert sent.status == "sent"
+    assert failed.status == "pending"
+    assert failed.attempts == 1
+    assert failed.last_error == "Invalid URL"
 
 
 @pytest.mark.anyio
-async def test_send_email(mock_mailtrap_post):
-    await send_email("test@example.net", "Test Subject", "Test Body")
-    mock_mailtrap_post.assert_called_once()
+async def test_worker_runs_in_background(mail_server, worker):
+    await worker.start()
+    await queue_email("a@example.net", "Subject", "Body")
+    worker.notify()
+
+    for _ in range(100):
+        if mail_server.received:
+            break
+        await asyncio.sleep(0.01)
+    assert len(mail_server.received) == 1
 
 
 @pytest.mark.anyio
-async def test_send_email_api_error(mock_mailtrap_post):
-    failed_response = Response()
-    failed_response.status_code = 500
-    failed_response._content = b"Internal Server Error"
+async def test_compact_hot_scores():
+    user_id = await database.execute(user_table.insert().values(email="a"))
+    now = time.time() / HOT_HALF_LIFE_SECONDS
+    # Weights of 1, 1/64 and 1/256 likes; the insert trigger sets a fresh score.
+    for score in (now, now - 6, now - 8):
+        post_id = await database.execute(post_table.insert().values(user_id=user_id))
+        await database.execute(
+            post_table.update()
+            .where(post_table.c.id == post_id)
+            .values(hot_score=score)
+        )
+
+    assert await compact_hot_scores(min_weight=0.01, batch_size=1) == 1
+
+    rows = await database.fetch_all(post_table.select().order_by(post_table.c.id))
+    assert [row.hot_score is None for row in rows] == [False, False, True]
+
+
+@pytest.mark.anyio
+async def test_periodic_task_survives_failures():
+    calls = []
+
+    async def flaky():
+        calls.append(None)
+        raise ValueError("boom")
 
-    mock_mailtrap_post.return_value = failed_response
+    task = PeriodicTask(flaky, interval=0.001)
+    await task.start()
+    for _ in range(100):
+        if len(calls) >= 2:
+            break
+        await asyncio.sleep(0.01)
+    await task.stop()
 
-    with pytest.raises(APIResponseError):
-        await send_email("test@example.net", "Test Subject", "Test Body")
+    assert len(calls) >= 2